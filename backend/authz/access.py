@@ -0,0 +1,128 @@
+"""
+Materialized "user -> accessible course classes" index.
+
+A course class is listed for every user holding one of its roles, directly
+or through (nested) group membership. Access rows are recomputed per class
+from the ``TupleMirror`` (kept by ``authz.changes`` when
+``OPENFGA_TAIL_CHANGES`` is on; role grants made outside enrollments are only
+indexed then) and from ``Enrollment``, so that a new enrollment is visible
+before its tuple reaches the changelog.
+
+Class visibility (``courses.queries.get_visible_classes``) filters with
+:func:`accessible_class_ids`, a single indexed lookup, instead of subqueries
+and OpenFGA calls. "My classes" still lists enrollments only.
+"""
+import logging
+
+from django.db import transaction
+
+from courses.models import CourseClass
+from enrollment.models import Enrollment
+from services.openfga.relations import CourseClassRelation, GroupRelation, UserRelation
+
+from .models import CourseClassAccess, TupleMirror
+
+logger = logging.getLogger(__name__)
+
+CLASS_RELATIONS = [
+    CourseClassRelation.TEACHER,
+    CourseClassRelation.EDITOR,
+    CourseClassRelation.STUDENT,
+    CourseClassRelation.GUEST,
+]
+MEMBER_USERSET = f"#{GroupRelation.MEMBER}"
+
+
+def accessible_class_ids(user):
+    return CourseClassAccess.objects.filter(user=user).values("course_class_id")
+
+
+def _user_ids(subjects) -> set[int]:
+    """Resolve subjects (``user:1``, ``group:2#member``) to user ids."""
+    user_ids: set[int] = set()
+    seen_groups: set[str] = set()
+    pending = set(subjects)
+    while pending:
+        subject = pending.pop()
+        if subject.endswith(MEMBER_USERSET):
+            group = subject.removesuffix(MEMBER_USERSET)
+            if group not in seen_groups:
+                seen_groups.add(group)
+                pending.update(
+                    TupleMirror.objects.filter(
+                        object=group, relation=GroupRelation.MEMBER
+                    ).values_list("user", flat=True)
+                )
+            continue
+        prefix, _, id = subject.partition(":")
+        if prefix == UserRelation.TYPE and id.isdigit():
+            user_ids.add(int(id))
+    return user_ids
+
+
+def _replace(model, field: str, object_id, user_ids: set[int]):
+    rows = model.objects.filter(**{field: object_id})
+    with transaction.atomic():
+        existing = set(rows.values_list("user_id", flat=True))
+        rows.filter(user_id__in=existing - user_ids).delete()
+        model.objects.bulk_create(
+            [model(user_id=user_id, **{field: object_id}) for user_id in user_ids - existing],
+            ignore_conflicts=True,
+        )
+
+
+def refresh_class(course_class_id):
+    if not CourseClass.objects.filter(pk=course_class_id).exists():
+        return
+    subjects = TupleMirror.objects.filter(
+        object=f"{CourseClassRelation.TYPE}:{course_class_id}",
+        relation__in=CLASS_RELATIONS,
+    ).values_list("user", flat=True)
+    user_ids = _user_ids(subjects) | set(
+        Enrollment.objects.filter(course_class_id=course_class_id).values_list(
+            "user_id", flat=True
+        )
+    )
+    _replace(CourseClassAccess, "course_class_id", course_class_id, user_ids)
+
+
+def _granted_objects(group_keys: set[str]) -> set[str]:
+    """Objects granting a role to members of the groups, including nesting."""
+    objects: set[str] = set()
+    pending, seen = set(group_keys), set()
+    while pending:
+        group = pending.pop()
+        seen.add(group)
+        for object_ in TupleMirror.objects.filter(
+            user=f"{group}{MEMBER_USERSET}"
+        ).values_list("object", flat=True):
+            if object_.startswith(f"{GroupRelation.TYPE}:"):
+                if object_ not in seen:
+                    pending.add(object_)
+            else:
+                objects.add(object_)
+    return objects
+
+
+def refresh_objects(object_keys):
+    """Recompute the access rows of the objects whose tuples changed."""
+    object_keys = set(object_keys)
+    groups = {k for k in object_keys if k.startswith(f"{GroupRelation.TYPE}:")}
+    object_keys |= _granted_objects(groups)
+    for object_key in object_keys:
+        object_type, _, id = object_key.partition(":")
+        if object_type == CourseClassRelation.TYPE:
+            refresh_class(id)
+
+
+def rebuild():
+    """Recompute every access row, e.g. after enabling the index."""
+    class_ids = set(Enrollment.objects.values_list("course_class_id", flat=True))
+    for object_ in TupleMirror.objects.filter(
+        relation__in=CLASS_RELATIONS, object__startswith=f"{CourseClassRelation.TYPE}:"
+    ).values_list("object", flat=True):
+        class_ids.add(int(object_.partition(":")[2]))
+    CourseClassAccess.objects.exclude(course_class_id__in=class_ids).delete()
+    for class_id in class_ids:
+        refresh_class(class_id)
+    logger.info(f"Rebuilt access index for {len(class_ids)} classes")
@@ -0,0 +1,33 @@
+from django.contrib import admin
+from unfold.admin import ModelAdmin
+
+from .models import ChangeCursor, TupleMirror, TupleOutbox
+
+
+@admin.register(TupleOutbox)
+class TupleOutboxAdmin(ModelAdmin):
+    list_display = (
+        "id",
+        "operation",
+        "coalesce_key",
+        "created_at",
+        "processed_at",
+        "failed_at",
+        "attempts",
+    )
+    list_filter = ("operation", ("failed_at", admin.EmptyFieldListFilter))
+    search_fields = ("coalesce_key",)
+    readonly_fields = ("created_at",)
+
+
+@admin.register(ChangeCursor)
+class ChangeCursorAdmin(ModelAdmin):
+    list_display = ("store_id", "updated_at")
+    readonly_fields = ("updated_at",)
+
+
+@admin.register(TupleMirror)
+class TupleMirrorAdmin(ModelAdmin):
+    list_display = ("user", "relation", "object")
+    list_filter = ("relation",)
+    search_fields = ("user", "object")
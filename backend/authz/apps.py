@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+
+
+class AuthzConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "authz"
+
+    def ready(self):
+        from services.openfga.invalidation import check_shared_cache
+
+        from . import signals
+
+        check_shared_cache()
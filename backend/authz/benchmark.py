@@ -0,0 +1,307 @@
+"""
+Benchmark of the authorization cost of permission-heavy endpoints.
+
+:func:`seed` creates a synthetic institution of a given :class:`Scale`
+(users, classes, enrollments, content trees, nested folders) with bulk
+inserts and syncs its tuples in one pass; :func:`run` requests each of
+:data:`ENDPOINTS` as a user with access, several times, and reports per
+endpoint the latency percentiles, database queries and OpenFGA calls of a
+request.
+
+Everything runs in one transaction that is rolled back at the end; the
+tuples written for the institution are deleted afterwards. Use the
+in-memory client (``OPENFGA_FAKE_CLIENT``) to measure the application side
+alone, or a dedicated store to include the OpenFGA round trips.
+"""
+import logging
+import math
+import random
+import time
+from dataclasses import dataclass, field
+from uuid import uuid4
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from openfga_sdk.client.models import ClientTuple
+from rest_framework.test import APIClient
+
+from courses.models import Course, CourseClass
+from courseware.models import ContentNode, Lesson, Module
+from enrollment.models import Enrollment, EnrollmentRole
+from services.openfga.cache import decision_cache
+from services.openfga.metrics import registry
+from services.openfga.sync.changeset import TupleChangeSet
+from services.openfga.sync.tuples import write_in_chunks
+from storage.models import File, Folder
+
+from .bulk import (
+    bulk_create_content_nodes,
+    bulk_create_enrollments,
+    bulk_create_files,
+    deferred_sync,
+)
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+@dataclass(frozen=True)
+class Scale:
+    users: int = 200
+    classes: int = 10
+    # Per class; the benchmark's teacher and student are enrolled everywhere
+    enrollments: int = 50
+    # Per class, and lessons per module
+    modules: int = 10
+    lessons: int = 5
+    # Folder tree of the benchmark's teacher, and files per leaf folder
+    folder_depth: int = 3
+    folder_fanout: int = 3
+    files: int = 20
+
+
+@dataclass
+class Institution:
+    teacher: User
+    student: User
+    class_ids: list[int]
+    leaf_folder_ids: list[int]
+    # Tuples written for the institution, deleted by :func:`run`
+    tuples: list[ClientTuple] = field(default_factory=list)
+
+
+@dataclass
+class EndpointResult:
+    name: str
+    latencies: list[float] = field(default_factory=list)
+    queries: list[int] = field(default_factory=list)
+    fga_calls: list[int] = field(default_factory=list)
+    statuses: set[int] = field(default_factory=set)
+
+    def percentile(self, q: float) -> float:
+        """Nearest-rank percentile of the latencies, in seconds."""
+        values = sorted(self.latencies)
+        return values[max(0, min(len(values) - 1, math.ceil(q / 100 * len(values)) - 1))]
+
+    def summary(self) -> dict:
+        n = len(self.latencies)
+        return {
+            "endpoint": self.name,
+            "requests": n,
+            "statuses": sorted(self.statuses),
+            "p50_ms": self.percentile(50) * 1000,
+            "p90_ms": self.percentile(90) * 1000,
+            "p99_ms": self.percentile(99) * 1000,
+            "max_ms": max(self.latencies) * 1000,
+            "queries": sum(self.queries) / n,
+            "fga_calls": sum(self.fga_calls) / n,
+        }
+
+
+def _make_users(count: int, tag: str) -> list[User]:
+    return User.objects.bulk_create(
+        [
+            User(email=f"bench-{tag}-{i}@example.com", password="!", is_active=True)
+            for i in range(count)
+        ]
+    )
+
+
+def _make_classes(scale: Scale, tag: str) -> list[CourseClass]:
+    course = Course.objects.create(name=f"Benchmark {tag}", description="")
+    return CourseClass.objects.bulk_create(
+        [
+            CourseClass(name=f"Benchmark {tag} #{i}", course=course)
+            for i in range(scale.classes)
+        ]
+    )
+
+
+def _make_enrollments(scale, rng, classes, teacher, student, users):
+    enrollments = []
+    for course_class in classes:
+        enrollments.append(
+            Enrollment(user=teacher, course_class=course_class, role=EnrollmentRole.TEACHER)
+        )
+        enrollments.append(
+            Enrollment(user=student, course_class=course_class, role=EnrollmentRole.STUDENT)
+        )
+        for user in rng.sample(users, min(scale.enrollments, len(users))):
+            role = rng.choices(
+                [EnrollmentRole.STUDENT, EnrollmentRole.GUEST, EnrollmentRole.TEACHER],
+                weights=[90, 8, 2],
+            )[0]
+            enrollments.append(Enrollment(user=user, course_class=course_class, role=role))
+    bulk_create_enrollments(enrollments)
+
+
+def _make_content(scale: Scale, classes: list[CourseClass]):
+    module_type = ContentType.objects.get_for_model(Module)
+    lesson_type = ContentType.objects.get_for_model(Lesson)
+    modules = Module.objects.bulk_create(
+        [Module() for _ in range(scale.modules * len(classes))]
+    )
+    roots = bulk_create_content_nodes(
+        [
+            ContentNode(
+                title=f"Module {i}",
+                content_type=module_type,
+                object_id=module.pk,
+                course_class=course_class,
+                order=i,
+            )
+            for n, course_class in enumerate(classes)
+            for i, module in enumerate(modules[n * scale.modules : (n + 1) * scale.modules])
+        ]
+    )
+    lessons = Lesson.objects.bulk_create(
+        [Lesson() for _ in range(scale.lessons * len(roots))]
+    )
+    bulk_create_content_nodes(
+        [
+            ContentNode(
+                title=f"Lesson {i}",
+                content_type=lesson_type,
+                object_id=lesson.pk,
+                course_class_id=root.course_class_id,
+                parent=root,
+                order=i,
+            )
+            for n, root in enumerate(roots)
+            for i, lesson in enumerate(lessons[n * scale.lessons : (n + 1) * scale.lessons])
+        ]
+    )
+
+
+def _make_folders(scale: Scale, pending, owner: User, tag: str) -> list[Folder]:
+    level = Folder.objects.bulk_create([Folder(name=f"Benchmark {tag}", owner=owner)])
+    pending.add_instances(level, created=True)
+    for _ in range(scale.folder_depth):
+        level = Folder.objects.bulk_create(
+            [
+                Folder(name=f"Folder {i}", parent=parent, owner=owner)
+                for parent in level
+                for i in range(scale.folder_fanout)
+            ]
+        )
+        pending.add_instances(level, created=True)
+    # Stored object names only: nothing is uploaded
+    bulk_create_files(
+        [
+            File(
+                name=f"File {i}.txt",
+                folder=folder,
+                owner=owner,
+                file=f"benchmark/{uuid4().hex}.txt",
+            )
+            for folder in level
+            for i in range(scale.files)
+        ]
+    )
+    return level
+
+
+def seed(scale: Scale, random_seed: int = 0) -> Institution:
+    """
+    Create an institution of ``scale`` and sync its tuples. Must run inside
+    a transaction, which :func:`run` rolls back.
+    """
+    rng = random.Random(random_seed)
+    tag = uuid4().hex[:8]
+    with deferred_sync() as pending:
+        teacher, student, *users = _make_users(scale.users + 2, tag)
+        classes = _make_classes(scale, tag)
+        _make_enrollments(scale, rng, classes, teacher, student, users)
+        _make_content(scale, classes)
+        folders = _make_folders(scale, pending, teacher, tag)
+
+        # Synced now rather than on commit, which never comes
+        changes = TupleChangeSet()
+        pending.plan(changes)
+        tuples = changes.writes
+        changes.commit()
+    return Institution(
+        teacher=teacher,
+        student=student,
+        class_ids=[c.pk for c in classes],
+        leaf_folder_ids=[f.pk for f in folders],
+        tuples=tuples,
+    )
+
+
+# Endpoint name -> (path, user attribute of the institution)
+ENDPOINTS = {
+    "nodes-tree": ("/api/classes/{class_id}/nodes/tree/", "student"),
+    "files": ("/api/files/?folder={folder_id}", "teacher"),
+    "class-access": ("/api/classes/{class_id}/access/", "teacher"),
+    "enrollments": ("/api/enrollments/", "student"),
+}
+
+
+def measure(
+    institution: Institution,
+    name: str,
+    repeat: int = 20,
+    warmup: int = 2,
+    cold: bool = False,
+) -> EndpointResult:
+    """
+    Request endpoint ``name`` ``repeat`` times, cycling through the classes
+    and folders of the institution. With ``cold``, cached decisions are
+    dropped before every request.
+    """
+    path, user_attr = ENDPOINTS[name]
+    client = APIClient()
+    client.force_authenticate(getattr(institution, user_attr))
+    result = EndpointResult(name)
+    for i in range(-warmup, repeat):
+        url = path.format(
+            class_id=institution.class_ids[i % len(institution.class_ids)],
+            folder_id=institution.leaf_folder_ids[i % len(institution.leaf_folder_ids)],
+        )
+        if cold:
+            decision_cache.clear()
+        calls = registry.call_count()
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = client.get(url)
+            duration = time.perf_counter() - start
+        if i < 0:
+            continue
+        result.latencies.append(duration)
+        result.queries.append(len(queries))
+        result.fga_calls.append(registry.call_count() - calls)
+        result.statuses.add(response.status_code)
+    return result
+
+
+def run(
+    scale: Scale,
+    endpoints=tuple(ENDPOINTS),
+    repeat: int = 20,
+    warmup: int = 2,
+    cold: bool = False,
+    random_seed: int = 0,
+) -> list[EndpointResult]:
+    """Seed an institution, measure ``endpoints`` and discard the institution."""
+    institution = None
+    try:
+        # The test client is refused by hosts other than "testserver"
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            with transaction.atomic():
+                institution = seed(scale, random_seed)
+                results = [
+                    measure(institution, name, repeat=repeat, warmup=warmup, cold=cold)
+                    for name in endpoints
+                ]
+                transaction.set_rollback(True)
+    finally:
+        if institution is not None:
+            logger.info(f"Deleting {len(institution.tuples)} benchmark tuples")
+            write_in_chunks([], institution.tuples)
+        decision_cache.clear()
+    return results
@@ -0,0 +1,340 @@
+"""
+Deferred OpenFGA sync for bulk changes.
+
+The signal handlers sync one row per save, at least one OpenFGA round trip
+each, and ``bulk_create`` / ``QuerySet.update`` don't send signals at all.
+Inside :func:`deferred_sync` the handlers only record which rows changed;
+once the outermost block's transaction commits, the tuples of those rows are
+recomputed from the database in a few queries, diffed against the store and
+written with :class:`BulkTupleWriter`. With ``OPENFGA_OUTBOX_ENABLED`` the
+recorded rows go to the outbox in that transaction instead, as one
+``sync_deferred`` entry that the drain plans the same way:
+
+- enrollments are diffed with one paginated read per course class;
+- rows created in the block have no tuples yet and are written without a
+  read; updated or deleted rows are read object by object.
+
+Use the helpers (:func:`bulk_create_enrollments`, ...) for bulk writes, or
+call :meth:`DeferredSync.add` for rows changed by other means.
+"""
+import logging
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Iterator
+
+from django.apps import apps
+from django.conf import settings
+from django.db import models, transaction
+from openfga_sdk import ReadRequestTupleKey
+
+from courseware import trees
+from courseware.models import ContentNode
+from enrollment.models import Enrollment
+from services.openfga.relations import (
+    ContentNodeRelation,
+    CourseClassRelation,
+    FileRelation,
+    FolderRelation,
+    UserRelation,
+)
+from services.openfga.sync.changeset import TupleChangeSet
+from services.openfga.sync.utils import delete_all_subject_tuples, sync_object_relations
+from storage.models import File, Folder
+
+from .access import refresh_class
+from .models import CourseClassAccess
+
+logger = logging.getLogger(__name__)
+
+_active: ContextVar["DeferredSync | None"] = ContextVar("authz_deferred_sync", default=None)
+
+
+@dataclass(frozen=True)
+class ObjectSpec:
+    """How the tuples of a row whose object is ``<object_type>:<pk>`` derive."""
+
+    object_type: str
+    fields: tuple[str, ...]
+    # Field values -> managed relation -> subject keys
+    desired_subjects: Callable[..., dict[str, set[str]]]
+
+
+def _parent_subjects(relations, owner_id, parent_id) -> dict[str, set[str]]:
+    return {
+        relations.OWNER: {f"{UserRelation.TYPE}:{owner_id}"},
+        relations.PARENT: {f"{FolderRelation.TYPE}:{parent_id}"} if parent_id else set(),
+    }
+
+
+OBJECT_SPECS: dict[type[models.Model], ObjectSpec] = {
+    ContentNode: ObjectSpec(
+        ContentNodeRelation.TYPE,
+        ("course_class_id", "parent_id"),
+        lambda course_class_id, parent_id: {
+            ContentNodeRelation.COURSE_CLASS: {
+                f"{CourseClassRelation.TYPE}:{course_class_id}"
+            },
+            ContentNodeRelation.PARENT: {f"{ContentNodeRelation.TYPE}:{parent_id}"}
+            if parent_id
+            else set(),
+        },
+    ),
+    Folder: ObjectSpec(
+        FolderRelation.TYPE,
+        ("owner_id", "parent_id"),
+        lambda owner_id, parent_id: _parent_subjects(FolderRelation, owner_id, parent_id),
+    ),
+    File: ObjectSpec(
+        FileRelation.TYPE,
+        ("owner_id", "folder_id"),
+        lambda owner_id, folder_id: _parent_subjects(FileRelation, owner_id, folder_id),
+    ),
+}
+
+
+def _key(instance: models.Model):
+    # Enrollments are identified by what their tuple is about
+    if isinstance(instance, Enrollment):
+        return (instance.user_id, instance.course_class_id)
+    if instance.pk is None:
+        raise ValueError(f"{instance!r} has no primary key to sync")
+    return instance.pk
+
+
+class DeferredSync:
+    """Rows whose tuples must be synced, by model."""
+
+    def __init__(self):
+        self.created: defaultdict[type, set] = defaultdict(set)
+        self.changed: defaultdict[type, set] = defaultdict(set)
+
+    def add(self, model: type[models.Model], keys, created: bool = False):
+        """Record changed rows by key (``(user_id, course_class_id)`` for enrollments)."""
+        if model is not Enrollment and model not in OBJECT_SPECS:
+            raise ValueError(f"Deferred sync is not supported for {model.__name__}")
+        (self.created if created else self.changed)[model].update(keys)
+
+    def add_instances(self, instances, created: bool = False):
+        for instance in instances:
+            self.add(type(instance), [_key(instance)], created=created)
+
+    def __bool__(self):
+        return any(self.created.values()) or any(self.changed.values())
+
+    def dump(self) -> dict[str, dict[str, set[str]]]:
+        """The recorded keys as strings by model label, for an outbox payload."""
+
+        def dump_key(key):
+            return ":".join(map(str, key)) if isinstance(key, tuple) else str(key)
+
+        return {
+            state: {
+                model._meta.label: {dump_key(key) for key in keys}
+                for model, keys in rows.items()
+                if keys
+            }
+            for state, rows in (("created", self.created), ("changed", self.changed))
+        }
+
+    @classmethod
+    def load(cls, rows: dict[str, dict[str, set[str]]]) -> "DeferredSync":
+        pending = cls()
+        for state, keys_by_label in rows.items():
+            for label, keys in keys_by_label.items():
+                model = apps.get_model(label)
+                if model is Enrollment:
+                    keys = [tuple(map(int, key.split(":"))) for key in keys]
+                else:
+                    keys = [int(key) for key in keys]
+                pending.add(model, keys, created=state == "created")
+        return pending
+
+    def plan(self, changes: TupleChangeSet):
+        enrollments = self.created.pop(Enrollment, set()) | self.changed.pop(Enrollment, set())
+        if enrollments:
+            _plan_enrollments(changes, enrollments)
+        for model, spec in OBJECT_SPECS.items():
+            created = self.created.pop(model, set())
+            changed = self.changed.pop(model, set())
+            if created or changed:
+                _plan_objects(changes, model, spec, created, changed)
+
+    def flush(self):
+        if not self:
+            return []
+        changes = TupleChangeSet()
+        self.plan(changes)
+        logger.info(
+            f"Syncing deferred tuples: {len(changes.writes)} writes, "
+            f"{len(changes.deletes)} deletes"
+        )
+        return changes.commit()
+
+
+def _plan_enrollments(changes: TupleChangeSet, pairs: set[tuple[int, int]]):
+    # enrollment.signals imports this module
+    from enrollment.signals import ENROLLMENT_ROLE_RELATION_MAP
+
+    role_relations = set(ENROLLMENT_ROLE_RELATION_MAP.values())
+    users_by_class: defaultdict[int, set[int]] = defaultdict(set)
+    for user_id, course_class_id in pairs:
+        users_by_class[course_class_id].add(user_id)
+    roles = {
+        (user_id, course_class_id): ENROLLMENT_ROLE_RELATION_MAP[role]
+        for user_id, course_class_id, role in Enrollment.objects.filter(
+            course_class_id__in=users_by_class
+        ).values_list("user_id", "course_class_id", "role")
+        if user_id in users_by_class[course_class_id]
+    }
+
+    for course_class_id, user_ids in users_by_class.items():
+        object_key = f"{CourseClassRelation.TYPE}:{course_class_id}"
+        subjects = {f"{UserRelation.TYPE}:{user_id}" for user_id in user_ids}
+        desired = {
+            (f"{UserRelation.TYPE}:{user_id}", roles[(user_id, course_class_id)])
+            for user_id in user_ids
+            if (user_id, course_class_id) in roles
+        }
+        # Only role tuples are derived from enrollments; grants made through
+        # the access API are left alone
+        for t in changes.read(ReadRequestTupleKey(object=object_key)):
+            if t.relation not in role_relations or t.user not in subjects:
+                continue
+            if (t.user, t.relation) in desired:
+                desired.discard((t.user, t.relation))
+            else:
+                changes.delete(t.user, t.relation, object_key)
+        for user, relation in desired:
+            changes.write(user, relation, object_key)
+
+
+def _plan_objects(changes: TupleChangeSet, model, spec: ObjectSpec, created, changed):
+    pks = created | changed
+    rows = {
+        pk: spec.desired_subjects(*values)
+        for pk, *values in model.objects.filter(pk__in=pks).values_list("pk", *spec.fields)
+    }
+    for pk in pks:
+        object_key = f"{spec.object_type}:{pk}"
+        desired_subjects = rows.get(pk)
+        if desired_subjects is None:
+            delete_all_subject_tuples(object_key, changes=changes)
+        elif pk in changed:
+            sync_object_relations(object_key, desired_subjects, changes=changes)
+        else:
+            for relation, subject_keys in desired_subjects.items():
+                for subject_key in subject_keys:
+                    changes.write(subject_key, relation, object_key)
+
+
+@contextmanager
+def deferred_sync() -> Iterator[DeferredSync]:
+    """
+    Suppress the per-row sync signal handlers inside the block and sync the
+    recorded rows in bulk. The outermost block runs in a transaction; the
+    rows are synced after it commits, or recorded in the outbox as part of
+    it. Nothing is synced when the block raises.
+    """
+    if (pending := _active.get()) is not None:
+        yield pending
+        return
+    pending = DeferredSync()
+    with transaction.atomic():
+        token = _active.set(pending)
+        try:
+            yield pending
+        finally:
+            _active.reset(token)
+        if settings.OPENFGA_OUTBOX_ENABLED:
+            # authz.outbox replays through this module
+            from .outbox import submit, sync_deferred
+
+            if pending:
+                submit(sync_deferred, rows=pending.dump())
+        else:
+            # The data is committed by then; a failure is logged, not raised
+            transaction.on_commit(pending.flush, robust=True)
+
+
+def defer(instance: models.Model, created: bool = False) -> bool:
+    """Record ``instance`` if a deferred sync is active; signal handlers return early then."""
+    if (pending := _active.get()) is None:
+        return False
+    pending.add_instances([instance], created=created)
+    return True
+
+
+def _bulk_create(model, objs, **kwargs):
+    if kwargs.get("ignore_conflicts") and model is not Enrollment:
+        # Rows skipped (or, on some databases, all rows) come back without a
+        # primary key to sync
+        raise ValueError(f"ignore_conflicts is not supported for {model.__name__}")
+    with deferred_sync() as pending:
+        objs = model.objects.bulk_create(objs, **kwargs)
+        # Upserts may have updated existing rows, and skipped rows exist
+        conflicts = kwargs.get("update_conflicts") or kwargs.get("ignore_conflicts")
+        pending.add_instances(objs, created=not conflicts)
+    return objs
+
+
+def bulk_create_enrollments(enrollments: list[Enrollment], **kwargs) -> list[Enrollment]:
+    """``bulk_create`` enrollments, then index and sync them in bulk."""
+    enrollments = _bulk_create(Enrollment, enrollments, **kwargs)
+    CourseClassAccess.objects.bulk_create(
+        [
+            CourseClassAccess(user_id=e.user_id, course_class_id=e.course_class_id)
+            for e in enrollments
+        ],
+        ignore_conflicts=True,
+    )
+    return enrollments
+
+
+def bulk_create_content_nodes(nodes: list[ContentNode], **kwargs) -> list[ContentNode]:
+    """``bulk_create`` nodes whose parents are saved, with their paths set."""
+    ContentNode.objects.set_paths(nodes)
+    nodes = _bulk_create(ContentNode, nodes, **kwargs)
+    trees.bump({node.course_class_id for node in nodes})
+    return nodes
+
+
+def bulk_create_files(files: list[File], **kwargs) -> list[File]:
+    return _bulk_create(File, files, **kwargs)
+
+
+def update(queryset: models.QuerySet, **values) -> int:
+    """``QuerySet.update`` that syncs the tuples of the updated rows."""
+    model = queryset.model
+    with deferred_sync() as pending:
+        pks = list(queryset.values_list("pk", flat=True))
+        rows = model.objects.filter(pk__in=pks)
+        if model is Enrollment:
+            # Both the (user, course class) pairs left and the ones entered
+            before = set(rows.values_list("user_id", "course_class_id"))
+            count = rows.update(**values)
+            after = set(rows.values_list("user_id", "course_class_id"))
+            pending.add(model, before | after)
+            CourseClassAccess.objects.bulk_create(
+                [
+                    CourseClassAccess(user_id=user_id, course_class_id=course_class_id)
+                    for user_id, course_class_id in after - before
+                ],
+                ignore_conflicts=True,
+            )
+            for course_class_id in {c for _, c in before - after}:
+                refresh_class(course_class_id)
+        elif model is ContentNode:
+            # The trees of the classes left and entered
+            class_ids = set(rows.values_list("course_class_id", flat=True))
+            count = rows.update(**values)
+            pending.add(model, pks)
+            class_ids |= set(rows.values_list("course_class_id", flat=True))
+            if "parent" in values or "parent_id" in values:
+                ContentNode.objects.rebuild_paths(class_ids)
+            trees.bump(class_ids)
+        else:
+            count = rows.update(**values)
+            pending.add(model, pks)
+    return count
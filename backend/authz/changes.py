@@ -0,0 +1,90 @@
+"""
+Tail OpenFGA's changelog into ``TupleMirror`` and publish invalidations.
+
+Each page of changes is applied to the mirror and the cursor in one
+transaction, so a crash replays at most one page (applying a change twice is
+harmless). Invalidations are published once the page is committed.
+"""
+import logging
+
+from django.db import transaction
+from django.db.models import Q
+from openfga_sdk.client.models import ClientReadChangesRequest
+from openfga_sdk.models.tuple_operation import TupleOperation
+
+from services.openfga.invalidation import publish
+from services.openfga.settings import READ_PAGE_SIZE
+from services.openfga.sync import client
+
+from .models import ChangeCursor, TupleMirror
+
+logger = logging.getLogger(__name__)
+
+TupleKey = tuple[str, str, str]  # (user, relation, object)
+
+# Tuples per DELETE statement
+DELETE_CHUNK_SIZE = 100
+
+
+def _collapse(changes) -> tuple[set[TupleKey], set[TupleKey]]:
+    """Reduce a page of changes to the final writes and deletes, in order."""
+    state: dict[TupleKey, bool] = {}
+    for change in changes:
+        key = (change.tuple_key.user, change.tuple_key.relation, change.tuple_key.object)
+        state[key] = change.operation != TupleOperation.DELETE
+    writes = {key for key, present in state.items() if present}
+    return writes, set(state) - writes
+
+
+def _apply(writes: set[TupleKey], deletes: set[TupleKey]):
+    deletes = sorted(deletes)
+    for start in range(0, len(deletes), DELETE_CHUNK_SIZE):
+        condition = Q()
+        for user, relation, object_ in deletes[start : start + DELETE_CHUNK_SIZE]:
+            condition |= Q(user=user, relation=relation, object=object_)
+        TupleMirror.objects.filter(condition).delete()
+    TupleMirror.objects.bulk_create(
+        [TupleMirror(user=u, relation=r, object=o) for u, r, o in writes],
+        ignore_conflicts=True,
+    )
+
+
+def _cursor() -> ChangeCursor:
+    store_id = client.get_store_id()
+    cursor, created = ChangeCursor.objects.get_or_create(store_id=store_id)
+    if created and ChangeCursor.objects.exclude(pk=cursor.pk).exists():
+        # The configured store changed; the mirror belongs to the old one
+        logger.warning(f"OpenFGA store changed to {store_id}, rebuilding tuple mirror")
+        TupleMirror.objects.all().delete()
+        ChangeCursor.objects.exclude(pk=cursor.pk).delete()
+    return cursor
+
+
+def tail_changes(max_pages: int | None = None, page_size: int = READ_PAGE_SIZE) -> int:
+    """
+    Apply changes since the stored cursor and return how many were applied.
+
+    Stops at the end of the changelog or after ``max_pages`` pages.
+    """
+    cursor = _cursor()
+    applied = pages = 0
+    while max_pages is None or pages < max_pages:
+        options = {"page_size": page_size}
+        if cursor.continuation_token:
+            options["continuation_token"] = cursor.continuation_token
+        response = client.read_changes(ClientReadChangesRequest(type=None), options)
+        pages += 1
+        writes, deletes = _collapse(response.changes)
+        with transaction.atomic():
+            _apply(writes, deletes)
+            # The token is returned even when there are no more changes
+            if response.continuation_token:
+                cursor.continuation_token = response.continuation_token
+                cursor.save(update_fields=["continuation_token", "updated_at"])
+        publish(o for _, _, o in writes | deletes)
+        applied += len(response.changes)
+        if not response.changes:
+            break
+    if applied:
+        logger.info(f"Mirrored {applied} OpenFGA tuple changes")
+    return applied
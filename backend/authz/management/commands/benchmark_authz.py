@@ -0,0 +1,65 @@
+import json
+from dataclasses import fields
+
+from django.core.management.base import BaseCommand
+
+from ...benchmark import ENDPOINTS, Scale, run
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a synthetic institution, request the permission-heavy endpoints and "
+        "report latency percentiles, database queries and OpenFGA calls per request. "
+        "The institution is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        for scale_field in fields(Scale):
+            parser.add_argument(
+                f"--{scale_field.name.replace('_', '-')}",
+                type=int,
+                default=scale_field.default,
+            )
+        parser.add_argument(
+            "--endpoint",
+            action="append",
+            choices=list(ENDPOINTS),
+            help="Endpoint to measure, repeatable (default: all).",
+        )
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--warmup", type=int, default=2)
+        parser.add_argument(
+            "--cold",
+            action="store_true",
+            help="Drop cached decisions before every request.",
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+        parser.add_argument("--json", action="store_true", help="Print JSON lines.")
+
+    def handle(self, *args, **options):
+        scale = Scale(**{f.name: options[f.name] for f in fields(Scale)})
+        results = run(
+            scale,
+            endpoints=options["endpoint"] or list(ENDPOINTS),
+            repeat=options["repeat"],
+            warmup=options["warmup"],
+            cold=options["cold"],
+            random_seed=options["seed"],
+        )
+
+        if options["json"]:
+            for result in results:
+                self.stdout.write(json.dumps(result.summary()))
+            return
+        self.stdout.write(
+            f"{'endpoint':<14} {'status':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} "
+            f"{'max ms':>8} {'queries':>8} {'fga':>6}"
+        )
+        for result in results:
+            s = result.summary()
+            statuses = ",".join(map(str, s["statuses"]))
+            self.stdout.write(
+                f"{s['endpoint']:<14} {statuses:>8} {s['p50_ms']:>8.1f} {s['p90_ms']:>8.1f} "
+                f"{s['p99_ms']:>8.1f} {s['max_ms']:>8.1f} {s['queries']:>8.1f} "
+                f"{s['fga_calls']:>6.1f}"
+            )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from ...access import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recompute the materialized course class access index."
+
+    def handle(self, *args, **options):
+        rebuild()
+        self.stdout.write(self.style.SUCCESS("Access index rebuilt"))
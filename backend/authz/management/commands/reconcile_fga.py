@@ -0,0 +1,77 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from services.openfga.settings import BULK_WRITE_WORKERS, MAX_TUPLES_PER_WRITE
+from services.openfga.sync.tuples import BulkTupleWriter
+
+from ...reconcile import reconcile
+
+
+class Command(BaseCommand):
+    help = "Rebuild the OpenFGA tuples derived from the database and apply the difference."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report the tuples that would be written and deleted.",
+        )
+        parser.add_argument(
+            "--prune-roles",
+            action="store_true",
+            help="Also delete course class role tuples without a matching enrollment.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=2000,
+            help="Rows fetched per database round trip.",
+        )
+        parser.add_argument("--write-chunk-size", type=int, default=MAX_TUPLES_PER_WRITE)
+        parser.add_argument("--workers", type=int, default=BULK_WRITE_WORKERS)
+        parser.add_argument(
+            "--show",
+            type=int,
+            default=10,
+            help="Number of example tuples to print per direction.",
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        last = {}
+
+        def progress(stage, count):
+            # Report at most once per second per stage
+            now = time.perf_counter()
+            if now - last.get(stage, 0) < 1:
+                return
+            last[stage] = now
+            rate = count / max(now - start, 1e-6)
+            self.stdout.write(f"[{stage}] {count} tuples ({rate:.0f}/s)")
+
+        result = reconcile(
+            dry_run=options["dry_run"],
+            prune_roles=options["prune_roles"],
+            chunk_size=options["chunk_size"],
+            writer=BulkTupleWriter(
+                chunk_size=options["write_chunk_size"], max_workers=options["workers"]
+            ),
+            progress=progress,
+        )
+
+        for label, tuples in (("+", result.writes), ("-", result.deletes)):
+            for t in tuples[: options["show"]]:
+                self.stdout.write(f"  {label} {t.user} {t.relation} {t.object}")
+            if len(tuples) > options["show"]:
+                self.stdout.write(f"  {label} ... {len(tuples) - options['show']} more")
+
+        summary = (
+            f"{len(result.writes)} writes, {len(result.deletes)} deletes "
+            f"({result.desired} desired, {result.scanned} scanned) "
+            f"in {result.duration:.1f}s"
+        )
+        if options["dry_run"]:
+            self.stdout.write(f"Dry run, nothing applied: {summary}")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Applied {summary}"))
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ...changes import tail_changes
+
+
+class Command(BaseCommand):
+    help = "Continuously mirror the OpenFGA changelog and publish cache invalidations."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait after reaching the end of the changelog.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Catch up with the changelog and exit.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            applied = tail_changes()
+            if applied:
+                self.stdout.write(f"Applied {applied} changes")
+            if options["once"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authz', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('store_id', models.CharField(max_length=100, unique=True)),
+                ('continuation_token', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TupleMirror',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user', models.CharField(max_length=255)),
+                ('relation', models.CharField(max_length=100)),
+                ('object', models.CharField(max_length=255)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'relation'], name='authz_mirror_user_idx')],
+                'constraints': [models.UniqueConstraint(fields=('object', 'relation', 'user'), name='authz_mirror_tuple_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,75 @@
+from django.db import migrations
+
+# Frozen copies of authz.access's relation lists
+CLASS_RELATIONS = ["teacher", "editor", "student", "guest"]
+MEMBER_USERSET = "#member"
+
+
+def _user_ids(subjects, members) -> set[int]:
+    """Resolve subjects (``user:1``, ``group:2#member``) to user ids."""
+    user_ids, seen, pending = set(), set(), set(subjects)
+    while pending:
+        subject = pending.pop()
+        if subject.endswith(MEMBER_USERSET):
+            group = subject.removesuffix(MEMBER_USERSET)
+            if group not in seen:
+                seen.add(group)
+                pending.update(members.get(group, ()))
+            continue
+        prefix, _, id = subject.partition(":")
+        if prefix == "user" and id.isdigit():
+            user_ids.add(int(id))
+    return user_ids
+
+
+def fill_access_index(apps, schema_editor):
+    """
+    Index the existing enrollments and the role grants of the tuple mirror,
+    as ``rebuild_access_index`` does. Grants the mirror doesn't hold yet are
+    indexed as the changelog tailer catches up.
+    """
+    Enrollment = apps.get_model("enrollment", "Enrollment")
+    TupleMirror = apps.get_model("authz", "TupleMirror")
+    CourseClass = apps.get_model("courses", "CourseClass")
+    CourseClassAccess = apps.get_model("authz", "CourseClassAccess")
+    User = CourseClassAccess._meta.get_field("user").related_model
+
+    class_rows = set(Enrollment.objects.values_list("user_id", "course_class_id"))
+
+    members: dict[str, set[str]] = {}
+    for user, object_ in TupleMirror.objects.filter(relation="member").values_list(
+        "user", "object"
+    ):
+        members.setdefault(object_, set()).add(user)
+    grants = TupleMirror.objects.filter(
+        relation__in=CLASS_RELATIONS, object__startswith="course_class:"
+    )
+    for user, object_ in grants.values_list("user", "object"):
+        id = object_.removeprefix("course_class:")
+        if id.isdigit():
+            class_rows.update((user_id, int(id)) for user_id in _user_ids([user], members))
+
+    # Tuples may outlive their users and classes
+    user_ids = set(User.objects.values_list("pk", flat=True))
+    class_ids = set(CourseClass.objects.values_list("pk", flat=True))
+    CourseClassAccess.objects.bulk_create(
+        [
+            CourseClassAccess(user_id=user_id, course_class_id=class_id)
+            for user_id, class_id in class_rows
+            if user_id in user_ids and class_id in class_ids
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authz", "0003_access_index"),
+        ("enrollment", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_access_index, migrations.RunPython.noop),
+    ]
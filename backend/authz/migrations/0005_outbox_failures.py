@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authz', '0004_backfill_access_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='tupleoutbox',
+            name='authz_outbox_pending_idx',
+        ),
+        migrations.AddField(
+            model_name='tupleoutbox',
+            name='failed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='tupleoutbox',
+            name='locked_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='tupleoutbox',
+            index=models.Index(condition=models.Q(('failed_at__isnull', True), ('processed_at__isnull', True)), fields=['id'], name='authz_outbox_pending_idx'),
+        ),
+    ]
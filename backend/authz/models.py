@@ -0,0 +1,91 @@
+from django.conf import settings
+from django.db import models
+
+
+class TupleOutbox(models.Model):
+    """
+    An OpenFGA sync operation recorded in the same transaction as the model
+    change that caused it, and replayed by ``authz.tasks.drain_tuple_outbox``.
+    """
+
+    operation = models.CharField(max_length=100)
+    # Entries sharing a key target the same tuples; only the latest is applied.
+    coalesce_key = models.CharField(max_length=500)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    # Set once the entry failed OPENFGA_OUTBOX_MAX_ATTEMPTS times; the drain
+    # skips it from then on
+    failed_at = models.DateTimeField(null=True, blank=True)
+    # Lease of the drain replaying the entry, so its row isn't locked while
+    # OpenFGA is called
+    locked_until = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(
+                fields=["id"],
+                condition=models.Q(processed_at__isnull=True, failed_at__isnull=True),
+                name="authz_outbox_pending_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"[{self.pk}] {self.operation} ({self.coalesce_key})"
+
+
+class ChangeCursor(models.Model):
+    """Position of ``authz.changes.tail_changes`` in a store's changelog."""
+
+    store_id = models.CharField(max_length=100, unique=True)
+    continuation_token = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.store_id} @ {self.updated_at}"
+
+
+class TupleMirror(models.Model):
+    """A tuple of the OpenFGA store, replicated from its changelog."""
+
+    user = models.CharField(max_length=255)
+    relation = models.CharField(max_length=100)
+    object = models.CharField(max_length=255)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["object", "relation", "user"], name="authz_mirror_tuple_uniq"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["user", "relation"], name="authz_mirror_user_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.relation} {self.object}"
+
+
+class CourseClassAccess(models.Model):
+    """
+    A user who can view a course class through a role (enrollment or role
+    tuple, directly or via a group). Open classes are not listed; they are
+    visible through ``CourseClass.is_open``. Maintained by ``authz.access``.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+"
+    )
+    course_class = models.ForeignKey(
+        "courses.CourseClass", on_delete=models.CASCADE, related_name="accesses"
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "course_class"], name="authz_class_access_uniq"
+            ),
+        ]
@@ -0,0 +1,164 @@
+import hashlib
+
+from django.conf import settings
+from django.db import transaction
+
+from services.openfga.consistency import record_write
+from services.openfga.sync.changeset import TupleChangeSet
+from services.openfga.sync.utils import (
+    delete_all_object_tuples,
+    delete_all_subject_tuples,
+    sync_object_relations,
+    sync_relations,
+    sync_single_type_objects,
+    sync_single_type_subjects,
+)
+
+from .models import TupleOutbox
+
+
+def sync_deferred(rows: dict, changes: TupleChangeSet | None = None):
+    """
+    Sync the rows recorded by a deferred sync (``authz.bulk``), planned from
+    their current database state.
+    """
+    from .bulk import DeferredSync  # authz.bulk submits through this module
+
+    pending = DeferredSync.load(rows)
+    if changes is None:
+        return pending.flush()
+    pending.plan(changes)
+
+
+OPERATIONS = {
+    func.__name__: func
+    for func in (
+        sync_single_type_subjects,
+        sync_single_type_objects,
+        sync_relations,
+        sync_object_relations,
+        delete_all_subject_tuples,
+        delete_all_object_tuples,
+        sync_deferred,
+    )
+}
+
+
+def _dump_value(value):
+    if isinstance(value, dict):
+        return {str(k): _dump_value(v) for k, v in value.items()}
+    if isinstance(value, set):
+        return sorted(str(v) for v in value)
+    return str(value)
+
+
+def _load_value(value):
+    if isinstance(value, dict):
+        return {k: _load_value(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return set(value)
+    return value
+
+
+def _dump_payload(kwargs: dict) -> dict:
+    return {name: _dump_value(value) for name, value in kwargs.items()}
+
+
+def _load_payload(payload: dict) -> dict:
+    return {name: _load_value(value) for name, value in payload.items()}
+
+
+def _coalesce_key(operation: str, payload: dict) -> str:
+    # Desired-state values don't identify the target, everything else does;
+    # for per-relation desired states the managed relations are part of it.
+    parts = []
+    for name, value in sorted(payload.items()):
+        if not name.startswith("desired_"):
+            parts.append(f"{name}={value}")
+        elif isinstance(value, dict):
+            parts.append(f"{name}={sorted(value)}")
+    key = f"{operation}({','.join(parts)})"
+    max_length = TupleOutbox._meta.get_field("coalesce_key").max_length
+    if len(key) > max_length:
+        # Still unique per target, e.g. for the row lists of sync_deferred
+        key = f"{operation}#{hashlib.sha256(key.encode()).hexdigest()}"
+    return key
+
+
+def submit(func, **kwargs):
+    """
+    Run an OpenFGA sync operation from ``services.openfga.sync.utils``.
+
+    With ``OPENFGA_OUTBOX_ENABLED`` the operation is recorded in the outbox
+    inside the current transaction and replicated after commit by a Celery
+    worker; otherwise it runs immediately.
+    """
+    operation = func.__name__
+    if operation not in OPERATIONS:
+        raise ValueError(f"Unsupported outbox operation: {operation}")
+    if not settings.OPENFGA_OUTBOX_ENABLED:
+        return func(**kwargs)
+
+    from .tasks import drain_tuple_outbox
+
+    payload = _dump_payload(kwargs)
+    TupleOutbox.objects.create(
+        operation=operation,
+        coalesce_key=_coalesce_key(operation, payload),
+        payload=payload,
+    )
+    # The worker writes outside this request; its user's reads must not be stale
+    record_write()
+    transaction.on_commit(drain_tuple_outbox.delay)
+
+
+def coalesce(entries: list[TupleOutbox]) -> list[TupleOutbox]:
+    """Keep the latest entry per coalesce key, ordered by that latest entry."""
+    latest: dict[str, TupleOutbox] = {}
+    for entry in entries:
+        latest.pop(entry.coalesce_key, None)
+        latest[entry.coalesce_key] = entry
+    return list(latest.values())
+
+
+def replay(entries: list[TupleOutbox]):
+    """Plan the coalesced entries in order and apply them in one write."""
+    changes = TupleChangeSet()
+    for entry in coalesce(entries):
+        OPERATIONS[entry.operation](changes=changes, **_load_payload(entry.payload))
+    return changes.commit()
+
+
+def replay_isolating(
+    entries: list[TupleOutbox], bisect=lambda error: True
+) -> list[tuple[list[TupleOutbox], Exception]]:
+    """
+    :func:`replay` the entries; when that fails with an error ``bisect``
+    accepts, replay each half of them separately, down to single entries, so
+    one bad entry doesn't hold back the others.
+
+    Returns the failed entries, each with the older entries it superseded,
+    and the error. Other errors are raised.
+    """
+    groups: dict[str, list[TupleOutbox]] = {}
+    for entry in entries:
+        groups.setdefault(entry.coalesce_key, []).append(entry)
+    # In the order of their latest entry, as coalesce() returns them
+    ordered = sorted(groups.values(), key=lambda group: group[-1].pk)
+    failures = []
+
+    def run(groups):
+        try:
+            replay([group[-1] for group in groups])
+        except Exception as e:
+            if not bisect(e):
+                raise
+            if len(groups) == 1:
+                failures.append((groups[0], e))
+                return
+            middle = len(groups) // 2
+            run(groups[:middle])
+            run(groups[middle:])
+
+    run(ordered)
+    return failures
@@ -0,0 +1,207 @@
+"""
+Rebuild the OpenFGA tuples derived from the database.
+
+The signal handlers keep the store in sync one save at a time; this module
+recomputes every derived tuple from the source tables, diffs them against a
+single paginated read of the whole store and applies the delta in bulk.
+Tuples that are not derived from the database (shares, editors, role grants
+made through the course class access API) are never touched, except for
+course class roles when ``prune_roles`` is set.
+"""
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Iterator
+
+from django.contrib.auth import get_user_model
+from openfga_sdk import ReadRequestTupleKey
+from openfga_sdk.client.models import ClientTuple
+
+from courses.models import CourseClass
+from courseware.models import ContentNode
+from enrollment.models import Enrollment
+from enrollment.signals import ENROLLMENT_ROLE_RELATION_MAP
+from services.openfga.relations import (
+    ContentNodeRelation,
+    CourseClassRelation,
+    FileRelation,
+    FolderRelation,
+    GroupRelation,
+    UserRelation,
+)
+from services.openfga.sync.tuples import BulkTupleWriter, read_tuples
+from storage.models import File, Folder
+
+TupleKey = tuple[str, str, str]  # (user, relation, object)
+
+User = get_user_model()
+
+# (object type, relation) -> subject prefix whose tuples are derived from the
+# database. Stored tuples in these slots that the database doesn't produce
+# are deleted.
+MANAGED_RELATIONS: dict[tuple[str, str], str] = {
+    (CourseClassRelation.TYPE, CourseClassRelation.CAN_VIEW): f"{UserRelation.TYPE}:*",
+    (ContentNodeRelation.TYPE, ContentNodeRelation.COURSE_CLASS): "",
+    (ContentNodeRelation.TYPE, ContentNodeRelation.PARENT): "",
+    (FolderRelation.TYPE, FolderRelation.OWNER): "",
+    (FolderRelation.TYPE, FolderRelation.PARENT): "",
+    (FileRelation.TYPE, FileRelation.OWNER): "",
+    (FileRelation.TYPE, FileRelation.PARENT): "",
+    (GroupRelation.TYPE, GroupRelation.MEMBER): f"{UserRelation.TYPE}:",
+}
+
+# Course class roles come from enrollments, but can also be granted directly
+# through the access API, so they are only pruned on request.
+ROLE_RELATIONS: dict[tuple[str, str], str] = {
+    (CourseClassRelation.TYPE, relation): f"{UserRelation.TYPE}:"
+    for relation in ENROLLMENT_ROLE_RELATION_MAP.values()
+}
+
+
+def _course_class_tuples(chunk_size: int) -> Iterator[TupleKey]:
+    open_classes = CourseClass.objects.filter(is_open=True).values_list("pk", flat=True)
+    for pk in open_classes.iterator(chunk_size=chunk_size):
+        yield (
+            f"{UserRelation.TYPE}:*",
+            CourseClassRelation.CAN_VIEW,
+            f"{CourseClassRelation.TYPE}:{pk}",
+        )
+
+
+def _enrollment_tuples(chunk_size: int) -> Iterator[TupleKey]:
+    rows = Enrollment.objects.values_list("user_id", "course_class_id", "role")
+    for user_id, course_class_id, role in rows.iterator(chunk_size=chunk_size):
+        yield (
+            f"{UserRelation.TYPE}:{user_id}",
+            ENROLLMENT_ROLE_RELATION_MAP[role],
+            f"{CourseClassRelation.TYPE}:{course_class_id}",
+        )
+
+
+def _content_node_tuples(chunk_size: int) -> Iterator[TupleKey]:
+    rows = ContentNode.objects.values_list("pk", "course_class_id", "parent_id")
+    for pk, course_class_id, parent_id in rows.iterator(chunk_size=chunk_size):
+        object_key = f"{ContentNodeRelation.TYPE}:{pk}"
+        if course_class_id:
+            yield (
+                f"{CourseClassRelation.TYPE}:{course_class_id}",
+                ContentNodeRelation.COURSE_CLASS,
+                object_key,
+            )
+        if parent_id:
+            yield (
+                f"{ContentNodeRelation.TYPE}:{parent_id}",
+                ContentNodeRelation.PARENT,
+                object_key,
+            )
+
+
+def _storage_tuples(chunk_size: int) -> Iterator[TupleKey]:
+    sources = (
+        (FolderRelation, Folder.objects.values_list("pk", "owner_id", "parent_id")),
+        (FileRelation, File.objects.values_list("pk", "owner_id", "folder_id")),
+    )
+    for relations, rows in sources:
+        for pk, owner_id, parent_id in rows.iterator(chunk_size=chunk_size):
+            object_key = f"{relations.TYPE}:{pk}"
+            yield (f"{UserRelation.TYPE}:{owner_id}", relations.OWNER, object_key)
+            if parent_id:
+                yield (f"{FolderRelation.TYPE}:{parent_id}", relations.PARENT, object_key)
+
+
+def _group_member_tuples(chunk_size: int) -> Iterator[TupleKey]:
+    rows = User.groups.through.objects.values_list("user_id", "group_id")
+    for user_id, group_id in rows.iterator(chunk_size=chunk_size):
+        yield (
+            f"{UserRelation.TYPE}:{user_id}",
+            GroupRelation.MEMBER,
+            f"{GroupRelation.TYPE}:{group_id}",
+        )
+
+
+SOURCES: list[Callable[[int], Iterator[TupleKey]]] = [
+    _course_class_tuples,
+    _enrollment_tuples,
+    _content_node_tuples,
+    _storage_tuples,
+    _group_member_tuples,
+]
+
+
+def desired_tuples(chunk_size: int = 2000) -> Iterator[TupleKey]:
+    for source in SOURCES:
+        yield from source(chunk_size)
+
+
+@dataclass
+class ReconcileResult:
+    desired: int = 0
+    scanned: int = 0
+    writes: list[ClientTuple] = field(default_factory=list)
+    deletes: list[ClientTuple] = field(default_factory=list)
+    duration: float = 0.0
+
+
+def _is_managed(key: TupleKey, managed: dict[tuple[str, str], str]) -> bool:
+    user, relation, object_ = key
+    prefix = managed.get((object_.split(":", 1)[0], relation))
+    return prefix is not None and user.startswith(prefix)
+
+
+def reconcile(
+    *,
+    dry_run: bool = False,
+    prune_roles: bool = False,
+    chunk_size: int = 2000,
+    writer: BulkTupleWriter | None = None,
+    progress: Callable[[str, int], None] | None = None,
+) -> ReconcileResult:
+    """
+    Diff the database-derived tuples against the store and apply the delta.
+
+    ``progress(stage, count)`` is called periodically while loading the
+    desired tuples (``"load"``), scanning the store (``"scan"``) and once per
+    write chunk (``"write"``).
+    """
+    start = time.perf_counter()
+    report = progress or (lambda stage, count: None)
+    managed = {**MANAGED_RELATIONS, **(ROLE_RELATIONS if prune_roles else {})}
+    result = ReconcileResult()
+
+    missing: set[TupleKey] = set()
+    for key in desired_tuples(chunk_size):
+        missing.add(key)
+        if len(missing) % chunk_size == 0:
+            report("load", len(missing))
+    result.desired = len(missing)
+    report("load", result.desired)
+
+    for t in read_tuples(ReadRequestTupleKey()):
+        result.scanned += 1
+        key = (t.user, t.relation, t.object)
+        if key in missing:
+            missing.discard(key)
+        elif _is_managed(key, managed):
+            result.deletes.append(t)
+        if result.scanned % chunk_size == 0:
+            report("scan", result.scanned)
+    report("scan", result.scanned)
+
+    result.writes = [
+        ClientTuple(user=user, relation=relation, object=object_)
+        for user, relation, object_ in sorted(missing)
+    ]
+    if not dry_run and (result.writes or result.deletes):
+        writer = writer or BulkTupleWriter()
+        lock = threading.Lock()
+        written = 0
+
+        def on_chunk(chunk):
+            nonlocal written
+            with lock:
+                written += chunk.writes + chunk.deletes
+                report("write", written)
+
+        writer.write(result.writes, result.deletes, on_chunk=on_chunk)
+    result.duration = time.perf_counter() - start
+    return result
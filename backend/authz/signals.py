@@ -0,0 +1,39 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from enrollment.models import Enrollment
+from services.openfga.invalidation import publish, tuples_changed
+
+from .access import refresh_class, refresh_objects
+from .models import CourseClassAccess
+
+
+@receiver(tuples_changed, dispatch_uid="refresh_access_index")
+def refresh_access_index(sender, object_keys, **kwargs):
+    # Only the process tailing the changelog publishes; the events other
+    # processes receive through poll() must not refresh the index again.
+    if sender is not publish or object_keys is None:
+        return
+    refresh_objects(object_keys)
+
+
+@receiver(post_save, sender=Enrollment, dispatch_uid="index_enrollment_access")
+def index_enrollment_access(sender, instance: Enrollment, created, **kwargs):
+    keys = (instance.user_id, instance.course_class_id)
+    # Set by Enrollment.from_db and below; absent on instances never saved before
+    saved_keys = None if created else getattr(instance, "_saved_keys", None)
+    instance._saved_keys = keys
+    if keys == saved_keys:
+        return
+    CourseClassAccess.objects.get_or_create(
+        user_id=instance.user_id, course_class_id=instance.course_class_id
+    )
+    if saved_keys is not None and saved_keys[1] is not None:
+        # The old user may still hold a role tuple; recompute instead of deleting
+        refresh_class(saved_keys[1])
+
+
+@receiver(post_delete, sender=Enrollment, dispatch_uid="unindex_enrollment_access")
+def unindex_enrollment_access(sender, instance: Enrollment, **kwargs):
+    # A role tuple may still grant access; recompute instead of deleting
+    refresh_class(instance.course_class_id)
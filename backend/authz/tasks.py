@@ -0,0 +1,112 @@
+import logging
+from datetime import timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from services.openfga.breaker import CircuitOpenError, is_failure
+
+from .changes import tail_changes
+from .models import TupleOutbox
+from .outbox import replay_isolating
+
+logger = logging.getLogger(__name__)
+
+
+# How long a drain may hold the entries it claimed before others retry them
+LEASE = timedelta(minutes=5)
+
+
+def _claim(batch_size: int) -> list[TupleOutbox]:
+    """Lease the oldest pending entries; the row locks end with the claim."""
+    now = timezone.now()
+    with transaction.atomic():
+        entries = list(
+            TupleOutbox.objects.select_for_update(skip_locked=True)
+            .filter(processed_at__isnull=True, failed_at__isnull=True)
+            .exclude(locked_until__gt=now)
+            .order_by("id")[:batch_size]
+        )
+        TupleOutbox.objects.filter(pk__in=[entry.pk for entry in entries]).update(
+            locked_until=now + LEASE
+        )
+    return entries
+
+
+def _record_failure(entries: list[TupleOutbox], error: Exception):
+    now = timezone.now()
+    pks = [entry.pk for entry in entries]
+    TupleOutbox.objects.filter(pk__in=pks).update(
+        attempts=F("attempts") + 1, last_error=str(error), locked_until=None
+    )
+    failed = TupleOutbox.objects.filter(
+        pk__in=pks, attempts__gte=settings.OPENFGA_OUTBOX_MAX_ATTEMPTS
+    ).update(failed_at=now)
+    if failed:
+        logger.error(
+            f"Gave up on {failed} OpenFGA outbox entries after "
+            f"{settings.OPENFGA_OUTBOX_MAX_ATTEMPTS} attempts: {error}"
+        )
+
+
+@shared_task
+def drain_tuple_outbox(batch_size: int | None = None) -> int:
+    """
+    Replicate pending outbox entries to OpenFGA, oldest first.
+
+    Entries are leased with ``SKIP LOCKED`` so concurrent workers drain
+    disjoint batches, and replayed after the claim's transaction ends. A
+    batch that OpenFGA rejects is split until the entries at fault are
+    found; those are retried by later runs and set aside as failed after
+    ``OPENFGA_OUTBOX_MAX_ATTEMPTS``. When OpenFGA is unavailable the batch
+    stays pending without using up attempts (at-least-once delivery).
+    """
+    batch_size = batch_size or settings.OPENFGA_OUTBOX_BATCH_SIZE
+    entries = _claim(batch_size)
+    if not entries:
+        return 0
+    try:
+        # Outages fail every entry alike; only rejections are narrowed down
+        failures = replay_isolating(
+            entries,
+            bisect=lambda e: not isinstance(e, CircuitOpenError) and not is_failure(e),
+        )
+    except Exception as e:
+        logger.error(f"Failed to drain OpenFGA tuple outbox: {e}", exc_info=True)
+        TupleOutbox.objects.filter(pk__in=[entry.pk for entry in entries]).update(
+            last_error=str(e), locked_until=None
+        )
+        raise
+
+    failed_pks = set()
+    for group, error in failures:
+        logger.warning(f"OpenFGA outbox entry {group[-1]} failed: {error}")
+        _record_failure(group, error)
+        failed_pks.update(entry.pk for entry in group)
+    done = [entry.pk for entry in entries if entry.pk not in failed_pks]
+    TupleOutbox.objects.filter(pk__in=done).update(
+        processed_at=timezone.now(), attempts=F("attempts") + 1, locked_until=None
+    )
+
+    logger.info(f"Replicated {len(done)} outbox entries to OpenFGA")
+    if len(entries) == batch_size:
+        drain_tuple_outbox.delay(batch_size)
+    return len(done)
+
+
+@shared_task
+def prune_tuple_outbox() -> int:
+    """Delete entries processed more than ``OPENFGA_OUTBOX_RETENTION_DAYS`` ago."""
+    cutoff = timezone.now() - timedelta(days=settings.OPENFGA_OUTBOX_RETENTION_DAYS)
+    count, _ = TupleOutbox.objects.filter(processed_at__lt=cutoff).delete()
+    logger.info(f"Pruned {count} processed outbox entries")
+    return count
+
+
+@shared_task
+def tail_tuple_changes(max_pages: int = 50) -> int:
+    """Mirror new OpenFGA changelog entries and publish cache invalidations."""
+    return tail_changes(max_pages=max_pages)
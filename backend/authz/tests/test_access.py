@@ -0,0 +1,112 @@
+from importlib import import_module
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from courses.models import Course, CourseClass
+from courses.queries import get_user_classes, get_visible_classes
+from enrollment.models import Enrollment, EnrollmentRole
+from services.openfga.invalidation import publish
+
+from ..bulk import update
+from ..models import CourseClassAccess, TupleMirror
+
+backfill = import_module("authz.migrations.0004_backfill_access_index")
+
+User = get_user_model()
+
+
+# Record FGA syncs in the outbox instead of calling OpenFGA
+@override_settings(OPENFGA_OUTBOX_ENABLED=True)
+class AccessIndexTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="student@example.com", password="pass")
+        self.other = User.objects.create_user(email="other@example.com", password="pass")
+        course = Course.objects.create(name="Course", description="")
+        self.course_class = CourseClass.objects.create(course=course, name="Closed")
+        self.open_class = CourseClass.objects.create(course=course, name="Open", is_open=True)
+
+    def test_enrollment_is_indexed_immediately(self):
+        Enrollment.objects.create(
+            user=self.user, course_class=self.course_class, role=EnrollmentRole.STUDENT
+        )
+        self.assertEqual(list(get_user_classes(self.user)), [self.course_class])
+        self.assertEqual(
+            set(get_visible_classes(self.user)), {self.course_class, self.open_class}
+        )
+        self.assertEqual(list(get_visible_classes(self.other)), [self.open_class])
+
+    def test_role_tuples_via_groups(self):
+        class_key = f"course_class:{self.course_class.pk}"
+        for user, relation, object_ in [
+            ("group:1#member", "editor", class_key),
+            ("group:2#member", "member", "group:1"),
+            (f"user:{self.other.pk}", "member", "group:2"),
+        ]:
+            TupleMirror.objects.create(user=user, relation=relation, object=object_)
+
+        # Changing the nested group refreshes the classes it grants roles on
+        publish(["group:2"])
+        self.assertEqual(
+            set(get_visible_classes(self.other)), {self.course_class, self.open_class}
+        )
+        # Not enrolled: a granted class isn't one of "my classes"
+        self.assertFalse(get_user_classes(self.other).exists())
+
+        TupleMirror.objects.filter(object="group:2").delete()
+        publish(["group:2"])
+        self.assertFalse(CourseClassAccess.objects.filter(user=self.other).exists())
+
+    def test_deleted_enrollment_is_unindexed(self):
+        enrollment = Enrollment.objects.create(
+            user=self.user, course_class=self.course_class, role=EnrollmentRole.STUDENT
+        )
+        enrollment.delete()
+        self.assertFalse(get_user_classes(self.user).exists())
+
+    def test_moved_enrollment_leaves_old_class(self):
+        other_class = CourseClass.objects.create(
+            course=self.course_class.course, name="Other"
+        )
+        enrollment = Enrollment.objects.create(
+            user=self.user, course_class=self.course_class, role=EnrollmentRole.STUDENT
+        )
+        enrollment.course_class = other_class
+        enrollment.save()
+        self.assertEqual(
+            list(get_visible_classes(self.user)), [self.open_class, other_class]
+        )
+
+        enrollment.user = self.other
+        enrollment.save()
+        self.assertEqual(list(get_visible_classes(self.user)), [self.open_class])
+
+        update(Enrollment.objects.filter(pk=enrollment.pk), course_class=self.course_class)
+        self.assertEqual(
+            list(
+                CourseClassAccess.objects.values_list("user_id", "course_class_id")
+            ),
+            [(self.other.pk, self.course_class.pk)],
+        )
+
+    def test_backfill_migration(self):
+        Enrollment.objects.create(
+            user=self.user, course_class=self.course_class, role=EnrollmentRole.STUDENT
+        )
+        for user, relation, object_ in [
+            ("group:1#member", "teacher", f"course_class:{self.open_class.pk}"),
+            (f"user:{self.other.pk}", "member", "group:1"),
+            # Gone user, and a grant on something other than a class
+            ("user:999", "student", f"course_class:{self.course_class.pk}"),
+            (f"user:{self.other.pk}", "viewer", "content_node:999"),
+        ]:
+            TupleMirror.objects.create(user=user, relation=relation, object=object_)
+        CourseClassAccess.objects.all().delete()
+
+        backfill.fill_access_index(apps, None)
+
+        self.assertEqual(
+            set(CourseClassAccess.objects.values_list("user_id", "course_class_id")),
+            {(self.user.pk, self.course_class.pk), (self.other.pk, self.open_class.pk)},
+        )
@@ -0,0 +1,66 @@
+import weakref
+from importlib import import_module
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TransactionTestCase
+
+import services.openfga.fake as fga_fake
+import services.openfga.sync.utils as fga_utils
+from services.openfga.metrics import InstrumentedClient
+
+from ..benchmark import ENDPOINTS, EndpointResult, Scale, run
+
+fga_async = import_module("services.openfga.async")
+
+User = get_user_model()
+
+
+class BenchmarkTests(TransactionTestCase):
+    def setUp(self):
+        self.fake = fga_fake.FakeOpenFgaClient.from_file()
+        for patcher in (
+            # The process client proxy, as the smoke tests rebind fga_sync.client
+            patch.object(fga_utils.client, "_client", InstrumentedClient(self.fake)),
+            patch.object(fga_fake, "_fake", self.fake),
+            patch.object(fga_async, "FAKE_CLIENT", True),
+            patch.object(fga_async, "_clients", weakref.WeakKeyDictionary()),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_run_measures_every_endpoint_and_cleans_up(self):
+        scale = Scale(
+            users=10,
+            classes=2,
+            enrollments=5,
+            modules=2,
+            lessons=2,
+            folder_depth=2,
+            folder_fanout=2,
+            files=3,
+        )
+        results = run(scale, repeat=3, warmup=1, cold=True)
+
+        self.assertEqual([r.name for r in results], list(ENDPOINTS))
+        for result in results:
+            summary = result.summary()
+            # File URLs are signed by the S3 storage, which needs a bucket
+            if result.name != "files":
+                self.assertEqual(summary["statuses"], [200], result.name)
+            self.assertEqual(summary["requests"], 3)
+            self.assertGreater(summary["queries"], 0)
+            self.assertGreater(summary["fga_calls"], 0, result.name)
+            self.assertLessEqual(summary["p50_ms"], summary["max_ms"])
+
+        # Rows rolled back, tuples deleted
+        self.assertFalse(User.objects.exists())
+        self.assertEqual(self.fake.read().tuples, [])
+
+
+class EndpointResultTests(SimpleTestCase):
+    def test_nearest_rank_percentiles(self):
+        result = EndpointResult("GET x", latencies=[5, 1, 4, 2, 3])
+        self.assertEqual(
+            [result.percentile(q) for q in (1, 20, 50, 90, 100)], [1, 1, 3, 5, 5]
+        )
@@ -0,0 +1,176 @@
+from unittest.mock import Mock, patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+import services.openfga.sync.tuples as fga_tuples
+from courses.models import Course, CourseClass
+from enrollment.models import Enrollment, EnrollmentRole
+from storage.models import Folder
+
+from ..bulk import bulk_create_enrollments, bulk_create_files, deferred_sync, update
+from ..models import CourseClassAccess, TupleOutbox
+from ..outbox import replay
+
+User = get_user_model()
+
+
+def tuples(*keys):
+    return [Mock(key=Mock(user=u, relation=r, object=o)) for u, r, o in keys]
+
+
+def drain_deferred():
+    """Replay the deferred syncs recorded in the outbox, as the drain would."""
+    entries = TupleOutbox.objects.filter(operation="sync_deferred")
+    replay(list(entries))
+    return entries.count()
+
+
+# Per-row syncs are recorded in the outbox too, but only the deferred ones are
+# replayed
+@override_settings(OPENFGA_OUTBOX_ENABLED=True)
+class DeferredSyncTests(TestCase):
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(email=f"user{i}@example.com", password="pass")
+            for i in range(3)
+        ]
+        course = Course.objects.create(name="Course", description="")
+        self.course_class = CourseClass.objects.create(course=course, name="Class")
+        self.class_key = f"course_class:{self.course_class.pk}"
+        self.client = Mock()
+        self.client.read.return_value = Mock(tuples=[], continuation_token=None)
+        patcher = patch.object(fga_tuples, "client", self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def written(self):
+        keys = set()
+        for call in self.client.write.call_args_list:
+            body = call[0][0]
+            keys |= {("write", t.user, t.relation, t.object) for t in body.writes or []}
+            keys |= {("delete", t.user, t.relation, t.object) for t in body.deletes or []}
+        return keys
+
+    def test_roster_import_is_one_read_and_one_write(self):
+        stale, current = self.users[2], self.users[1]
+        self.client.read.return_value = Mock(
+            tuples=tuples(
+                (f"user:{stale.pk}", "guest", self.class_key),
+                (f"user:{current.pk}", "student", self.class_key),
+                # Granted through the access API, not derived from enrollments
+                (f"user:{stale.pk}", "editor", self.class_key),
+            ),
+            continuation_token=None,
+        )
+        bulk_create_enrollments(
+            [
+                Enrollment(user=user, course_class=self.course_class, role=EnrollmentRole.STUDENT)
+                for user in self.users
+            ]
+        )
+        self.client.read.assert_not_called()
+        self.assertEqual(drain_deferred(), 1)
+
+        self.assertEqual(self.client.read.call_count, 1)
+        self.assertEqual(self.client.write.call_count, 1)
+        self.assertEqual(
+            self.written(),
+            {
+                ("write", f"user:{self.users[0].pk}", "student", self.class_key),
+                ("write", f"user:{stale.pk}", "student", self.class_key),
+                ("delete", f"user:{stale.pk}", "guest", self.class_key),
+            },
+        )
+        self.assertEqual(
+            CourseClassAccess.objects.filter(course_class=self.course_class).count(), 3
+        )
+
+    def test_signals_are_deferred_inside_the_block(self):
+        outbox_size = TupleOutbox.objects.count()
+        with deferred_sync():
+            folder = Folder.objects.create(name="Docs", owner=self.users[0])
+            Enrollment.objects.create(user=self.users[0], course_class=self.course_class)
+            self.assertEqual(TupleOutbox.objects.count(), outbox_size)
+        # One entry for the block, recorded in its transaction
+        self.assertEqual(TupleOutbox.objects.count(), outbox_size + 1)
+        self.assertEqual(drain_deferred(), 1)
+
+        # Only the class is read; the new folder has no tuples yet
+        self.assertEqual(self.client.read.call_count, 1)
+        self.assertEqual(
+            self.written(),
+            {
+                ("write", f"user:{self.users[0].pk}", "owner", f"folder:{folder.pk}"),
+                ("write", f"user:{self.users[0].pk}", "guest", self.class_key),
+            },
+        )
+
+    def test_queryset_update_syncs_updated_rows(self):
+        Enrollment.objects.create(
+            user=self.users[0], course_class=self.course_class, role=EnrollmentRole.GUEST
+        )
+        self.client.read.return_value = Mock(
+            tuples=tuples((f"user:{self.users[0].pk}", "guest", self.class_key)),
+            continuation_token=None,
+        )
+        count = update(Enrollment.objects.all(), role=EnrollmentRole.TEACHER)
+        drain_deferred()
+
+        self.assertEqual(count, 1)
+        self.assertEqual(
+            self.written(),
+            {
+                ("write", f"user:{self.users[0].pk}", "teacher", self.class_key),
+                ("delete", f"user:{self.users[0].pk}", "guest", self.class_key),
+            },
+        )
+
+    def test_nothing_is_synced_when_the_block_fails(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError), deferred_sync():
+                Folder.objects.create(name="Docs", owner=self.users[0])
+                raise RuntimeError
+        self.assertEqual(callbacks, [])
+        self.assertFalse(Folder.objects.exists())
+        self.assertEqual(drain_deferred(), 0)
+        self.client.write.assert_not_called()
+
+    def test_ignore_conflicts_needs_keys(self):
+        with self.assertRaisesMessage(ValueError, "not supported for File"):
+            bulk_create_files([], ignore_conflicts=True)
+
+        Enrollment.objects.create(
+            user=self.users[0], course_class=self.course_class, role=EnrollmentRole.GUEST
+        )
+        self.client.read.return_value = Mock(
+            tuples=tuples((f"user:{self.users[0].pk}", "guest", self.class_key)),
+            continuation_token=None,
+        )
+        bulk_create_enrollments(
+            [
+                Enrollment(user=user, course_class=self.course_class, role=EnrollmentRole.GUEST)
+                for user in self.users[:2]
+            ],
+            ignore_conflicts=True,
+        )
+        drain_deferred()
+        # The existing enrollment is diffed, not written again
+        self.assertEqual(
+            self.written(), {("write", f"user:{self.users[1].pk}", "guest", self.class_key)}
+        )
+
+    @override_settings(OPENFGA_OUTBOX_ENABLED=False)
+    def test_without_outbox_synced_after_commit(self):
+        self.client.write.side_effect = RuntimeError("OpenFGA is down")
+        with self.assertLogs(level="ERROR"):
+            with self.captureOnCommitCallbacks(execute=True):
+                with deferred_sync():
+                    folder = Folder.objects.create(name="Docs", owner=self.users[0])
+                self.client.write.assert_not_called()
+        # Written after commit; the failure is logged, the request goes on
+        self.assertEqual(
+            self.written(),
+            {("write", f"user:{self.users[0].pk}", "owner", f"folder:{folder.pk}")},
+        )
+        self.assertFalse(TupleOutbox.objects.filter(operation="sync_deferred").exists())
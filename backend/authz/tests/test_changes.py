@@ -0,0 +1,68 @@
+from unittest.mock import Mock, patch
+from django.test import TestCase
+
+from .. import changes
+from ..models import ChangeCursor, TupleMirror
+
+
+def change(operation, user, relation, object_):
+    return Mock(
+        tuple_key=Mock(user=user, relation=relation, object=object_),
+        operation=f"TUPLE_OPERATION_{operation}",
+    )
+
+
+class TailChangesTests(TestCase):
+    def setUp(self):
+        self.client_mock = Mock()
+        self.client_mock.get_store_id.return_value = "store-1"
+        patcher = patch.object(changes, "client", self.client_mock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        publish_patcher = patch.object(changes, "publish")
+        self.publish = publish_patcher.start()
+        self.addCleanup(publish_patcher.stop)
+
+    def test_mirrors_changes_and_stores_cursor(self):
+        TupleMirror.objects.create(user="user:9", relation="owner", object="file:9")
+        self.client_mock.read_changes.side_effect = [
+            Mock(
+                changes=[
+                    change("WRITE", "user:1", "owner", "file:1"),
+                    change("WRITE", "user:2", "viewer", "file:1"),
+                    change("DELETE", "user:2", "viewer", "file:1"),
+                    change("DELETE", "user:9", "owner", "file:9"),
+                ],
+                continuation_token="t1",
+            ),
+            Mock(changes=[], continuation_token="t1"),
+        ]
+
+        self.assertEqual(changes.tail_changes(), 4)
+
+        self.assertEqual(
+            list(TupleMirror.objects.values_list("user", "relation", "object")),
+            [("user:1", "owner", "file:1")],
+        )
+        self.assertEqual(ChangeCursor.objects.get().continuation_token, "t1")
+        published = set(self.publish.call_args_list[0][0][0])
+        self.assertEqual(published, {"file:1", "file:9"})
+
+    def test_resumes_from_cursor(self):
+        ChangeCursor.objects.create(store_id="store-1", continuation_token="t5")
+        self.client_mock.read_changes.return_value = Mock(changes=[], continuation_token="t5")
+        changes.tail_changes()
+        options = self.client_mock.read_changes.call_args[0][1]
+        self.assertEqual(options["continuation_token"], "t5")
+
+    def test_store_change_resets_mirror(self):
+        ChangeCursor.objects.create(store_id="old-store", continuation_token="t5")
+        TupleMirror.objects.create(user="user:9", relation="owner", object="file:9")
+        self.client_mock.read_changes.return_value = Mock(changes=[], continuation_token="t0")
+        changes.tail_changes()
+        self.assertFalse(TupleMirror.objects.exists())
+        self.assertEqual(
+            list(ChangeCursor.objects.values_list("store_id", flat=True)), ["store-1"]
+        )
+        options = self.client_mock.read_changes.call_args_list[0][0][1]
+        self.assertNotIn("continuation_token", options)
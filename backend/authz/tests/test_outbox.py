@@ -0,0 +1,213 @@
+from datetime import timedelta
+from unittest.mock import Mock, patch
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from openfga_sdk.exceptions import ServiceException, ValidationException
+from openfga_sdk.models.consistency_preference import ConsistencyPreference
+
+from services.openfga.consistency import consistency_scope, preference
+from services.openfga.sync import tuples as fga_tuples
+from services.openfga.sync import utils as fga_utils
+from services.openfga.sync.utils import (
+    delete_all_subject_tuples,
+    sync_single_type_subjects,
+)
+
+from ..models import TupleOutbox
+from ..outbox import coalesce, replay, submit
+from ..tasks import drain_tuple_outbox, prune_tuple_outbox
+
+
+def make_read_response(tuples):
+    return Mock(
+        tuples=[Mock(key=Mock(user=u, relation=r, object=o)) for u, r, o in tuples],
+        continuation_token=None,
+    )
+
+
+class OutboxSubmitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(OPENFGA_OUTBOX_ENABLED=True)
+    def test_submit_records_entry_and_drains_on_commit(self):
+        with (
+            patch("authz.tasks.drain_tuple_outbox.delay") as delay,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            submit(
+                sync_single_type_subjects,
+                object_key="folder:1",
+                subject_type="user",
+                relation="owner",
+                desired_subject_ids={"2"},
+            )
+        entry = TupleOutbox.objects.get()
+        self.assertEqual(entry.operation, "sync_single_type_subjects")
+        self.assertEqual(entry.payload["desired_subject_ids"], ["2"])
+        self.assertNotIn("desired_subject_ids", entry.coalesce_key)
+        delay.assert_called_once()
+
+    @override_settings(OPENFGA_OUTBOX_ENABLED=True)
+    @patch("authz.tasks.drain_tuple_outbox.delay", Mock())
+    def test_submit_counts_as_a_write_of_the_request(self):
+        request = Mock(user=Mock(pk=1, is_authenticated=True))
+        with consistency_scope(request):
+            submit(delete_all_subject_tuples, subject_key="user:2")
+            self.assertEqual(preference(), ConsistencyPreference.HIGHER_CONSISTENCY)
+        # The worker's write lands after the request: the next one is consistent too
+        with consistency_scope(request):
+            self.assertEqual(preference(), ConsistencyPreference.HIGHER_CONSISTENCY)
+
+    @override_settings(OPENFGA_OUTBOX_ENABLED=False)
+    def test_submit_inline(self):
+        func = Mock(__name__="sync_relations")
+        with patch.dict("authz.outbox.OPERATIONS", {"sync_relations": func}):
+            submit(func, subject_key="user:1", object_key="course_class:1")
+        func.assert_called_once_with(subject_key="user:1", object_key="course_class:1")
+        self.assertFalse(TupleOutbox.objects.exists())
+
+
+class OutboxReplayTests(TestCase):
+    def setUp(self):
+        self.client_mock = Mock()
+        self.client_mock.read.return_value = make_read_response(
+            [("user:1", "owner", "folder:1"), ("folder:9", "parent", "folder:1")]
+        )
+        patcher_tuples = patch.object(fga_tuples, "client", self.client_mock)
+        patcher_utils = patch.object(fga_utils, "client", self.client_mock)
+        patcher_tuples.start()
+        patcher_utils.start()
+        self.addCleanup(patcher_tuples.stop)
+        self.addCleanup(patcher_utils.stop)
+
+    def make_entry(self, pk, desired_owner_ids):
+        return TupleOutbox(
+            pk=pk,
+            operation=sync_single_type_subjects.__name__,
+            coalesce_key="sync_single_type_subjects(folder:1,owner)",
+            payload={
+                "object_key": "folder:1",
+                "subject_type": "user",
+                "relation": "owner",
+                "desired_subject_ids": desired_owner_ids,
+            },
+        )
+
+    def test_coalesce_keeps_latest(self):
+        first, second = self.make_entry(1, ["2"]), self.make_entry(2, ["3"])
+        self.assertEqual(coalesce([first, second]), [second])
+
+    def test_replay_writes_once(self):
+        replay([self.make_entry(1, ["2"]), self.make_entry(2, ["3"])])
+
+        self.client_mock.write.assert_called_once()
+        body = self.client_mock.write.call_args[0][0]
+        self.assertEqual(
+            [(t.user, t.relation, t.object) for t in body.writes],
+            [("user:3", "owner", "folder:1")],
+        )
+        self.assertEqual(
+            [(t.user, t.relation, t.object) for t in body.deletes],
+            [("user:1", "owner", "folder:1")],
+        )
+
+    def test_replay_overlays_earlier_changes(self):
+        delete_entry = TupleOutbox(
+            pk=1,
+            operation=delete_all_subject_tuples.__name__,
+            coalesce_key="delete_all_subject_tuples(object_key=folder:1)",
+            payload={"object_key": "folder:1"},
+        )
+        replay([delete_entry, self.make_entry(2, ["1"])])
+
+        body = self.client_mock.write.call_args[0][0]
+        # user:1 is deleted then re-added, so only the parent tuple is deleted
+        self.assertIsNone(body.writes)
+        self.assertEqual(
+            [(t.user, t.relation, t.object) for t in body.deletes],
+            [("folder:9", "parent", "folder:1")],
+        )
+
+
+# Entries are recorded by submit(); the drain runs when the tests call it
+@override_settings(OPENFGA_OUTBOX_ENABLED=True, OPENFGA_OUTBOX_MAX_ATTEMPTS=2)
+class DrainOutboxTests(TestCase):
+    def setUp(self):
+        self.client_mock = Mock()
+        self.client_mock.read.return_value = make_read_response([])
+        self.client_mock.write.side_effect = self.write
+        self.written = set()
+        for patcher in (
+            patch.object(fga_tuples, "client", self.client_mock),
+            patch("authz.tasks.drain_tuple_outbox.delay"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def write(self, body):
+        objects = {t.object for t in body.writes or []}
+        if "folder:2" in objects:
+            raise ValidationException(status=400, reason="invalid tuple")
+        self.written |= objects
+
+    def submit(self, *folder_ids):
+        for folder_id in folder_ids:
+            submit(
+                sync_single_type_subjects,
+                object_key=f"folder:{folder_id}",
+                subject_type="user",
+                relation="owner",
+                desired_subject_ids={"1"},
+            )
+
+    def pending(self):
+        return TupleOutbox.objects.filter(processed_at__isnull=True)
+
+    def test_bad_entry_is_isolated_then_set_aside(self):
+        self.submit(*range(5))
+        self.assertEqual(drain_tuple_outbox(), 4)
+        self.assertEqual(self.written, {"folder:0", "folder:1", "folder:3", "folder:4"})
+        bad = self.pending().get()
+        self.assertEqual((bad.attempts, bad.failed_at), (1, None))
+        self.assertIn("invalid tuple", bad.last_error)
+
+        self.assertEqual(drain_tuple_outbox(), 0)
+        bad.refresh_from_db()
+        self.assertIsNotNone(bad.failed_at)
+        # Skipped from then on
+        self.client_mock.write.reset_mock()
+        self.assertEqual(drain_tuple_outbox(), 0)
+        self.client_mock.write.assert_not_called()
+
+    def test_outage_keeps_entries_pending(self):
+        self.submit(1)
+        self.client_mock.write.side_effect = ServiceException(status=503, reason="down")
+        for _ in range(3):
+            with self.assertLogs("authz.tasks", "ERROR"):
+                with self.assertRaises(ServiceException):
+                    drain_tuple_outbox()
+        entry = self.pending().get()
+        self.assertEqual(entry.attempts, 0)
+        self.assertIsNone(entry.failed_at)
+        self.assertIsNone(entry.locked_until)
+
+        self.client_mock.write.side_effect = self.write
+        self.assertEqual(drain_tuple_outbox(), 1)
+
+    def test_leased_entries_are_skipped_and_processed_ones_pruned(self):
+        self.submit(0, 1)
+        leased, done = TupleOutbox.objects.all()
+        leased.locked_until = timezone.now() + timedelta(minutes=1)
+        leased.save()
+        self.assertEqual(drain_tuple_outbox(), 1)
+        self.assertEqual(self.written, {"folder:1"})
+
+        self.assertEqual(prune_tuple_outbox(), 0)
+        TupleOutbox.objects.filter(pk=done.pk).update(
+            processed_at=timezone.now() - timedelta(days=30)
+        )
+        self.assertEqual(prune_tuple_outbox(), 1)
+        self.assertEqual(list(TupleOutbox.objects.all()), [leased])
@@ -0,0 +1,71 @@
+from unittest.mock import Mock, patch
+from django.test import SimpleTestCase
+
+from openfga_sdk.client.models import ClientTuple
+
+from .. import reconcile as reconcile_module
+from ..reconcile import reconcile
+
+DESIRED = [
+    ("user:*", "can_view", "course_class:1"),
+    ("user:1", "student", "course_class:1"),
+    ("user:1", "owner", "folder:1"),
+]
+
+STORED = [
+    ("user:1", "owner", "folder:1"),
+    # Derived slot the database no longer produces
+    ("user:2", "owner", "folder:1"),
+    ("user:*", "can_view", "course_class:2"),
+    # Not derived from the database
+    ("user:3", "viewer", "folder:1"),
+    ("user:4", "editor", "course_class:1"),
+    # Role without enrollment, only pruned on request
+    ("user:5", "teacher", "course_class:1"),
+]
+
+
+class ReconcileTests(SimpleTestCase):
+    def setUp(self):
+        patchers = [
+            patch.object(reconcile_module, "SOURCES", [lambda chunk_size: iter(DESIRED)]),
+            patch.object(
+                reconcile_module,
+                "read_tuples",
+                lambda tuple_key: (
+                    ClientTuple(user=u, relation=r, object=o) for u, r, o in STORED
+                ),
+            ),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.writer = Mock()
+
+    def keys(self, tuples):
+        return sorted((t.user, t.relation, t.object) for t in tuples)
+
+    def test_diff_only_touches_derived_tuples(self):
+        result = reconcile(writer=self.writer)
+        self.assertEqual(
+            self.keys(result.writes),
+            [
+                ("user:*", "can_view", "course_class:1"),
+                ("user:1", "student", "course_class:1"),
+            ],
+        )
+        self.assertEqual(
+            self.keys(result.deletes),
+            [("user:*", "can_view", "course_class:2"), ("user:2", "owner", "folder:1")],
+        )
+        self.writer.write.assert_called_once()
+
+    def test_prune_roles(self):
+        result = reconcile(writer=self.writer, prune_roles=True)
+        self.assertIn(("user:5", "teacher", "course_class:1"), self.keys(result.deletes))
+        self.assertNotIn(("user:4", "editor", "course_class:1"), self.keys(result.deletes))
+
+    def test_dry_run_does_not_write(self):
+        result = reconcile(writer=self.writer, dry_run=True)
+        self.assertEqual(len(result.writes), 2)
+        self.writer.write.assert_not_called()
@@ -0,0 +1,14 @@
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from services.openfga.metrics import snapshot
+
+
+class FGAMetricsView(APIView):
+    """OpenFGA call metrics of the process serving the request."""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(snapshot())
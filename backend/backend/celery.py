@@ -2,6 +2,8 @@ import os
 
 from celery import Celery
 
+from services.openfga.settings import TAIL_CHANGES
+
 RMBQ_BROKER_URI = "{protocol}://{user}:{password}@{host}:{port}{vhost}".format(
     protocol=os.getenv("RBMQ_PROTOCOL"),
     user=os.getenv("RBMQ_USER"),
@@ -19,3 +21,22 @@ app = Celery(
 
 # Find all task in django apps
 app.autodiscover_tasks()
+
+app.conf.beat_schedule = {
+    # Safety net for outbox entries whose on-commit trigger was lost
+    "drain-openfga-tuple-outbox": {
+        "task": "authz.tasks.drain_tuple_outbox",
+        "schedule": 30.0,
+    },
+    "prune-openfga-tuple-outbox": {
+        "task": "authz.tasks.prune_tuple_outbox",
+        "schedule": 3600.0,
+    },
+}
+if TAIL_CHANGES:
+    # Event-driven cache invalidation; use the tail_fga_changes command for
+    # lower latency
+    app.conf.beat_schedule["tail-openfga-tuple-changes"] = {
+        "task": "authz.tasks.tail_tuple_changes",
+        "schedule": 5.0,
+    }
@@ -53,6 +53,7 @@ INSTALLED_APPS = [
     "courseware",
     "enrollment",
     "storage",
+    "authz",
 ]
 
 AUTH_USER_MODEL = "user.User"
@@ -64,6 +65,7 @@ MIDDLEWARE = [
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "services.openfga.middleware.FGARequestScopeMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -94,6 +96,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "backend.wsgi.application"
+ASGI_APPLICATION = "backend.asgi.application"
 
 
 # Database
@@ -194,6 +197,31 @@ EMAIL_PORT = getenv("EMAIL_PORT")
 EMAIL_HOST_USER = getenv("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = getenv("EMAIL_HOST_PASSWORD")
 
+# OpenFGA tuple replication. When enabled, signal handlers record sync
+# operations in the authz outbox and a Celery worker applies them after commit.
+OPENFGA_OUTBOX_ENABLED = getenv("OPENFGA_OUTBOX_ENABLED", "False") == "True"
+OPENFGA_OUTBOX_BATCH_SIZE = int(getenv("OPENFGA_OUTBOX_BATCH_SIZE", "200"))
+# Failed replays of an entry before it is set aside as failed, and days
+# processed entries are kept
+OPENFGA_OUTBOX_MAX_ATTEMPTS = int(getenv("OPENFGA_OUTBOX_MAX_ATTEMPTS", "10"))
+OPENFGA_OUTBOX_RETENTION_DAYS = int(getenv("OPENFGA_OUTBOX_RETENTION_DAYS", "7"))
+
+# Seconds a rendered course content tree stays cached (see courseware.trees)
+CONTENT_TREE_CACHE_TTL = int(getenv("CONTENT_TREE_CACHE_TTL", "3600"))
+
+# OpenFGA invalidation events, cached decisions and content trees must be
+# shared by every process (see services.openfga.invalidation). Without
+# REDIS_URL the cache is process-local, which only DEBUG setups accept once
+# the OpenFGA decision cache or changelog tailer is enabled.
+REDIS_URL = getenv("REDIS_URL")
+CACHES = {
+    "default": (
+        {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": REDIS_URL}
+        if REDIS_URL
+        else {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    ),
+}
+
 
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=120),
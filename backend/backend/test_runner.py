@@ -1,9 +1,15 @@
+import unittest
+from os import getenv
+
 from django.test.runner import DiscoverRunner
-from django.utils import timezone
 from django.conf import settings
 
 from services.s3 import s3_client
-from services.openfga.sync import client, clone_store
+from services.openfga.settings import FAKE_CLIENT
+from services.openfga.sync import clear_store, client, template_store
+
+# Runs sharing a name share the store; give concurrent runs distinct names.
+TEST_STORE_PREFIX = getenv("OPENFGA_TEST_STORE_PREFIX", "test_store")
 
 
 def cleanup_s3_folder(prefix):
@@ -11,20 +17,52 @@ def cleanup_s3_folder(prefix):
     bucket.objects.filter(Prefix=prefix).delete()
 
 
+class FakeStoreResetMixin:
+    """
+    Empty the fake OpenFGA store before each test, as the test database is
+    rolled back after each one; ids reused by later tests would otherwise
+    inherit the earlier tests' tuples.
+    """
+
+    def startTest(self, test):
+        from services.openfga.cache import decision_cache
+        from services.openfga.fake import get_fake_client
+
+        get_fake_client().clear()
+        decision_cache.clear()
+        super().startTest(test)
+
+
 class MyCustomTestRunner(DiscoverRunner):
+    def get_resultclass(self):
+        resultclass = super().get_resultclass()
+        if not FAKE_CLIENT:
+            return resultclass
+        base = resultclass or unittest.TextTestResult
+        return type(f"FakeStoreReset{base.__name__}", (FakeStoreResetMixin, base), {})
+
     def setup_test_environment(self, **kwargs):
-        print("Setting up test environment with a fresh OpenFGA store...\n\n")
-        test_store_name = f"test_store{timezone.now().strftime('%d%m%Y-%H%M%S')}"
-        new_store_id = clone_store(test_store_name)
-        client.set_store_id(new_store_id)
+        print("Setting up test environment with the OpenFGA template store...\n\n")
+        self._store_id = client.get_store_id()
+        self._model_id = client.get_authorization_model_id()
+        # The in-memory fake is its own store
+        if not FAKE_CLIENT:
+            store_id, model_id = template_store(TEST_STORE_PREFIX)
+            client.set_store_id(store_id)
+            client.set_authorization_model_id(model_id)
+        # Left over by an interrupted run
+        clear_store()
         settings.AWS_LOCATION = "test"
         return super().setup_test_environment(**kwargs)
 
     def teardown_test_environment(self, **kwargs):
-        print("Tearing down test environment and deleting test OpenFGA store...\n\n")
-        client.delete_store()
-        print("Deleted test OpenFGA store.\n\n")
-        cleanup_s3_folder("test/")
-        print("Cleaned up S3 test folder.\n\n")
+        print("Tearing down test environment and clearing the OpenFGA test store...\n\n")
+        clear_store()
+        client.set_store_id(self._store_id)
+        client.set_authorization_model_id(self._model_id)
+        print("Cleared OpenFGA test store.\n\n")
+        if settings.AWS_STORAGE_BUCKET_NAME and settings.AWS_ACCESS_KEY_ID:
+            cleanup_s3_folder("test/")
+            print("Cleaned up S3 test folder.\n\n")
 
         return super().teardown_test_environment(**kwargs)
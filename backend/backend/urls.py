@@ -18,12 +18,14 @@ from courses.views import (
     CourseViewSet,
     CourseCategoryViewSet,
     CourseClassViewSet,
+    CourseClassAccessView,
 )
 from enrollment.views import (
     EnrollmentViewSet,
 )
 from courseware.views import ContentNodeViewSet
 from storage.views import FolderViewSet, FileViewSet
+from authz.views import FGAMetricsView
 
 router = DefaultRouter()
 
@@ -53,5 +55,14 @@ urlpatterns = [
         CookieTokenBlacklistView.as_view(),
         name="token_blacklist",
     ),
+    path("api/authz/metrics/", FGAMetricsView.as_view(), name="authz_metrics"),
+    # Async view, ahead of the router's sync route for the same path
+    path(
+        "api/classes/<int:pk>/access/",
+        CourseClassAccessView.as_view(
+            fallback=CourseClassViewSet.as_view({"post": "access"})
+        ),
+        name="course-class-access",
+    ),
     path("api/", include(router.urls)),
 ] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
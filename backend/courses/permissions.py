@@ -1,8 +1,13 @@
+from importlib import import_module
+
 from rest_framework.permissions import BasePermission
-from openfga_sdk.client.models import ClientCheckRequest
 
 from services.openfga.relations import CourseClassRelation, UserRelation
-from services.openfga.sync import client
+from services.openfga.sync.utils import check
+
+FGAAsyncBasePermission = import_module(
+    "services.openfga.async.permissions"
+).FGAAsyncBasePermission
 
 
 class UserCanModifyCourseClass(BasePermission):
@@ -10,13 +15,19 @@ class UserCanModifyCourseClass(BasePermission):
         subject_id = request.user.pk if request.user.is_authenticated else "*"
         subject_key = f"{UserRelation.TYPE}:{subject_id}"
         object_key = f"{CourseClassRelation.TYPE}:{obj.pk}"
-        return client.check(
-            ClientCheckRequest(
-                user=subject_key,
-                relation=CourseClassRelation.CAN_MODIFY,
-                object=object_key,
-            )
-        ).allowed
+        return check(subject_key, CourseClassRelation.CAN_MODIFY, object_key)
+
+
+class UserCanModifyCourseClassAsync(FGAAsyncBasePermission):
+    relation = CourseClassRelation.CAN_MODIFY
+    subject_type = UserRelation.TYPE
+    object_type = CourseClassRelation.TYPE
+
+    def get_subject_id(self, request, view, obj):
+        return request.user.pk if request.user.is_authenticated else "*"
+
+    def get_object_id(self, request, view, obj):
+        return obj.pk
 
 
 class UserCanEditCourseClass(BasePermission):
@@ -24,13 +35,7 @@ class UserCanEditCourseClass(BasePermission):
         subject_id = request.user.pk if request.user.is_authenticated else "*"
         subject_key = f"{UserRelation.TYPE}:{subject_id}"
         object_key = f"{CourseClassRelation.TYPE}:{obj.pk}"
-        return client.check(
-            ClientCheckRequest(
-                user=subject_key,
-                relation=CourseClassRelation.CAN_EDIT,
-                object=object_key,
-            )
-        ).allowed
+        return check(subject_key, CourseClassRelation.CAN_EDIT, object_key)
 
 
 class UserCanViewCourseClass(BasePermission):
@@ -38,10 +43,4 @@ class UserCanViewCourseClass(BasePermission):
         subject_id = request.user.pk if request.user.is_authenticated else "*"
         subject_key = f"{UserRelation.TYPE}:{subject_id}"
         object_key = f"{CourseClassRelation.TYPE}:{obj.pk}"
-        return client.check(
-            ClientCheckRequest(
-                user=subject_key,
-                relation=CourseClassRelation.CAN_VIEW,
-                object=object_key,
-            )
-        ).allowed
+        return check(subject_key, CourseClassRelation.CAN_VIEW, object_key)
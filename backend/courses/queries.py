@@ -1,6 +1,6 @@
-from django.db.models import Q, Exists, OuterRef
+from django.db.models import Q
 
-from enrollment.models import Enrollment
+from authz.access import accessible_class_ids
 
 from .models import Course, CourseCategory, CourseClass
 
@@ -31,12 +31,12 @@ def get_visible_classes(user):
     if user.is_anonymous:
         return CourseClass.objects.filter(is_open=True)
     return CourseClass.objects.filter(
-        Q(is_open=True)
-        | Exists(Enrollment.objects.filter(course_class=OuterRef("pk"), user=user))
+        Q(is_open=True) | Q(pk__in=accessible_class_ids(user))
     )
 
 
 def get_user_classes(user):
+    """Classes the user is enrolled in; access grants alone don't count."""
     return CourseClass.objects.filter(enrollments__user=user)
 
 
@@ -3,6 +3,7 @@ from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 import logging
 
+from authz.outbox import submit
 from services.openfga.sync.utils import (
     delete_all_subject_tuples,
     sync_single_type_subjects,
@@ -26,7 +27,8 @@ def sync_course_class_open_access(sender, instance: CourseClass, created, **kwar
     logger.info(
         f"Syncing CourseClass (id={instance.id}) open access status to OpenFGA. Created: {created}"
     )
-    return sync_single_type_subjects(
+    return submit(
+        sync_single_type_subjects,
         object_key=f"{CourseClassRelation.TYPE}:{instance.id}",
         subject_type=UserRelation.TYPE,
         relation=CourseClassRelation.CAN_VIEW,
@@ -37,4 +39,7 @@ def sync_course_class_open_access(sender, instance: CourseClass, created, **kwar
 @receiver(post_delete, sender=CourseClass, dispatch_uid="cleanup_course_class_in_ofga")
 def cleanup_course_class_in_ofga(sender, instance: CourseClass, **kwargs):
     logger.info(f"Cleaning up CourseClass (id={instance.id}) from OpenFGA on deletion.")
-    delete_all_subject_tuples(object_key=f"{CourseClassRelation.TYPE}:{instance.id}")
+    submit(
+        delete_all_subject_tuples,
+        object_key=f"{CourseClassRelation.TYPE}:{instance.id}",
+    )
@@ -1,4 +1,5 @@
 from functools import partial
+from asgiref.sync import sync_to_async
 from rest_framework.test import APITestCase
 from django.urls import reverse
 from django.contrib.auth import get_user_model
@@ -45,7 +46,7 @@ class CourseClassViewTests(APITestCase):
         self.user = User.objects.create_user(
             email="testuser@example.com", password="testpass123", is_active=True
         )
-        access_token = (
+        self.access_token = access_token = (
             self.client.post(
                 reverse("token_obtain_pair"),
                 data={"email": self.user.email, "password": "testpass123"},
@@ -161,6 +162,48 @@ class CourseClassViewTests(APITestCase):
         )
         self.assertEqual(response.status_code, 403)
 
+    async def test_access_served_async(self):
+        # AsyncClient goes through the ASGI handler, like backend/asgi.py
+        course = await Course.objects.acreate(name="Test Course", description="A test course")
+        course_class = await CourseClass.objects.acreate(
+            course=course,
+            name="Test Class",
+            start_date="2023-01-01",
+            end_date="2023-06-01",
+            is_active=True,
+            is_open=False,
+        )
+        url = reverse("course-class-access", args=[course_class.id])
+        headers = {"Authorization": f"Bearer {self.access_token}"}
+
+        response = await self.async_client.get(url, headers=headers)
+        self.assertEqual(response.status_code, 403)
+
+        await Enrollment.objects.acreate(
+            user=self.user, course_class=course_class, role=EnrollmentRole.TEACHER
+        )
+        response = await self.async_client.get(url, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["teacher"], [str(self.user.pk)])
+
+        # Writes fall back to the DRF action
+        student = await sync_to_async(User.objects.create_user)(
+            email="student@example.com", password="testpass123", is_active=True
+        )
+        response = await self.async_client.post(
+            url,
+            {"student": [student.pk]},
+            content_type="application/json",
+            headers=headers,
+        )
+        self.assertEqual(response.status_code, 200)
+        response = await self.async_client.get(url, headers=headers)
+        self.assertEqual(response.json()["student"], [str(student.pk)])
+
+    async def test_access_requires_authentication(self):
+        response = await self.async_client.get(reverse("course-class-access", args=[1]))
+        self.assertEqual(response.status_code, 401)
+
     def test_my_enrollment_not_found(self):
         course = Course.objects.create(name="Test Course", description="A test course")
         course_class = CourseClass.objects.create(
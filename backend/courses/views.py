@@ -1,3 +1,4 @@
+from importlib import import_module
 from rest_framework import viewsets, mixins, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
@@ -11,7 +12,8 @@ from enrollment.serializers import EnrollmentReadSerializer
 
 from . import pagination, queries
 
-from .permissions import UserCanModifyCourseClass
+from .models import CourseClass
+from .permissions import UserCanModifyCourseClass, UserCanModifyCourseClassAsync
 from .serializers import (
     CourseSerializer,
     CourseCategorySerializer,
@@ -19,11 +21,16 @@ from .serializers import (
     CourseClassWriteSerializer,
 )
 from django.contrib.auth import get_user_model
+from django.http import Http404, JsonResponse
 from user.serializers import UserReadSerializer
 from services.openfga.relations import CourseClassRelation, UserRelation
 from services.openfga.sync.utils import sync_single_type_subjects
 from openfga_sdk import ReadRequestTupleKey
-from services.openfga.sync import client as fga_client
+from services.openfga.sync.tuples import read_tuples
+
+# ``async`` is a keyword, so the async client package can't be imported directly
+fga_async_utils = import_module("services.openfga.async.utils")
+fga_async_views = import_module("services.openfga.async.views")
 
 
 class CourseViewSet(
@@ -113,28 +120,16 @@ class CourseClassViewSet(viewsets.ModelViewSet):
             data=self.get_serializer(enrollment).data, status=status.HTTP_200_OK
         )
 
-    @action(detail=True, methods=["get", "post"], url_path="access")
+    @action(detail=True, methods=["post"], url_path="access")
     def access(self, request, pk=None):
+        """Replace the users of the roles in the payload.
+
+        Reads are served by :class:`CourseClassAccessView`.
+        """
         course_class = self.get_object()
         object_key = f"{CourseClassRelation.TYPE}:{course_class.pk}"
 
-        def list_user_ids(relation: str) -> list[str]:
-            tuples = fga_client.read(
-                ReadRequestTupleKey(object=object_key, relation=relation)
-            ).tuples
-            prefix = f"{UserRelation.TYPE}:"
-            return [t.key.user.removeprefix(prefix) for t in tuples if t.key.user.startswith(prefix)]
-
-        if request.method.lower() == "get":
-            data = {
-                "teacher": list_user_ids(CourseClassRelation.TEACHER),
-                "editor": list_user_ids(CourseClassRelation.EDITOR),
-                "student": list_user_ids(CourseClassRelation.STUDENT),
-                "guest": list_user_ids(CourseClassRelation.GUEST),
-            }
-            return Response(data)
-
-        # POST: push updates for provided roles only (others unchanged)
+        # Push updates for provided roles only (others unchanged)
         payload = request.data or {}
         updated_roles = {}
         for role, relation in (
@@ -180,9 +175,9 @@ class CourseClassViewSet(viewsets.ModelViewSet):
         object_key = f"{CourseClassRelation.TYPE}:{course_class.pk}"
 
         def list_users_for_relation(rel: str):
-            tuples = fga_client.read(ReadRequestTupleKey(object=object_key, relation=rel)).tuples
+            tuples = read_tuples(ReadRequestTupleKey(object=object_key, relation=rel))
             prefix = f"{UserRelation.TYPE}:"
-            ids = [t.key.user.removeprefix(prefix) for t in tuples if t.key.user.startswith(prefix)]
+            ids = [t.user.removeprefix(prefix) for t in tuples if t.user.startswith(prefix)]
             User = get_user_model()
             users = list(User.objects.filter(pk__in=ids))
             return UserReadSerializer(users, many=True).data
@@ -206,3 +201,40 @@ class CourseClassViewSet(viewsets.ModelViewSet):
             desired_subject_ids=desired_ids,
         )
         return Response({"users": list_users_for_relation(relation)})
+
+
+class CourseClassAccessView(fga_async_views.FGAAsyncAPIView):
+    """Users holding each role on a class.
+
+    The four role relations are read concurrently on the async client. Writes
+    fall back to :meth:`CourseClassViewSet.access`.
+    """
+
+    permission_classes = [UserCanModifyCourseClassAsync]
+
+    async def get_object(self, request, pk):
+        try:
+            return await queries.get_all_classes().aget(pk=pk)
+        except CourseClass.DoesNotExist:
+            raise Http404
+
+    async def get(self, request, pk):
+        object_key = f"{CourseClassRelation.TYPE}:{pk}"
+        role_ids = await fga_async_utils.list_subject_ids_by_relation(
+            object_key,
+            [
+                CourseClassRelation.TEACHER,
+                CourseClassRelation.EDITOR,
+                CourseClassRelation.STUDENT,
+                CourseClassRelation.GUEST,
+            ],
+            UserRelation.TYPE,
+        )
+        return JsonResponse(
+            {
+                "teacher": role_ids[CourseClassRelation.TEACHER],
+                "editor": role_ids[CourseClassRelation.EDITOR],
+                "student": role_ids[CourseClassRelation.STUDENT],
+                "guest": role_ids[CourseClassRelation.GUEST],
+            }
+        )
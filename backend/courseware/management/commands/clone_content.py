@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.models import CourseClass
+
+from ...cloning import clone_tree
+
+
+class Command(BaseCommand):
+    help = "Copy the content tree of a course class into new, empty course classes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("source", type=int, help="Course class to copy from.")
+        parser.add_argument("targets", type=int, nargs="+", help="Course classes to fill.")
+
+    def handle(self, *args, **options):
+        class_ids = [options["source"], *options["targets"]]
+        if missing := set(class_ids) - set(
+            CourseClass.objects.filter(pk__in=class_ids).values_list("pk", flat=True)
+        ):
+            raise CommandError(f"Unknown course classes: {sorted(missing)}")
+
+        start = time.monotonic()
+        try:
+            created = clone_tree(options["source"], options["targets"])
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {created} nodes in {len(set(options['targets']))} classes "
+                f"in {time.monotonic() - start:.1f}s"
+            )
+        )
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:25
+
+from django.db import migrations, models
+
+
+def fill_paths(apps, schema_editor):
+    ContentNode = apps.get_model("courseware", "ContentNode")
+    children = {}
+    for pk, parent_id in ContentNode.objects.values_list("pk", "parent_id"):
+        children.setdefault(parent_id, []).append(pk)
+    nodes = []
+    stack = [(pk, "", 0) for pk in children.get(None, [])]
+    while stack:
+        pk, path, depth = stack.pop()
+        nodes.append(ContentNode(pk=pk, path=path, depth=depth))
+        stack.extend((child, f"{path}{pk}/", depth + 1) for child in children.get(pk, []))
+    ContentNode.objects.bulk_update(nodes, ["path", "depth"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('courses', '0001_initial'),
+        ('courseware', '0002_content_tree_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contentnode',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='contentnode',
+            name='path',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='contentnode',
+            index=models.Index(fields=['path'], name='contentnode_path_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.RunPython(fill_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:27
+
+import django.db.models.constraints
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('courses', '0001_initial'),
+        ('courseware', '0003_content_node_path'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='contentnode',
+            unique_together={('content_type', 'object_id')},
+        ),
+        migrations.AddConstraint(
+            model_name='contentnode',
+            constraint=models.UniqueConstraint(deferrable=django.db.models.constraints.Deferrable['DEFERRED'], fields=('course_class', 'parent', 'order'), name='uniq_node_order_per_parent'),
+        ),
+    ]
@@ -2,6 +2,8 @@ from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.db import models
+from django.db.models import F, Max, Value
+from django.db.models.functions import Concat, Substr
 from django.forms import ValidationError
 
 from courses.models import CourseClass
@@ -14,6 +16,62 @@ ALLOWED_CONTENT_TYPES = [
     "lesson",
 ]
 MAX_DEPTH = 3  # e.g., CourseTemplate -> Module -> Lesson
+PATH_SEPARATOR = "/"
+
+
+def tree_paths(nodes) -> dict[int, tuple[str, int]]:
+    """(pk, parent_id) pairs of whole trees -> {pk: (path, depth)}."""
+    children: dict[int | None, list[int]] = {}
+    for pk, parent_id in nodes:
+        children.setdefault(parent_id, []).append(pk)
+    paths = {}
+    stack = [(pk, "", 0) for pk in children.get(None, [])]
+    while stack:
+        pk, path, depth = stack.pop()
+        paths[pk] = (path, depth)
+        subtree_path = f"{path}{pk}{PATH_SEPARATOR}"
+        stack.extend((child, subtree_path, depth + 1) for child in children.get(pk, []))
+    return paths
+
+
+class ContentNodeManager(models.Manager):
+    def set_paths(self, nodes):
+        """
+        Set ``path`` and ``depth`` of nodes about to be bulk created from
+        their saved parents, loading the parents not cached in one query.
+        """
+        missing = {
+            node.parent_id
+            for node in nodes
+            if node.parent_id is not None and not ContentNode.parent.is_cached(node)
+        }
+        parents = self.only("path", "depth").in_bulk(missing) if missing else {}
+        for node in nodes:
+            if node.parent_id is None:
+                node.path, node.depth = "", 0
+                continue
+            parent = node.parent if ContentNode.parent.is_cached(node) else None
+            parent = parent or parents[node.parent_id]
+            node.path, node.depth = parent.subtree_path, parent.depth + 1
+
+    def rebuild_paths(self, course_class_ids) -> int:
+        """
+        Recompute ``path`` and ``depth`` of every node of the classes, e.g.
+        after parents were changed with ``QuerySet.update``. Returns the
+        number of nodes fixed.
+        """
+        rows = self.filter(course_class_id__in=course_class_ids).values_list(
+            "pk", "parent_id", "path", "depth"
+        )
+        stored = {pk: (path, depth) for pk, _, path, depth in rows}
+        paths = tree_paths((pk, parent_id) for pk, parent_id, _, _ in rows)
+        stale = [
+            ContentNode(pk=pk, path=path, depth=depth)
+            for pk, (path, depth) in paths.items()
+            if stored[pk] != (path, depth)
+        ]
+        self.bulk_update(stale, ["path", "depth"], batch_size=1000)
+        return len(stale)
 
 
 class ContentNode(models.Model):
@@ -28,13 +86,56 @@ class ContentNode(models.Model):
         "self", on_delete=models.CASCADE, null=True, blank=True, related_name="children"
     )
     order = models.PositiveIntegerField()
+    # Ancestor pks from the root, each followed by PATH_SEPARATOR ("" for
+    # roots), and the number of ancestors. Maintained by save() and the
+    # manager's set_paths() / rebuild_paths().
+    path = models.CharField(max_length=255, default="", editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    objects = ContentNodeManager()
 
     class Meta:
-        unique_together = [
-            ("course_class", "parent", "order"),
-            ("content_type", "object_id"),
+        unique_together = [("content_type", "object_id")]
+        constraints = [
+            # Checked at commit on PostgreSQL, so siblings can swap orders in
+            # one bulk_update (see ContentNodeReorderSerializer)
+            models.UniqueConstraint(
+                fields=("course_class", "parent", "order"),
+                name="uniq_node_order_per_parent",
+                deferrable=models.Deferrable.DEFERRED,
+            ),
         ]
         ordering = ["order"]
+        indexes = [
+            # Prefix (LIKE 'x/%') lookups of subtrees on PostgreSQL
+            models.Index(
+                fields=["path"],
+                name="contentnode_path_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+        ]
+
+    @property
+    def subtree_path(self) -> str:
+        """Path prefix shared by the node's descendants."""
+        return f"{self.path}{self.pk}{PATH_SEPARATOR}"
+
+    @property
+    def ancestor_ids(self) -> list[int]:
+        return [int(pk) for pk in self.path.split(PATH_SEPARATOR) if pk]
+
+    def get_ancestors(self):
+        """The node's ancestors, root first, in one query."""
+        return ContentNode.objects.filter(pk__in=self.ancestor_ids).order_by("depth")
+
+    def get_descendants(self):
+        """Every node below this one, in one query."""
+        return ContentNode.objects.filter(path__startswith=self.subtree_path)
+
+    def _parent_path(self) -> tuple[str, int]:
+        if self.parent is None:
+            return "", 0
+        return self.parent.subtree_path, self.parent.depth + 1
 
     def clean(self):
         if self.content_type.model not in ALLOWED_CONTENT_TYPES:
@@ -46,18 +147,34 @@ class ContentNode(models.Model):
         if self.parent and self.parent.content_type.model != "module":
             raise ValidationError("Parent node must be of type 'module' or None.")
 
-        # Depth check
-        depth = 0
-        parent = self.parent
-        while parent:
-            depth += 1
-            parent = parent.parent
-            if depth > MAX_DEPTH:
-                raise ValidationError(f"Exceeded maximum depth of {MAX_DEPTH}.")
+        path, depth = self._parent_path()
+        height = 0
+        if self.pk is not None and path != self.path:
+            # Moved: the subtree comes along
+            if self.pk in map(int, filter(None, path.split(PATH_SEPARATOR))):
+                raise ValidationError("A node cannot be moved below itself.")
+            deepest = self.get_descendants().aggregate(Max("depth"))["depth__max"]
+            height = deepest - self.depth if deepest is not None else 0
+        if depth + height > MAX_DEPTH:
+            raise ValidationError(f"Exceeded maximum depth of {MAX_DEPTH}.")
 
     def save(self, *args, **kwargs):
         self.full_clean()
-        return super().save(*args, **kwargs)
+        old_subtree_path = self.subtree_path if self.pk is not None else None
+        old_depth = self.depth
+        self.path, self.depth = self._parent_path()
+        if (update_fields := kwargs.get("update_fields")) is not None:
+            kwargs["update_fields"] = {*update_fields, "path", "depth"}
+        result = super().save(*args, **kwargs)
+        if old_subtree_path is not None and old_subtree_path != self.subtree_path:
+            # Moved: rewrite the descendants' path prefix in one statement
+            ContentNode.objects.filter(path__startswith=old_subtree_path).update(
+                path=Concat(
+                    Value(self.subtree_path), Substr("path", len(old_subtree_path) + 1)
+                ),
+                depth=F("depth") + (self.depth - old_depth),
+            )
+        return result
 
     def __str__(self):
         content_obj_id = self.content_object.id if self.content_object else "None"
@@ -68,6 +185,17 @@ class ContentNode(models.Model):
         )
 
 
+class ContentTreeVersion(models.Model):
+    """
+    Version of a class's content tree, bumped whenever one of its nodes
+    changes (see courseware.trees).
+    """
+
+    # Not a foreign key: nodes deleted along with their class bump it too
+    course_class_id = models.BigIntegerField(primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+
+
 class Module(models.Model):
     content = models.TextField(blank=True)
 
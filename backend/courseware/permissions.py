@@ -1,6 +1,5 @@
 from rest_framework.permissions import BasePermission
-from openfga_sdk.client.models import ClientCheckRequest
-from services.openfga.sync import client as fga
+from services.openfga.sync.utils import check
 from services.openfga.relations import (
     ContentNodeRelation,
     UserRelation,
@@ -13,13 +12,7 @@ class UserCanListClasssNodes(BasePermission):
         subject_id = request.user.pk if request.user.is_authenticated else "*"
         subject_key = f"{UserRelation.TYPE}:{subject_id}"
         object_key = f"{CourseClassRelation.TYPE}:{view.kwargs.get('class_id')}"
-        return fga.check(
-            ClientCheckRequest(
-                user=subject_key,
-                relation=CourseClassRelation.CAN_VIEW,
-                object=object_key,
-            )
-        ).allowed
+        return check(subject_key, CourseClassRelation.CAN_VIEW, object_key)
 
 
 class UserCanCreateClassNodes(BasePermission):
@@ -27,13 +20,7 @@ class UserCanCreateClassNodes(BasePermission):
         subject_id = request.user.pk if request.user.is_authenticated else "*"
         subject_key = f"{UserRelation.TYPE}:{subject_id}"
         object_key = f"{CourseClassRelation.TYPE}:{view.kwargs.get('class_id')}"
-        return fga.check(
-            ClientCheckRequest(
-                user=subject_key,
-                relation=CourseClassRelation.CAN_EDIT,
-                object=object_key,
-            )
-        ).allowed
+        return check(subject_key, CourseClassRelation.CAN_EDIT, object_key)
 
 
 class UserCanViewContentNode(BasePermission):
@@ -43,13 +30,7 @@ class UserCanViewContentNode(BasePermission):
         object_key = f"{ContentNodeRelation.TYPE}:{obj.pk}"
         relation = ContentNodeRelation.CAN_VIEW
 
-        return fga.check(
-            ClientCheckRequest(
-                user=subject_key,
-                relation=relation,
-                object=object_key,
-            )
-        ).allowed
+        return check(subject_key, relation, object_key)
 
 
 class UserCanEditContentNode(BasePermission):
@@ -59,13 +40,7 @@ class UserCanEditContentNode(BasePermission):
         object_key = f"{ContentNodeRelation.TYPE}:{obj.pk}"
         relation = ContentNodeRelation.CAN_EDIT
 
-        return fga.check(
-            ClientCheckRequest(
-                user=subject_key,
-                relation=relation,
-                object=object_key,
-            )
-        ).allowed
+        return check(subject_key, relation, object_key)
 
 
 class UserCanModifyContentNode(BasePermission):
@@ -75,10 +50,4 @@ class UserCanModifyContentNode(BasePermission):
         object_key = f"{ContentNodeRelation.TYPE}:{obj.pk}"
         relation = ContentNodeRelation.CAN_MODIFY
 
-        return fga.check(
-            ClientCheckRequest(
-                user=subject_key,
-                relation=relation,
-                object=object_key,
-            )
-        ).allowed
+        return check(subject_key, relation, object_key)
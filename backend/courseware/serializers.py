@@ -1,8 +1,12 @@
+from collections import Counter
+
 from rest_framework import serializers
 from django.contrib.contenttypes.models import ContentType
 
+from authz.bulk import deferred_sync
 
-from .models import Lesson, Module, ContentNode
+from . import trees
+from .models import MAX_DEPTH, Lesson, Module, ContentNode, tree_paths
 
 
 class ModuleSerializer(serializers.ModelSerializer):
@@ -22,7 +26,7 @@ class ContentNodeListSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = ContentNode
-        fields = "__all__"
+        exclude = ["path", "depth"]
 
 
 class ContentNodeDetailSerializer(serializers.ModelSerializer):
@@ -38,7 +42,7 @@ class ContentNodeDetailSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = ContentNode
-        fields = "__all__"
+        exclude = ["path", "depth"]
 
 
 class ContentNodeWriteSerializer(serializers.ModelSerializer):
@@ -149,11 +153,116 @@ class ContentNodeTreeSerializer(serializers.ModelSerializer):
     content_type = serializers.CharField(source="content_type.model")
     children = serializers.SerializerMethodField()
 
+    # The tree endpoint uses courseware.trees; this serializer queries per node
     def get_children(self, obj):
-        if obj.children.exists():
-            return ContentNodeTreeSerializer(obj.children.all(), many=True).data
-        return []
+        # all() reuses prefetched children, exists() would query again
+        return ContentNodeTreeSerializer(obj.children.all(), many=True).data
 
     class Meta:
         model = ContentNode
-        fields = "__all__"
+        exclude = ["path", "depth"]
+
+
+class ContentNodePlacementSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    parent = serializers.IntegerField(allow_null=True)
+    order = serializers.IntegerField(min_value=0)
+
+
+class ContentNodeReorderSerializer(serializers.Serializer):
+    """
+    New parent and order of several nodes of the class in ``context["class_id"]``.
+
+    The resulting layout of the whole class is validated in memory, then the
+    changed nodes are written with one ``bulk_update`` and the parent tuples
+    of moved nodes synced in one deferred OpenFGA write. The class's nodes
+    are locked while validating, so validation and saving must share a
+    transaction (see ``ContentNodeViewSet.reorder``).
+
+    Two placed nodes can't share a parent and an order. Root nodes already
+    sharing an order (the database doesn't enforce it for roots) are left as
+    they are unless one of them is placed.
+    """
+
+    nodes = ContentNodePlacementSerializer(many=True, allow_empty=False)
+
+    def validate_nodes(self, placements):
+        ids = [placement["id"] for placement in placements]
+        if len(set(ids)) != len(ids):
+            raise serializers.ValidationError("A node can only be placed once.")
+        self._nodes = (
+            ContentNode.objects.select_for_update()
+            .filter(course_class_id=self.context["class_id"])
+            .in_bulk()
+        )
+        if unknown := set(ids) - self._nodes.keys():
+            raise serializers.ValidationError(
+                f"Nodes not in this class: {sorted(unknown)}."
+            )
+
+        self._layout = {
+            pk: (node.parent_id, node.order) for pk, node in self._nodes.items()
+        }
+        module_type = ContentType.objects.get_for_model(Module)
+        for placement in placements:
+            parent_id = placement["parent"]
+            if parent_id is not None:
+                parent = self._nodes.get(parent_id)
+                if parent is None:
+                    raise serializers.ValidationError(
+                        f"Parent {parent_id} is not in this class."
+                    )
+                if parent.content_type_id != module_type.id:
+                    raise serializers.ValidationError(
+                        "Parent node must be of type 'module' or None."
+                    )
+            self._layout[placement["id"]] = (parent_id, placement["order"])
+
+        taken = Counter(self._layout.values())
+        placed = {self._layout[pk] for pk in ids}
+        if clashes := sorted(
+            pk
+            for pk, place in self._layout.items()
+            if place in placed and taken[place] > 1
+        ):
+            raise serializers.ValidationError(
+                f"Nodes {clashes} share a parent and an order."
+            )
+        self._paths = tree_paths(
+            (pk, parent_id) for pk, (parent_id, _) in self._layout.items()
+        )
+        if len(self._paths) != len(self._layout):
+            raise serializers.ValidationError("A node cannot be moved below itself.")
+        if max(depth for _, depth in self._paths.values()) > MAX_DEPTH:
+            raise serializers.ValidationError(f"Exceeded maximum depth of {MAX_DEPTH}.")
+        return placements
+
+    def save(self, **kwargs):
+        changed, moved = [], []
+        for pk, node in self._nodes.items():
+            parent_id, order = self._layout[pk]
+            path, depth = self._paths[pk]
+            if node.parent_id != parent_id:
+                moved.append(pk)
+            if (node.parent_id, node.order, node.path, node.depth) != (
+                parent_id,
+                order,
+                path,
+                depth,
+            ):
+                node.parent_id, node.order, node.path, node.depth = (
+                    parent_id,
+                    order,
+                    path,
+                    depth,
+                )
+                changed.append(node)
+
+        with deferred_sync() as pending:
+            ContentNode.objects.bulk_update(
+                changed, ["parent", "order", "path", "depth"], batch_size=500
+            )
+            # Orders aren't in OpenFGA, only the parents of moved nodes
+            pending.add(ContentNode, moved)
+            trees.bump([self.context["class_id"]])
+        return changed
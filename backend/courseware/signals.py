@@ -1,11 +1,13 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 import logging
 
+from authz.bulk import defer
+from authz.outbox import submit
 from services.openfga.sync.utils import (
     delete_all_subject_tuples,
-    sync_single_type_subjects,
+    sync_object_relations,
 )
 from services.openfga.relations import (
     CourseClassRelation,
@@ -13,36 +15,58 @@ from services.openfga.relations import (
 )
 
 from .models import ContentNode
+from .trees import bump
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
 
 
-@receiver(post_save, sender=ContentNode, dispatch_uid="sync_node_course_class_in_fga")
-def sync_node_course_class_in_fga(sender, instance: ContentNode, created, **kwargs):
-    desired_subject_ids = (
-        {str(instance.course_class_id)} if instance.course_class_id else set()
-    )
-    return sync_single_type_subjects(
+@receiver(post_save, sender=ContentNode, dispatch_uid="sync_node_in_fga")
+def sync_node_in_fga(sender, instance: ContentNode, created, **kwargs):
+    """Sync the node's course class and (at most one) parent in one round trip."""
+    if defer(instance, created):
+        return
+    return submit(
+        sync_object_relations,
         object_key=f"{ContentNodeRelation.TYPE}:{instance.id}",
-        subject_type=CourseClassRelation.TYPE,
-        relation=ContentNodeRelation.COURSE_CLASS,
-        desired_subject_ids=desired_subject_ids,
+        desired_subjects={
+            ContentNodeRelation.COURSE_CLASS: {
+                f"{CourseClassRelation.TYPE}:{instance.course_class_id}"
+            }
+            if instance.course_class_id
+            else set(),
+            ContentNodeRelation.PARENT: {
+                f"{ContentNodeRelation.TYPE}:{instance.parent_id}"
+            }
+            if instance.parent_id
+            else set(),
+        },
     )
 
 
-@receiver(post_save, sender=ContentNode, dispatch_uid="sync_node_parent_in_fga")
-def sync_node_parent_in_fga(sender, instance: ContentNode, created, **kwargs):
-    """Ensure each ContentNode has at most one parent relation in OpenFGA."""
-    desired_parent_ids = {str(instance.parent_id)} if instance.parent_id else set()
-    return sync_single_type_subjects(
+@receiver(post_delete, sender=ContentNode, dispatch_uid="cleanup_node_in_fga")
+def cleanup_node_in_fga(sender, instance: ContentNode, **kwargs):
+    if defer(instance):
+        return
+    return submit(
+        delete_all_subject_tuples,
         object_key=f"{ContentNodeRelation.TYPE}:{instance.id}",
-        subject_type=ContentNodeRelation.TYPE,
-        relation=ContentNodeRelation.PARENT,
-        desired_subject_ids=desired_parent_ids,
     )
 
 
-@receiver(post_delete, sender=ContentNode, dispatch_uid="cleanup_node_in_fga")
-def cleanup_node_in_fga(sender, instance: ContentNode, **kwargs):
-    return delete_all_subject_tuples(f"{ContentNodeRelation.TYPE}:{instance.id}")
+@receiver(pre_save, sender=ContentNode, dispatch_uid="bump_tree_of_moved_node")
+def bump_tree_of_moved_node(sender, instance: ContentNode, **kwargs):
+    """A node moved to another class leaves its old class's tree."""
+    if instance.pk is None:
+        return
+    bump(
+        ContentNode.objects.filter(pk=instance.pk)
+        .exclude(course_class_id=instance.course_class_id)
+        .values_list("course_class_id", flat=True)
+    )
+
+
+@receiver(post_save, sender=ContentNode, dispatch_uid="bump_tree_on_node_save")
+@receiver(post_delete, sender=ContentNode, dispatch_uid="bump_tree_on_node_delete")
+def bump_tree(sender, instance: ContentNode, **kwargs):
+    bump([instance.course_class_id])
@@ -0,0 +1,145 @@
+from io import StringIO
+from unittest.mock import Mock, patch
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+import services.openfga.sync.tuples as fga_tuples
+from authz.models import TupleOutbox
+from authz.outbox import replay
+from courses.models import Course, CourseClass
+from courseware.models import ContentNode, Lesson, Module
+
+from ..cloning import clone_tree
+from ..trees import class_tree, tree_version
+
+
+def _strip(tree, content):
+    """Tree shape, titles, orders and content, without ids."""
+    return [
+        (
+            node["title"],
+            node["order"],
+            node["content_type"],
+            content[(node["content_type"], node["object_id"])],
+            _strip(node["children"], content),
+        )
+        for node in tree
+    ]
+
+
+def drain_deferred():
+    replay(list(TupleOutbox.objects.filter(operation="sync_deferred")))
+
+
+# Syncs go to the outbox; only the clone's deferred sync is replayed
+@override_settings(OPENFGA_OUTBOX_ENABLED=True)
+class CloneTreeTests(TestCase):
+    def setUp(self):
+        course = Course.objects.create(name="C1", description="D")
+        self.source = CourseClass.objects.create(name="C1-A", course=course)
+        self.targets = [
+            CourseClass.objects.create(name=f"C1-{i}", course=course) for i in range(3)
+        ]
+        for i in range(2):
+            module = self.make_node(Module, f"M{i}", order=i, content=f"Module {i}")
+            sub = self.make_node(Module, f"M{i}.0", order=5, parent=module)
+            for j in range(3):
+                self.make_node(Lesson, f"L{i}.{j}", order=j, parent=sub, content=f"L{j}")
+            self.make_node(Lesson, f"L{i}", order=0, parent=module)
+
+        self.fga = Mock()
+        patcher = patch.object(fga_tuples, "client", self.fga)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_node(self, model, title, content="", **kwargs):
+        return ContentNode.objects.create(
+            title=title,
+            content_type=ContentType.objects.get_for_model(model),
+            object_id=model.objects.create(content=content).id,
+            course_class=self.source,
+            **kwargs,
+        )
+
+    def content(self):
+        return {
+            (model._meta.model_name, obj.pk): obj.content
+            for model in (Module, Lesson)
+            for obj in model.objects.all()
+        }
+
+    def test_copies_tree_and_content_objects(self):
+        target_ids = [target.id for target in self.targets]
+        # Content objects per model, then nodes per level, whatever the
+        # number of nodes and targets
+        with self.assertNumQueries(18):
+            created = clone_tree(self.source.id, target_ids)
+        drain_deferred()
+
+        self.assertEqual(created, 12 * 3)
+        content = self.content()
+        expected = _strip(class_tree(self.source.id), content)
+        for target_id in target_ids:
+            self.assertEqual(_strip(class_tree(target_id), content), expected)
+            self.assertNotEqual(tree_version(target_id), 0)
+
+        # New content objects, consistent paths
+        self.assertEqual(Module.objects.count(), 4 * 4)
+        self.assertEqual(Lesson.objects.count(), 8 * 4)
+        self.assertEqual(ContentNode.objects.rebuild_paths(target_ids), 0)
+
+        # Every tuple of the copies, written without reads
+        self.fga.read.assert_not_called()
+        writes = {
+            (t.user, t.relation, t.object)
+            for call in self.fga.write.call_args_list
+            for t in call.args[0].writes
+        }
+        expected_writes = set()
+        for node in ContentNode.objects.filter(course_class_id__in=target_ids):
+            key = f"content_node:{node.pk}"
+            class_key = f"course_class:{node.course_class_id}"
+            expected_writes.add((class_key, "course_class", key))
+            if node.parent_id:
+                expected_writes.add((f"content_node:{node.parent_id}", "parent", key))
+        self.assertEqual(writes, expected_writes)
+
+    def test_refuses_classes_with_content(self):
+        node_count = ContentNode.objects.count()
+        with self.assertRaisesMessage(ValueError, "cloned into itself"):
+            clone_tree(self.source.id, [self.targets[0].id, self.source.id])
+
+        ContentNode.objects.create(
+            title="X",
+            content_type=ContentType.objects.get_for_model(Module),
+            object_id=Module.objects.create().id,
+            course_class=self.targets[1],
+            order=0,
+        )
+        with self.assertRaisesMessage(ValueError, f"[{self.targets[1].id}]"):
+            clone_tree(self.source.id, [t.id for t in self.targets])
+        drain_deferred()
+        self.assertEqual(ContentNode.objects.count(), node_count + 1)
+        self.assertEqual(Module.objects.count(), 5)
+        self.fga.write.assert_not_called()
+
+    def test_refuses_dangling_content(self):
+        node = ContentNode.objects.get(title="L1.2")
+        Lesson.objects.filter(pk=node.object_id).delete()
+        with self.assertRaisesMessage(ValueError, f"Nodes [{node.pk}] have no content"):
+            clone_tree(self.source.id, [self.targets[0].id])
+        self.assertFalse(ContentNode.objects.filter(course_class=self.targets[0]).exists())
+        self.assertEqual(Module.objects.count(), 4)
+
+    def test_command(self):
+        out = StringIO()
+        call_command("clone_content", self.source.id, self.targets[0].id, stdout=out)
+        self.assertIn("Created 12 nodes in 1 classes", out.getvalue())
+        self.assertEqual(len(class_tree(self.targets[0].id)), 2)
+
+        with self.assertRaisesMessage(CommandError, "Unknown course classes: [0]"):
+            call_command("clone_content", self.source.id, 0)
+        with self.assertRaisesMessage(CommandError, "already have content"):
+            call_command("clone_content", self.source.id, self.targets[0].id)
@@ -207,3 +207,84 @@ class ContentNodeCreationTests(TestCase):
             "Content node with this Content type and Object id already exists.",
             str(context.exception),
         )
+
+
+class ContentNodePathTests(TestCase):
+    def setUp(self):
+        course = Course.objects.create(name="Test Course", description="A test course")
+        self.course_class = CourseClass.objects.create(course=course, name="Test Class")
+
+    def module(self, title, parent=None, order=1):
+        return ContentNode.objects.create(
+            title=title,
+            content_object=Module.objects.create(),
+            course_class=self.course_class,
+            parent=parent,
+            order=order,
+        )
+
+    def lesson(self, title, parent, order=1):
+        return ContentNode.objects.create(
+            title=title,
+            content_object=Lesson.objects.create(),
+            course_class=self.course_class,
+            parent=parent,
+            order=order,
+        )
+
+    def test_path_and_depth(self):
+        root = self.module("M1")
+        child = self.module("M1.1", parent=root)
+        lesson = self.lesson("L1.1.1", parent=child)
+        self.assertEqual((root.path, root.depth), ("", 0))
+        self.assertEqual((lesson.path, lesson.depth), (f"{root.pk}/{child.pk}/", 2))
+        lesson.refresh_from_db()
+        self.assertEqual(lesson.ancestor_ids, [root.pk, child.pk])
+
+        with self.assertNumQueries(1):
+            self.assertEqual(list(lesson.get_ancestors()), [root, child])
+        with self.assertNumQueries(1):
+            self.assertEqual({n.pk for n in root.get_descendants()}, {child.pk, lesson.pk})
+
+    def test_move_rewrites_the_subtree(self):
+        first, second = self.module("M1"), self.module("M2", order=2)
+        child = self.module("M1.1", parent=first)
+        lesson = self.lesson("L1.1.1", parent=child)
+
+        child.parent = second
+        child.save()
+        lesson.refresh_from_db()
+        self.assertEqual(lesson.path, f"{second.pk}/{child.pk}/")
+
+        child.parent = None
+        child.order = 3
+        child.save()
+        lesson.refresh_from_db()
+        self.assertEqual((lesson.path, lesson.depth), (f"{child.pk}/", 1))
+        self.assertEqual(list(first.get_descendants()), [])
+
+    def test_invalid_moves(self):
+        root = self.module("M1")
+        child = self.module("M1.1", parent=root)
+        grandchild = self.module("M1.1.1", parent=child)
+        self.lesson("L1.1.1.1", parent=grandchild)
+        other = self.module("M2", order=2)
+
+        root.parent = grandchild
+        with self.assertRaisesMessage(Exception, "cannot be moved below itself"):
+            root.save()
+
+        # The moved subtree is three levels deep already
+        root.refresh_from_db()
+        root.parent = other
+        with self.assertRaisesMessage(Exception, "Exceeded maximum depth"):
+            root.save()
+
+    def test_rebuild_paths(self):
+        root = self.module("M1")
+        child = self.module("M1.1", parent=root)
+        ContentNode.objects.filter(pk=child.pk).update(path="", depth=0)
+        self.assertEqual(ContentNode.objects.rebuild_paths([self.course_class.pk]), 1)
+        child.refresh_from_db()
+        self.assertEqual((child.path, child.depth), (f"{root.pk}/", 1))
+        self.assertEqual(ContentNode.objects.rebuild_paths([self.course_class.pk]), 0)
@@ -0,0 +1,175 @@
+import json
+from functools import partial
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from authz.bulk import bulk_create_content_nodes, update
+from courses.models import Course, CourseClass
+from courseware.models import ContentNode, Lesson, Module
+from courseware.serializers import ContentNodeTreeSerializer
+
+from ..queries import get_root_nodes_by_class_id
+from ..trees import build_tree, class_tree, tree_version
+
+User = get_user_model()
+
+
+class ClassTreeTests(TestCase):
+    def setUp(self):
+        course = Course.objects.create(name="C1", description="D")
+        self.course_class = CourseClass.objects.create(name="C1-A", course=course)
+        self.make_module_node = partial(
+            ContentNode.objects.create,
+            course_class=self.course_class,
+            content_type=ContentType.objects.get_for_model(Module),
+        )
+        self.make_lesson_node = partial(
+            ContentNode.objects.create,
+            course_class=self.course_class,
+            content_type=ContentType.objects.get_for_model(Lesson),
+        )
+
+    def make_tree(self, modules=3, submodules=2, lessons=4):
+        for i in range(modules):
+            module = self.make_module_node(
+                title=f"M{i}", order=modules - i, object_id=Module.objects.create().id
+            )
+            for j in range(submodules):
+                submodule = self.make_module_node(
+                    title=f"M{i}.{j}",
+                    order=j,
+                    object_id=Module.objects.create().id,
+                    parent=module,
+                )
+                for k in range(lessons):
+                    self.make_lesson_node(
+                        title=f"L{i}.{j}.{k}",
+                        order=k,
+                        object_id=Lesson.objects.create().id,
+                        parent=submodule,
+                    )
+
+    def test_matches_recursive_serializer(self):
+        self.make_tree()
+        nodes = get_root_nodes_by_class_id(self.course_class.id)
+        expected = json.loads(
+            json.dumps(ContentNodeTreeSerializer(nodes, many=True).data)
+        )
+
+        with self.assertNumQueries(1):
+            tree = class_tree(str(self.course_class.id))
+
+        self.assertEqual(tree, expected)
+        self.assertEqual([node["title"] for node in tree], ["M2", "M1", "M0"])
+
+    def test_one_query_regardless_of_size(self):
+        self.make_tree(modules=5, submodules=3, lessons=15)
+        with self.assertNumQueries(1):
+            tree = class_tree(self.course_class.id)
+        self.assertEqual(len(tree), 5)
+        self.assertEqual(sum(len(sub["children"]) for sub in tree[0]["children"]), 45)
+
+    def test_other_classes_and_orphans_left_out(self):
+        self.make_tree(modules=1, submodules=1, lessons=1)
+        other = CourseClass.objects.create(name="C1-B", course=self.course_class.course)
+        ContentNode.objects.create(
+            course_class=other,
+            content_type=ContentType.objects.get_for_model(Module),
+            title="Other",
+            order=1,
+            object_id=Module.objects.create().id,
+        )
+        self.assertEqual([node["title"] for node in class_tree(self.course_class.id)], ["M0"])
+        self.assertEqual(build_tree([{"id": 2, "parent": 1, "children": []}]), [])
+
+
+class TreeCacheTests(TestCase):
+    def setUp(self):
+        course = Course.objects.create(name="C1", description="D")
+        self.course_class = CourseClass.objects.create(name="C1-A", course=course)
+        self.admin = User.objects.create_user(
+            email="admin@example.com", password="pass", is_staff=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.url = reverse("content-node-tree", args=[self.course_class.id])
+
+    def make_node(self, **kwargs):
+        return ContentNode.objects.create(
+            course_class=self.course_class,
+            content_type=ContentType.objects.get_for_model(Module),
+            object_id=Module.objects.create().id,
+            **kwargs,
+        )
+
+    def assertBumped(self, *class_ids):
+        versions = [tree_version(class_id) for class_id in class_ids]
+        for class_id, version in zip(class_ids, versions):
+            self.assertNotEqual(version, self.versions.get(class_id, 0))
+        self.versions.update(zip(class_ids, versions))
+
+    def test_node_changes_bump_the_version(self):
+        self.versions = {}
+        class_id = self.course_class.id
+        self.assertEqual(tree_version(class_id), 0)
+        node = self.make_node(title="M1", order=1)
+        self.assertBumped(class_id)
+        node.title = "M1'"
+        node.save()
+        self.assertBumped(class_id)
+
+        other = CourseClass.objects.create(name="C1-B", course=self.course_class.course)
+        node.course_class = other
+        node.save()
+        self.assertBumped(class_id, other.id)
+        node.delete()
+        self.assertBumped(other.id)
+
+    @override_settings(OPENFGA_OUTBOX_ENABLED=True)
+    def test_bulk_changes_bump_the_version(self):
+        module_type = ContentType.objects.get_for_model(Module)
+        self.versions = {}
+        nodes = bulk_create_content_nodes(
+            [
+                ContentNode(
+                    course_class=self.course_class,
+                    content_type=module_type,
+                    object_id=Module.objects.create().id,
+                    title=f"M{i}",
+                    order=i,
+                )
+                for i in range(3)
+            ]
+        )
+        self.assertBumped(self.course_class.id)
+        update(ContentNode.objects.filter(pk=nodes[0].pk), title="Renamed")
+        self.assertBumped(self.course_class.id)
+
+    def test_etag_and_cached_render(self):
+        self.make_node(title="M1", order=1)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([node["title"] for node in response.json()], ["M1"])
+        etag = response.headers["ETag"]
+        self.assertIn("no-cache", response.headers["Cache-Control"])
+
+        # Version read + cache hit; the tree isn't loaded again
+        with patch("courseware.trees.class_tree") as class_tree_mock:
+            response = self.client.get(self.url)
+            class_tree_mock.assert_not_called()
+        self.assertEqual([node["title"] for node in response.json()], ["M1"])
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers["ETag"], etag)
+
+        self.make_node(title="M2", order=2)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+        self.assertEqual([node["title"] for node in response.json()], ["M1", "M2"])
@@ -1,11 +1,20 @@
+from unittest.mock import Mock, patch
+
 from rest_framework.test import APITestCase
 from django.urls import reverse
 from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import IntegrityError
+from django.test import override_settings
+
+import services.openfga.sync.tuples as fga_tuples
+from authz.models import TupleOutbox
+from authz.outbox import replay
 
 from enrollment.models import Enrollment, EnrollmentRole
 from courses.models import Course, CourseClass
 
-from ..models import ContentNode
+from ..models import ContentNode, Lesson, Module
 
 User = get_user_model()
 
@@ -157,3 +166,131 @@ class ContentNodeViewTests(APITestCase):
         url = reverse("content-node-list", args=[new_class.id])
         resp = self.client.post(url, payload, format="json")
         self.assertEqual(resp.status_code, 403)
+
+
+# Syncs go to the outbox; only the reorder's deferred sync is replayed
+@override_settings(OPENFGA_OUTBOX_ENABLED=True)
+class ContentNodeReorderTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            email="admin@example.com", password="pass123", is_staff=True
+        )
+        self.client.force_authenticate(self.admin)
+        course = Course.objects.create(name="C1", description="D")
+        self.cls = CourseClass.objects.create(name="C1-A", course=course)
+        self.url = reverse("content-node-reorder", args=[self.cls.id])
+
+        self.modules = [self.make_node(Module, f"M{i}", order=i) for i in range(2)]
+        self.lessons = [
+            self.make_node(Lesson, f"L{i}", order=i, parent=self.modules[0])
+            for i in range(4)
+        ]
+
+        self.fga = Mock()
+        self.fga.read.return_value = Mock(tuples=[], continuation_token=None)
+        patcher = patch.object(fga_tuples, "client", self.fga)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_node(self, model, title, **kwargs):
+        kwargs.setdefault("course_class", self.cls)
+        return ContentNode.objects.create(
+            title=title,
+            content_type=ContentType.objects.get_for_model(model),
+            object_id=model.objects.create().id,
+            **kwargs,
+        )
+
+    def reorder(self, *placements):
+        nodes = [{"id": n.id, "parent": p and p.id, "order": o} for n, p, o in placements]
+        response = self.client.post(self.url, {"nodes": nodes}, format="json")
+        replay(list(TupleOutbox.objects.filter(operation="sync_deferred")))
+        return response
+
+    def test_reverse_siblings_and_move(self):
+        first, second = self.modules
+        lessons = self.lessons
+        moved = f"content_node:{lessons[3].id}"
+        stored = [
+            (f"course_class:{self.cls.id}", "course_class", moved),
+            (f"content_node:{first.id}", "parent", moved),
+        ]
+        self.fga.read.return_value = Mock(
+            tuples=[Mock(key=Mock(user=u, relation=r, object=o)) for u, r, o in stored],
+            continuation_token=None,
+        )
+        resp = self.reorder(
+            *[(lesson, first, 3 - i) for i, lesson in enumerate(lessons[:3])],
+            (lessons[3], second, 0),
+        )
+        self.assertEqual(resp.status_code, 200, resp.content)
+        tree = resp.json()
+        self.assertEqual([n["title"] for n in tree[0]["children"]], ["L2", "L1", "L0"])
+        self.assertEqual([n["title"] for n in tree[1]["children"]], ["L3"])
+        lessons[3].refresh_from_db()
+        self.assertEqual(lessons[3].path, f"{second.id}/")
+
+        # Only the moved node's parent tuple changes, in one write
+        self.fga.read.assert_called_once()
+        self.fga.write.assert_called_once()
+        body = self.fga.write.call_args[0][0]
+        self.assertEqual(
+            [(t.user, t.relation, t.object) for t in body.writes],
+            [(f"content_node:{second.id}", "parent", moved)],
+        )
+        self.assertEqual(
+            [(t.user, t.relation, t.object) for t in body.deletes],
+            [(f"content_node:{first.id}", "parent", moved)],
+        )
+
+    def test_invalid_layouts_change_nothing(self):
+        first, second = self.modules
+        lesson = self.lessons[0]
+        for placements, message in [
+            # Order already taken by L1, which isn't moved
+            ([(lesson, first, 1)], "share a parent and an order"),
+            ([(first, lesson, 0)], "must be of type 'module'"),
+            ([(first, second, 10), (second, first, 10)], "below itself"),
+        ]:
+            resp = self.reorder(*placements)
+            self.assertEqual(resp.status_code, 400)
+            self.assertIn(message, str(resp.json()))
+
+        other = CourseClass.objects.create(name="C1-B", course=self.cls.course)
+        foreign = self.make_node(Module, "X", order=0, course_class=other)
+        resp = self.reorder((foreign, None, 5))
+        self.assertEqual(resp.status_code, 400)
+
+        lesson.refresh_from_db()
+        self.assertEqual((lesson.parent_id, lesson.order), (first.id, 0))
+        self.assertFalse(TupleOutbox.objects.filter(operation="sync_deferred").exists())
+        self.fga.write.assert_not_called()
+
+    def test_existing_root_clashes_are_left_alone(self):
+        first, second = self.modules
+        # Roots may share an order; the database doesn't enforce it for them
+        ContentNode.objects.filter(pk=second.pk).update(order=first.order)
+        resp = self.reorder((self.lessons[0], first, 9))
+        self.assertEqual(resp.status_code, 200, resp.content)
+
+        resp = self.reorder((self.lessons[0], None, first.order))
+        self.assertEqual(resp.status_code, 400)
+        clashes = sorted([first.id, second.id, self.lessons[0].id])
+        self.assertIn(f"Nodes {clashes}", str(resp.json()))
+
+    def test_concurrent_order_conflict_is_a_bad_request(self):
+        with patch.object(
+            ContentNode.objects, "bulk_update", side_effect=IntegrityError("uniq")
+        ):
+            resp = self.reorder((self.lessons[0], self.modules[0], 9))
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("changed meanwhile", str(resp.json()))
+        self.lessons[0].refresh_from_db()
+        self.assertEqual(self.lessons[0].order, 0)
+
+    def test_requires_edit_access(self):
+        student = User.objects.create_user(email="s@example.com", password="pass123")
+        self.client.force_authenticate(student)
+        with patch("courseware.permissions.check", return_value=False):
+            resp = self.reorder((self.lessons[0], self.modules[1], 0))
+        self.assertEqual(resp.status_code, 403)
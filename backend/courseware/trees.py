@@ -0,0 +1,118 @@
+"""
+Course content trees assembled in memory.
+
+:func:`class_tree` loads every node of a class in one query, with its
+content type's model joined in, links children to parents in a single pass
+and returns plain dicts shaped like :class:`ContentNodeTreeSerializer`
+output. Rendering no longer costs queries per node.
+
+Rendered trees are cached as JSON bytes under the class's
+:class:`ContentTreeVersion`, which the node signal handlers and the
+``authz.bulk`` helpers bump in the transaction that changes the nodes. A
+bump makes every process miss and re-render; the version is also the
+tree's ETag.
+"""
+import secrets
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.renderers import JSONRenderer
+
+from .models import ContentNode, ContentTreeVersion
+
+# Keys of a tree node, in ContentNodeTreeSerializer's order
+TREE_FIELDS = (
+    "id",
+    "content_type",
+    "children",
+    "title",
+    "object_id",
+    "order",
+    "course_class",
+    "parent",
+)
+
+
+def load_nodes(class_id) -> list[dict]:
+    """Every node of the class as a dict, siblings in ``order``, in one query."""
+    rows = (
+        ContentNode.objects.filter(course_class_id=class_id)
+        .order_by("order", "pk")
+        .values_list(
+            "id", "content_type__model", "title", "object_id", "order", "parent_id"
+        )
+    )
+    return [
+        {
+            "id": id,
+            "content_type": content_type,
+            "children": [],
+            "title": title,
+            "object_id": object_id,
+            "order": order,
+            "course_class": int(class_id),
+            "parent": parent_id,
+        }
+        for id, content_type, title, object_id, order, parent_id in rows
+    ]
+
+
+def build_tree(nodes: list[dict]) -> list[dict]:
+    """
+    Attach each node to its parent's ``children``, keeping the input order
+    among siblings, and return the roots. Nodes whose parent isn't in
+    ``nodes`` are unreachable and left out, as with the recursive serializer.
+    """
+    children = defaultdict(list)
+    for node in nodes:
+        children[node["parent"]].append(node)
+    for node in nodes:
+        node["children"] = children.get(node["id"], [])
+    return children.get(None, [])
+
+
+def class_tree(class_id) -> list[dict]:
+    return build_tree(load_nodes(class_id))
+
+
+def bump(class_ids):
+    """Invalidate the cached trees of ``class_ids``."""
+    class_ids = {int(class_id) for class_id in class_ids if class_id is not None}
+    if not class_ids:
+        return
+    ContentTreeVersion.objects.bulk_create(
+        [ContentTreeVersion(course_class_id=class_id) for class_id in class_ids],
+        ignore_conflicts=True,
+    )
+    # A fresh random version rather than an increment: a rolled back bump
+    # would hand the same number to a different tree
+    ContentTreeVersion.objects.filter(course_class_id__in=class_ids).update(
+        version=secrets.randbits(63)
+    )
+
+
+def tree_version(class_id) -> int:
+    version = (
+        ContentTreeVersion.objects.filter(course_class_id=class_id)
+        .values_list("version", flat=True)
+        .first()
+    )
+    return version or 0
+
+
+def tree_etag(class_id, version: int) -> str:
+    return f'"tree-{class_id}-{version}"'
+
+
+def rendered_tree(class_id, version: int) -> bytes:
+    """
+    The class tree as JSON, from the cache when rendered at ``version``.
+    Read the version before calling: the nodes loaded are then at least as
+    recent, never older.
+    """
+    key = f"courseware:tree:{class_id}:{version}"
+    if (content := cache.get(key)) is None:
+        content = JSONRenderer().render(class_tree(class_id))
+        cache.set(key, content, settings.CONTENT_TREE_CACHE_TTL)
+    return content
@@ -1,6 +1,10 @@
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
 from rest_framework import viewsets
-from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
 from rest_framework.permissions import IsAdminUser
 
 from .permissions import (
@@ -15,8 +19,10 @@ from .serializers import (
     ContentNodeDetailSerializer,
     ContentNodeWriteSerializer,
     ContentNodeTreeSerializer,
+    ContentNodeReorderSerializer,
 )
 from . import queries
+from . import trees
 
 
 class ContentNodeViewSet(viewsets.ModelViewSet):
@@ -28,6 +34,7 @@ class ContentNodeViewSet(viewsets.ModelViewSet):
         "partial_update": [IsAdminUser | UserCanEditContentNode],
         "destroy": [IsAdminUser | UserCanModifyContentNode],
         "tree": [IsAdminUser | UserCanListClasssNodes],
+        "reorder": [IsAdminUser | UserCanCreateClassNodes],
     }
     SERIALIZER_MAP = {
         "list": ContentNodeListSerializer,
@@ -37,6 +44,7 @@ class ContentNodeViewSet(viewsets.ModelViewSet):
         "partial_update": ContentNodeWriteSerializer,
         "destroy": ContentNodeWriteSerializer,
         "tree": ContentNodeTreeSerializer,
+        "reorder": ContentNodeReorderSerializer,
     }
 
     def get_queryset(self):
@@ -52,8 +60,33 @@ class ContentNodeViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=["get"])
     def tree(self, request, *args, **kwargs):
-        queryset = queries.get_root_nodes_by_class_id(
-            self.kwargs.get("class_id")
-        ).prefetch_related("children")
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        # Same shape as ContentNodeTreeSerializer, cached per tree version
+        class_id = self.kwargs.get("class_id")
+        version = trees.tree_version(class_id)
+        etag = trees.tree_etag(class_id, version)
+        response = get_conditional_response(request, etag=etag) or HttpResponse(
+            trees.rendered_tree(class_id, version), content_type="application/json"
+        )
+        response.headers["ETag"] = etag
+        # Access is checked on every request, so clients revalidate
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    @action(detail=False, methods=["post"])
+    def reorder(self, request, *args, **kwargs):
+        """Move and reorder many nodes at once; responds with the new tree."""
+        class_id = self.kwargs.get("class_id")
+        context = {**self.get_serializer_context(), "class_id": class_id}
+        serializer = self.get_serializer(data=request.data, context=context)
+        try:
+            # The nodes stay locked from validation to the commit, where the
+            # deferred order constraint is checked
+            with transaction.atomic():
+                serializer.is_valid(raise_exception=True)
+                serializer.save()
+        except IntegrityError:
+            # e.g. a node created meanwhile took one of the orders
+            raise ValidationError(
+                {"nodes": ["The class's nodes changed meanwhile, try again."]}
+            )
+        return Response(trees.class_tree(class_id))
@@ -40,5 +40,15 @@ class Enrollment(models.Model):
     class Meta:
         unique_together = ("user", "course_class")  # one enrollment per user per class
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Saved user and class, so saves moving the enrollment can be told apart
+        instance._saved_keys = (
+            instance.__dict__.get("user_id"),
+            instance.__dict__.get("course_class_id"),
+        )
+        return instance
+
     def __str__(self):
         return f"{self.user} - {self.course_class.name} ({self.get_role_display()})"
@@ -1,6 +1,7 @@
 from dataclasses import dataclass, field, asdict, InitVar
 from rest_framework import serializers
 
+from services.openfga.sync.serializers import FGABatchCheckListSerializer
 from services.openfga.sync.utils import filter_allowed_relations
 from services.openfga.relations import CourseClassRelation, UserRelation
 from user.serializers import UserReadSerializer
@@ -14,11 +15,19 @@ class EnrollmentAccess:
     can_view: bool = field(init=False, default=False)
     can_edit: bool = field(init=False, default=False)
 
+    RELATIONS = [CourseClassRelation.CAN_VIEW, CourseClassRelation.CAN_EDIT]
+
+    @staticmethod
+    def checks(enrollment: Enrollment):
+        subject_key = f"{UserRelation.TYPE}:{enrollment.user_id}"
+        object_key = f"{CourseClassRelation.TYPE}:{enrollment.course_class_id}"
+        return [(subject_key, relation, object_key) for relation in EnrollmentAccess.RELATIONS]
+
     def __post_init__(self, enrollment: Enrollment):
         allowed_relations = filter_allowed_relations(
-            subject_key=f"{UserRelation.TYPE}:{enrollment.user.pk}",
-            object_key=f"{CourseClassRelation.TYPE}:{enrollment.course_class.pk}",
-            relations=[CourseClassRelation.CAN_VIEW, CourseClassRelation.CAN_EDIT],
+            subject_key=f"{UserRelation.TYPE}:{enrollment.user_id}",
+            object_key=f"{CourseClassRelation.TYPE}:{enrollment.course_class_id}",
+            relations=self.RELATIONS,
         )
         self.can_edit = CourseClassRelation.CAN_EDIT in allowed_relations
         self.can_view = CourseClassRelation.CAN_VIEW in allowed_relations
@@ -32,6 +41,10 @@ class EnrollmentReadSerializer(serializers.ModelSerializer):
     class Meta:
         model = Enrollment
         fields = "__all__"
+        list_serializer_class = FGABatchCheckListSerializer
+
+    def get_fga_checks(self, obj):
+        return EnrollmentAccess.checks(obj)
 
     def get_access(self, obj):
         return asdict(EnrollmentAccess(enrollment=obj))
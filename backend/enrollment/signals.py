@@ -3,6 +3,8 @@ from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 import logging
 
+from authz.bulk import defer
+from authz.outbox import submit
 from services.openfga.sync.utils import sync_relations
 from services.openfga.relations import (
     CourseClassRelation,
@@ -24,7 +26,10 @@ ENROLLMENT_ROLE_RELATION_MAP = {
 
 @receiver(post_save, sender=Enrollment, dispatch_uid="sync_enrollment_to_fga")
 def sync_enrollment_to_fga(sender, instance: Enrollment, created, **kwargs):
-    return sync_relations(
+    if defer(instance, created):
+        return
+    return submit(
+        sync_relations,
         subject_key=f"{UserRelation.TYPE}:{instance.user.pk}",
         desired_relations=set([ENROLLMENT_ROLE_RELATION_MAP[instance.role]]),
         object_key=f"{CourseClassRelation.TYPE}:{instance.course_class.pk}",
@@ -1,5 +1,105 @@
+"""
+Async OpenFGA client.
+
+``async`` is a reserved word, so this package can only be imported with
+``importlib.import_module("services.openfga.async")``.
+
+aiohttp sessions are bound to the event loop that first uses them, so clients
+are created per running loop by :func:`get_client`. Sync code (DRF views and
+permissions) runs coroutines through :func:`run`, which submits them to one
+long-lived background loop per process so connections are pooled and
+concurrent calls (``asyncio.gather``) overlap. Async views served over ASGI
+(:mod:`.views`) await the client on their own loop instead.
+"""
+import asyncio
+import concurrent.futures
+import contextvars
+import os
+import threading
+import weakref
+
 from openfga_sdk import OpenFgaClient
 
-from ..settings import configuration
+from ..breaker import GuardedClient
+from ..metrics import InstrumentedClient
+from ..settings import ASYNC_RUN_TIMEOUT, FAKE_CLIENT, configuration
+
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, OpenFgaClient]" = (
+    weakref.WeakKeyDictionary()
+)
+_background_loop: asyncio.AbstractEventLoop | None = None
+_background_lock = threading.Lock()
+
+
+def get_client() -> OpenFgaClient:
+    """Return the client bound to the running event loop."""
+    loop = asyncio.get_running_loop()
+    if (client := _clients.get(loop)) is None:
+        if FAKE_CLIENT:
+            from ..fake import AsyncFakeClient, get_fake_client
+
+            client = _clients[loop] = InstrumentedClient(AsyncFakeClient(get_fake_client()))
+        else:
+            client = _clients[loop] = InstrumentedClient(
+                GuardedClient(OpenFgaClient(configuration))
+            )
+    return client
+
+
+def _get_background_loop() -> asyncio.AbstractEventLoop:
+    global _background_loop
+    with _background_lock:
+        if _background_loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=loop.run_forever, name="openfga-async", daemon=True
+            ).start()
+            _background_loop = loop
+        return _background_loop
+
+
+def _reset_after_fork():
+    # The loop thread does not survive fork(); children start their own.
+    global _background_loop
+    _background_loop = None
+    _clients.clear()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def run(coro, timeout: float | None = ASYNC_RUN_TIMEOUT):
+    """Run ``coro`` on the background loop and block until it completes.
+
+    The caller's context is propagated so the per-request decision memo is
+    shared with the coroutine. After ``timeout`` seconds the coroutine is
+    cancelled and ``TimeoutError`` is raised.
+    """
+    loop = _get_background_loop()
+    context = contextvars.copy_context()
+    future = concurrent.futures.Future()
+    tasks: list[asyncio.Task] = []
+
+    def copy_result(task: asyncio.Task):
+        if task.cancelled():
+            future.cancel()
+        elif (exc := task.exception()) is not None:
+            future.set_exception(exc)
+        else:
+            future.set_result(task.result())
+
+    def submit():
+        task = loop.create_task(coro, context=context)
+        task.add_done_callback(copy_result)
+        tasks.append(task)
+
+    def cancel():
+        # Runs after submit(): the loop calls callbacks in order
+        tasks[0].cancel()
 
-client = OpenFgaClient(configuration)
+    loop.call_soon_threadsafe(submit)
+    try:
+        return future.result(timeout)
+    except concurrent.futures.TimeoutError:
+        loop.call_soon_threadsafe(cancel)
+        raise
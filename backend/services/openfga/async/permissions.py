@@ -0,0 +1,22 @@
+from ..sync.permissions import FGABasePermission
+from . import run
+from .utils import check
+
+
+class FGAAsyncBasePermission(FGABasePermission):
+    """
+    FGABasePermission whose check runs on the async client.
+
+    ASGI-native code can await :meth:`has_object_permission_async` directly;
+    DRF's sync permission hook bridges to it through the background loop.
+    """
+
+    async def has_object_permission_async(self, request, view, obj) -> bool:
+        return await check(
+            subject_key=f"{self.subject_type}:{self.get_subject_id(request, view, obj)}",
+            relation=self.relation,
+            object_key=f"{self.object_type}:{self.get_object_id(request, view, obj)}",
+        )
+
+    def has_object_permission(self, request, view, obj):
+        return run(self.has_object_permission_async(request, view, obj))
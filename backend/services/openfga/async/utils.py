@@ -0,0 +1,68 @@
+import asyncio
+
+from openfga_sdk import ReadRequestTupleKey
+from openfga_sdk.client.models import ClientCheckRequest, ClientWriteRequest
+
+from ..breaker import CircuitOpenError, stale_decision
+from ..cache import decision_cache
+from ..consistency import query_options, record_write
+from ..settings import READ_PAGE_SIZE
+from . import get_client
+
+
+async def check(subject_key: str, relation: str, object_key: str) -> bool:
+    key = (subject_key, relation, object_key)
+    if (allowed := decision_cache.get(key)) is not None:
+        return allowed
+    try:
+        response = await get_client().check(
+            ClientCheckRequest(user=subject_key, relation=relation, object=object_key),
+            query_options(),
+        )
+    except CircuitOpenError:
+        if (allowed := stale_decision(key)) is None:
+            raise
+        return allowed
+    decision_cache.set(key, response.allowed)
+    return response.allowed
+
+
+async def write(body: ClientWriteRequest):
+    """Write tuples and invalidate cached decisions on the touched objects."""
+    touched = [t.object for t in (body.writes or []) + (body.deletes or [])]
+    try:
+        return await get_client().write(body)
+    finally:
+        decision_cache.invalidate(touched)
+        record_write()
+
+
+async def list_subject_ids(object_key: str, relation: str, subject_type: str) -> list[str]:
+    prefix = f"{subject_type}:"
+    ids = []
+    continuation_token = None
+    while True:
+        options = {"page_size": READ_PAGE_SIZE}
+        if continuation_token:
+            options["continuation_token"] = continuation_token
+        response = await get_client().read(
+            ReadRequestTupleKey(object=object_key, relation=relation), options
+        )
+        ids.extend(
+            t.key.user.removeprefix(prefix)
+            for t in response.tuples
+            if t.key.user.startswith(prefix)
+        )
+        continuation_token = response.continuation_token
+        if not continuation_token:
+            return ids
+
+
+async def list_subject_ids_by_relation(
+    object_key: str, relations: list[str], subject_type: str
+) -> dict[str, list[str]]:
+    """Read the subjects of several relations on one object concurrently."""
+    results = await asyncio.gather(
+        *(list_subject_ids(object_key, relation, subject_type) for relation in relations)
+    )
+    return dict(zip(relations, results))
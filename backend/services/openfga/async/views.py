@@ -0,0 +1,81 @@
+"""
+Async Django views for endpoints that await the async OpenFGA client.
+
+DRF views are sync, so their OpenFGA coroutines go through :func:`..run` and
+hold a worker thread while they wait. Served by ``backend/asgi.py``, an
+:class:`FGAAsyncAPIView` awaits them on the request's own event loop instead.
+It authenticates with DRF's authentication classes and checks
+:class:`.permissions.FGAAsyncBasePermission` object permissions.
+"""
+from asgiref.sync import sync_to_async
+from django.http import Http404, JsonResponse
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+
+class FGAAsyncAPIView(View):
+    """
+    Async view requiring an authenticated user allowed on :meth:`get_object`.
+
+    Handlers receive the DRF :class:`~rest_framework.request.Request` and
+    return Django responses. Methods without a handler are passed to
+    ``fallback``, a sync view (usually a DRF action) doing its own checks.
+    """
+
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    permission_classes = []
+    fallback = None
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        # Token authenticated like the DRF views, so not CSRF protected
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def get_object(self, request, *args, **kwargs):
+        """Return the object permissions are checked on, or raise Http404."""
+        raise NotImplementedError
+
+    async def dispatch(self, request, *args, **kwargs):
+        method = request.method.lower()
+        if self.fallback is not None and not hasattr(self, method):
+            return await sync_to_async(self.fallback)(request, *args, **kwargs)
+        request = self.request = Request(
+            request, authenticators=[auth() for auth in self.authentication_classes]
+        )
+        if method != "options":
+            try:
+                await self.initial(request, *args, **kwargs)
+            except (exceptions.APIException, Http404) as exc:
+                return self.handle_exception(request, exc)
+        return await super().dispatch(request, *args, **kwargs)
+
+    async def initial(self, request, *args, **kwargs):
+        # The authenticators look the user up in the database
+        user = await sync_to_async(lambda: request.user)()
+        if not user.is_authenticated:
+            raise exceptions.NotAuthenticated()
+        obj = await self.get_object(request, *args, **kwargs)
+        for permission_class in self.permission_classes:
+            if not await permission_class().has_object_permission_async(request, self, obj):
+                raise exceptions.PermissionDenied()
+
+    def handle_exception(self, request, exc) -> JsonResponse:
+        if isinstance(exc, Http404):
+            exc = exceptions.NotFound()
+        headers = {}
+        unauthenticated = (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)
+        if isinstance(exc, unauthenticated):
+            # Same as DRF: 401 only when there is a scheme to challenge with
+            authenticators = request.authenticators
+            header = authenticators and authenticators[0].authenticate_header(request)
+            if header:
+                headers["WWW-Authenticate"] = header
+            else:
+                exc.status_code = 403
+        return JsonResponse(
+            {"detail": exc.detail}, status=exc.status_code, headers=headers
+        )
@@ -0,0 +1,214 @@
+"""
+Circuit breaker around the OpenFGA clients.
+
+After ``BREAKER_FAILURE_THRESHOLD`` consecutive failed calls (transport
+errors, timeouts, 429 and 5xx responses) the circuit opens and calls fail
+immediately with :class:`CircuitOpenError` instead of tying up a worker for
+the full timeout. After ``BREAKER_RESET_TIMEOUT`` seconds one probe call is
+let through (half-open); its outcome closes or re-opens the circuit.
+
+With ``OPENFGA_BREAKER_SERVE_STALE``, checks made while the circuit is open
+by read-only requests are answered from the last decision cached for them,
+even past its TTL (see :func:`stale_decision`). Decisions invalidated by a
+write are never served.
+
+One breaker is shared by the sync and async clients of a process.
+"""
+import functools
+import inspect
+import logging
+import os
+import threading
+import time
+
+import aiohttp
+import urllib3
+from openfga_sdk.exceptions import (
+    ApiException,
+    RateLimitExceededError,
+    ServiceException,
+)
+
+from .cache import CheckKey, decision_cache
+from .consistency import read_only
+from .settings import (
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_RESET_TIMEOUT,
+    BREAKER_SERVE_STALE,
+)
+
+logger = logging.getLogger(__name__)
+
+GUARDED_METHODS = frozenset(
+    {
+        "check",
+        "batch_check",
+        "read",
+        "read_changes",
+        "write",
+        "list_objects",
+        "list_relations",
+        "list_users",
+        "read_latest_authorization_model",
+    }
+)
+
+
+class CircuitOpenError(Exception):
+    """OpenFGA is considered unavailable; the call was not attempted."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"OpenFGA circuit is open, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+# Connection errors and timeouts of the sync (urllib3) and async (aiohttp)
+# transports; ConnectionError and TimeoutError also cover the sockets'.
+TRANSPORT_ERRORS = (
+    ConnectionError,
+    TimeoutError,
+    urllib3.exceptions.MaxRetryError,
+    urllib3.exceptions.ProtocolError,
+    urllib3.exceptions.TimeoutError,
+    urllib3.exceptions.NewConnectionError,
+    urllib3.exceptions.SSLError,
+    aiohttp.ClientConnectionError,
+)
+
+
+def is_failure(error: BaseException) -> bool:
+    """Whether ``error`` says the service is unhealthy, not that the call was wrong."""
+    if isinstance(error, (ServiceException, RateLimitExceededError)):
+        return True
+    if isinstance(error, ApiException):
+        # No response (SSL, connection reset), or a 5xx the SDK didn't type
+        return error.status == 0 or (error.status or 0) >= 500
+    return isinstance(error, TRANSPORT_ERRORS)
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        reset_timeout: float = BREAKER_RESET_TIMEOUT,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.failure_threshold > 0
+
+    def before_call(self):
+        """Raise :class:`CircuitOpenError` unless the call may go through."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            remaining = self._opened_at + self.reset_timeout - time.monotonic()
+            if self.state == self.OPEN and remaining <= 0:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            raise CircuitOpenError(max(remaining, 0.0))
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("OpenFGA circuit closed")
+            self._reset()
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or (
+                self.state == self.CLOSED and self.failures >= self.failure_threshold
+            ):
+                logger.warning(
+                    f"OpenFGA circuit opened after {self.failures} failures, "
+                    f"retrying in {self.reset_timeout}s"
+                )
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def record(self, error: BaseException | None):
+        if not self.enabled:
+            return
+        if error is None or not is_failure(error):
+            self.record_success()
+        else:
+            self.record_failure()
+
+    def after_fork(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+
+breaker = CircuitBreaker()
+os.register_at_fork(after_in_child=breaker.after_fork)
+
+
+class GuardedClient:
+    """Wrap a sync or async OpenFGA client so its API calls go through ``breaker``."""
+
+    def __init__(self, client, breaker: CircuitBreaker = breaker):
+        self._client = client
+        self._breaker = breaker
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name not in GUARDED_METHODS:
+            return attr
+        breaker = self._breaker
+
+        if inspect.iscoroutinefunction(attr):
+
+            @functools.wraps(attr)
+            async def guarded_async(*args, **kwargs):
+                breaker.before_call()
+                error = None
+                try:
+                    return await attr(*args, **kwargs)
+                except BaseException as e:
+                    error = e
+                    raise
+                finally:
+                    breaker.record(error)
+
+            return guarded_async
+
+        @functools.wraps(attr)
+        def guarded(*args, **kwargs):
+            breaker.before_call()
+            error = None
+            try:
+                return attr(*args, **kwargs)
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                breaker.record(error)
+
+        return guarded
+
+
+def stale_decision(key: CheckKey) -> bool | None:
+    """The last cached decision for ``key``, if the stale policy allows serving it."""
+    if not BREAKER_SERVE_STALE or not read_only():
+        return None
+    return decision_cache.get_stale(key)
@@ -0,0 +1,187 @@
+"""
+Decision cache for OpenFGA checks.
+
+Two layers sit in front of ``client.check``:
+
+- a request-scoped memo, active inside :func:`request_scope` (see
+  ``services.openfga.middleware``), that lives for one request only;
+- an optional process-wide TTL cache with bounded size and LRU eviction,
+  skipped by reads that need ``HIGHER_CONSISTENCY`` (see
+  ``services.openfga.consistency``).
+
+Tuple writes go through :meth:`DecisionCache.invalidate`, which drops cached
+decisions on the written object and on every object type that can inherit
+relations from it (e.g. a ``course_class`` write invalidates ``content_node``
+decisions).
+"""
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from openfga_sdk.models.consistency_preference import ConsistencyPreference
+
+from .consistency import preference
+from .relations import (
+    ContentNodeRelation,
+    CourseClassRelation,
+    FileRelation,
+    FolderRelation,
+    GroupRelation,
+)
+from .settings import DECISION_CACHE_MAX_SIZE, DECISION_CACHE_TTL
+
+# Object types whose decisions depend on tuples written on a given type
+# (tuple-to-userset / userset rewrites in openfga/schemas/lms.fga).
+DEPENDENT_TYPES: dict[str, set[str]] = {
+    CourseClassRelation.TYPE: {ContentNodeRelation.TYPE},
+    ContentNodeRelation.TYPE: {ContentNodeRelation.TYPE},
+    FolderRelation.TYPE: {FolderRelation.TYPE, FileRelation.TYPE},
+    FileRelation.TYPE: set(),
+}
+# Group membership feeds every userset, so a group write invalidates everything.
+WILDCARD_TYPES = {GroupRelation.TYPE}
+
+CheckKey = tuple[str, str, str]  # (subject_key, relation, object_key)
+
+_request_memo: ContextVar[dict[CheckKey, bool] | None] = ContextVar(
+    "openfga_request_memo", default=None
+)
+
+
+def object_type_of(object_key: str) -> str:
+    return object_key.split(":", 1)[0]
+
+
+class TTLDecisionCache:
+    """Thread-safe LRU cache of check decisions with a time-to-live."""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[CheckKey, tuple[bool, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl > 0
+
+    def get(self, key: CheckKey) -> bool | None:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            allowed, expires_at = entry
+            if expires_at <= time.monotonic():
+                # Kept until evicted, see get_stale()
+                return None
+            self._entries.move_to_end(key)
+            return allowed
+
+    def get_stale(self, key: CheckKey) -> bool | None:
+        """The cached decision, even if expired (not if invalidated or evicted)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return None if entry is None else entry[0]
+
+    def set(self, key: CheckKey, allowed: bool):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (allowed, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, predicate):
+        with self._lock:
+            for key in [k for k in self._entries if predicate(k)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DecisionCache:
+    """Request memo in front of an optional shared TTL cache."""
+
+    def __init__(self, shared: TTLDecisionCache):
+        self.shared = shared
+
+    def get(self, key: CheckKey) -> bool | None:
+        memo = _request_memo.get()
+        if memo is not None and key in memo:
+            return memo[key]
+        if preference() == ConsistencyPreference.HIGHER_CONSISTENCY:
+            # Shared entries may predate the writes this read must see
+            return None
+        allowed = self.shared.get(key)
+        if allowed is not None and memo is not None:
+            memo[key] = allowed
+        return allowed
+
+    def get_stale(self, key: CheckKey) -> bool | None:
+        memo = _request_memo.get()
+        if memo is not None and key in memo:
+            return memo[key]
+        return self.shared.get_stale(key)
+
+    def set(self, key: CheckKey, allowed: bool):
+        memo = _request_memo.get()
+        if memo is not None:
+            memo[key] = allowed
+        self.shared.set(key, allowed)
+
+    def invalidate(self, object_keys):
+        """Drop decisions affected by tuple writes on ``object_keys``."""
+        object_keys = set(object_keys)
+        if not object_keys:
+            return
+        written_types = {object_type_of(key) for key in object_keys}
+        if written_types & WILDCARD_TYPES:
+            predicate = lambda key: True  # noqa: E731
+        else:
+            dependent_types = set().union(
+                *(DEPENDENT_TYPES.get(t, set()) for t in written_types)
+            )
+
+            def predicate(key: CheckKey) -> bool:
+                _, _, object_key = key
+                return (
+                    object_key in object_keys
+                    or object_type_of(object_key) in dependent_types
+                )
+
+        memo = _request_memo.get()
+        if memo is not None:
+            for key in [k for k in memo if predicate(k)]:
+                del memo[key]
+        self.shared.discard(predicate)
+
+    def clear(self):
+        memo = _request_memo.get()
+        if memo is not None:
+            memo.clear()
+        self.shared.clear()
+
+
+@contextmanager
+def request_scope():
+    """Enable the per-request memo for the duration of the block."""
+    token = _request_memo.set({})
+    try:
+        yield
+    finally:
+        _request_memo.reset(token)
+
+
+decision_cache = DecisionCache(
+    TTLDecisionCache(max_size=DECISION_CACHE_MAX_SIZE, ttl=DECISION_CACHE_TTL)
+)
@@ -0,0 +1,92 @@
+"""
+Read consistency for OpenFGA queries.
+
+OpenFGA caches check results server-side, so a check that follows a tuple
+write can see the state from before the write. Queries are sent with
+``MINIMIZE_LATENCY`` unless the current request, or a recent request by the
+same user, wrote tuples; those use ``HIGHER_CONSISTENCY`` and bypass the
+server cache as well as the process-wide decision cache.
+
+Writes are recorded by ``services.openfga.sync.tuples``, and by
+``authz.outbox.submit`` for writes a Celery worker applies later on the
+request's behalf. Per-user markers are kept in Django's cache, shared by all
+processes (see ``services.openfga.invalidation``), for ``CONSISTENCY_WINDOW``
+seconds, which should cover OpenFGA's check cache TTL and the outbox delay.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.core.cache import cache
+from openfga_sdk.models.consistency_preference import ConsistencyPreference
+
+from .settings import CONSISTENCY_WINDOW
+
+
+class _RequestState:
+    def __init__(self, request=None):
+        self.request = request
+        self.wrote = False
+        self.user_wrote: bool | None = None  # looked up on first use
+
+    @property
+    def user_id(self):
+        # DRF authenticates inside the view and sets ``user`` on the wrapped
+        # HttpRequest, so this is read lazily rather than in the middleware.
+        user = getattr(self.request, "user", None)
+        if user is not None and user.is_authenticated:
+            return user.pk
+        return None
+
+
+_state: ContextVar[_RequestState | None] = ContextVar(
+    "openfga_consistency_state", default=None
+)
+
+
+def _user_key(user_id) -> str:
+    return f"openfga:recent_write:user:{user_id}"
+
+
+@contextmanager
+def consistency_scope(request=None):
+    """Track writes made while handling ``request``."""
+    token = _state.set(_RequestState(request))
+    try:
+        yield
+    finally:
+        _state.reset(token)
+
+
+def record_write():
+    """Note that tuples were written, so later reads should not be stale."""
+    state = _state.get()
+    if state is None:
+        return
+    state.wrote = True
+    if CONSISTENCY_WINDOW > 0 and (user_id := state.user_id) is not None:
+        cache.set(_user_key(user_id), True, CONSISTENCY_WINDOW)
+
+
+def preference() -> str:
+    state = _state.get()
+    if state is None:
+        return ConsistencyPreference.MINIMIZE_LATENCY
+    if state.wrote:
+        return ConsistencyPreference.HIGHER_CONSISTENCY
+    if state.user_wrote is None and (user_id := state.user_id) is not None:
+        state.user_wrote = bool(cache.get(_user_key(user_id)))
+    if state.user_wrote:
+        return ConsistencyPreference.HIGHER_CONSISTENCY
+    return ConsistencyPreference.MINIMIZE_LATENCY
+
+
+def read_only() -> bool:
+    """Whether the current request only reads (GET, HEAD, OPTIONS)."""
+    state = _state.get()
+    request = state.request if state is not None else None
+    return request is not None and request.method in ("GET", "HEAD", "OPTIONS")
+
+
+def query_options(**options) -> dict:
+    """Options for a check/list query with the current consistency preference."""
+    return {**options, "consistency": preference()}
@@ -3,9 +3,12 @@ OpenFGA operation decorators for consistent logging and error handling
 """
 import logging
 import functools
+import random
 from typing import Callable
 import time
 
+from .breaker import CircuitOpenError
+
 logger = logging.getLogger(__name__)
 
 
@@ -21,18 +24,18 @@ def log_operation(operation_name: str = None, log_level: int = logging.INFO):
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
             op_name = operation_name or func.__name__
-            start_time = time.time()
+            start_time = time.perf_counter()
 
             try:
                 logger.debug(f"Starting {op_name}")
                 result = func(*args, **kwargs)
-                duration = time.time() - start_time
+                duration = time.perf_counter() - start_time
 
                 logger.log(log_level, f"Completed {op_name} in {duration:.3f}s")
                 return result
 
             except Exception as e:
-                duration = time.time() - start_time
+                duration = time.perf_counter() - start_time
                 logger.error(f"Failed {op_name} after {duration:.3f}s: {e}")
                 raise
 
@@ -50,12 +53,12 @@ def log_sync_operation(sync_type: str):
     def decorator(func: Callable) -> Callable:
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            start_time = time.time()
+            start_time = time.perf_counter()
 
             try:
                 logger.debug(f"Starting {sync_type} sync")
                 result = func(*args, **kwargs)
-                duration = time.time() - start_time
+                duration = time.perf_counter() - start_time
 
                 # Try to extract count from result or arguments
                 count = 0
@@ -70,7 +73,7 @@ def log_sync_operation(sync_type: str):
                 return result
 
             except Exception as e:
-                duration = time.time() - start_time
+                duration = time.perf_counter() - start_time
                 logger.error(f"Failed {sync_type} sync after {duration:.3f}s: {e}")
                 raise
 
@@ -133,31 +136,40 @@ def log_check_operation():
     return decorator
 
 
-def retry_on_failure(max_retries: int = 3, delay: float = 1.0):
+def retry_on_failure(
+    max_retries: int = 3,
+    delay: float = 0.1,
+    max_delay: float = 2.0,
+    exceptions: tuple[type[Exception], ...] = (Exception,),
+):
     """
-    Decorator to retry operations on failure
+    Decorator to retry operations on failure with jittered exponential backoff
 
     Args:
         max_retries: Maximum number of retry attempts
-        delay: Delay between retries in seconds
+        delay: Base delay in seconds, doubled on every attempt
+        max_delay: Upper bound of a single delay in seconds
+        exceptions: Exception types that trigger a retry
     """
     def decorator(func: Callable) -> Callable:
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            last_exception = None
-
             for attempt in range(max_retries + 1):
                 try:
                     return func(*args, **kwargs)
-                except Exception as e:
-                    last_exception = e
-                    if attempt < max_retries:
-                        logger.warning(f"Attempt {attempt + 1} failed, retrying: {e}")
-                        time.sleep(delay)
-                    else:
+                except CircuitOpenError:
+                    # Retrying can't help until the circuit lets calls through
+                    raise
+                except exceptions as e:
+                    if attempt == max_retries:
                         logger.error(f"All {max_retries + 1} attempts failed: {e}")
-
-            raise last_exception
+                        raise
+                    # Full jitter keeps concurrent workers from retrying in lockstep
+                    backoff = random.uniform(0, min(max_delay, delay * 2**attempt))
+                    logger.warning(
+                        f"Attempt {attempt + 1} failed, retrying in {backoff:.3f}s: {e}"
+                    )
+                    time.sleep(backoff)
 
         return wrapper
     return decorator
@@ -0,0 +1,324 @@
+"""
+In-memory stand-in for ``OpenFgaClient``.
+
+Selected with ``OPENFGA_FAKE_CLIENT`` (see ``services.openfga.sync`` and
+``services.openfga.async``), it keeps one store per process and evaluates
+the model in ``OPENFGA_SCHEMA_PATH`` (``openfga/schemas/lms.fga``) with the
+local evaluator. It implements the calls this project makes: ``check``,
+``batch_check``, ``read``, ``write``, ``list_objects``,
+``streamed_list_objects``, ``list_relations``, ``read_changes`` and the
+model reads, with the server's validation of writes
+(unknown relations, disallowed subject types, existing or missing tuples,
+request size) and paginated reads.
+
+Meant for tests and benchmarks: nothing is persisted, contextual tuples and
+conditions are not supported (requests with contextual tuples are rejected).
+"""
+import threading
+import uuid
+from datetime import datetime, timezone
+
+from openfga_sdk import (
+    CheckResponse,
+    ListObjectsResponse,
+    ReadAuthorizationModelResponse,
+    ReadChangesResponse,
+    ReadResponse,
+    StreamedListObjectsResponse,
+    Tuple,
+    TupleChange,
+    TupleKey,
+)
+from openfga_sdk.client.models import (
+    ClientBatchCheckResponse,
+    ClientBatchCheckSingleResponse,
+    ClientTuple,
+    ClientWriteResponse,
+)
+from openfga_sdk.client.models.write_single_response import ClientWriteSingleResponse
+from openfga_sdk.exceptions import ValidationException
+from openfga_sdk.models.tuple_operation import TupleOperation
+
+from .local import LocalEvaluator
+from .local.dsl import Schema, parse, to_sdk
+from .settings import MAX_TUPLES_PER_WRITE, SCHEMA_PATH
+
+TupleKeyTuple = tuple[str, str, str]  # (user, relation, object)
+
+# Server defaults
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
+
+def _subject_type(user: str) -> str:
+    """``user:1`` -> ``user``, ``group:2#member`` -> ``group#member``, ``user:*`` as is."""
+    object_, _, relation = user.partition("#")
+    type_, _, id = object_.partition(":")
+    if relation:
+        return f"{type_}#{relation}"
+    return f"{type_}:*" if id == "*" else type_
+
+
+def _page(options, default: int = DEFAULT_PAGE_SIZE) -> tuple[int, int]:
+    options = options or {}
+    page_size = min(int(options.get("page_size") or default), MAX_PAGE_SIZE)
+    return int(options.get("continuation_token") or 0), page_size
+
+
+def _invalid(reason: str) -> ValidationException:
+    return ValidationException(status=400, reason=reason)
+
+
+def _reject_contextual_tuples(body):
+    if getattr(body, "contextual_tuples", None):
+        raise _invalid("contextual tuples are not supported by the fake client")
+
+
+class FakeOpenFgaClient:
+    def __init__(self, schema: Schema, store_id: str = "fake-store"):
+        self.schema = schema
+        self._store_id = store_id
+        self._model_id = "fake-model"
+        self._lock = threading.RLock()
+        self._evaluator = LocalEvaluator(fga_client=self, model=schema.model)
+        self.clear()
+
+    @classmethod
+    def from_file(cls, path=SCHEMA_PATH, **kwargs) -> "FakeOpenFgaClient":
+        with open(path) as f:
+            return cls(parse(f.read()), **kwargs)
+
+    def clear(self):
+        """Drop every tuple and the changelog."""
+        with self._lock:
+            self._tuples: dict[TupleKeyTuple, datetime] = {}
+            self._changes: list[TupleChange] = []
+            self._evaluator.index.clear()
+
+    def close(self):
+        pass
+
+    # Configuration
+
+    def get_store_id(self):
+        return self._store_id
+
+    def set_store_id(self, value):
+        self._store_id = value
+
+    def get_authorization_model_id(self):
+        return self._model_id
+
+    def set_authorization_model_id(self, value):
+        self._model_id = value
+
+    def read_authorization_model(self, options=None):
+        return ReadAuthorizationModelResponse(
+            authorization_model=to_sdk(self.schema, self._model_id)
+        )
+
+    read_latest_authorization_model = read_authorization_model
+
+    # Queries
+
+    def _validate_relation(self, object_: str, relation: str):
+        object_type = object_.split(":", 1)[0]
+        if relation not in self.schema.model.get(object_type, {}):
+            raise _invalid(f"relation '{object_type}#{relation}' not found")
+
+    def _check(self, user: str, relation: str, object_: str) -> bool:
+        self._validate_relation(object_, relation)
+        return self._evaluator.evaluate(user, relation, object_)
+
+    def check(self, body, options=None):
+        _reject_contextual_tuples(body)
+        return CheckResponse(allowed=self._check(body.user, body.relation, body.object))
+
+    def batch_check(self, body, options=None):
+        result = []
+        for item in body.checks:
+            _reject_contextual_tuples(item)
+            result.append(
+                ClientBatchCheckSingleResponse(
+                    allowed=self._check(item.user, item.relation, item.object),
+                    request=item,
+                    correlation_id=item.correlation_id or str(uuid.uuid4()),
+                )
+            )
+        return ClientBatchCheckResponse(result=result)
+
+    def list_relations(self, body, options=None):
+        _reject_contextual_tuples(body)
+        return [
+            relation
+            for relation in body.relations
+            if self._check(body.user, relation, body.object)
+        ]
+
+    def list_objects(self, body, options=None):
+        _reject_contextual_tuples(body)
+        if body.relation not in self.schema.model.get(body.type, {}):
+            raise _invalid(f"relation '{body.type}#{body.relation}' not found")
+        objects = self._evaluator.evaluate_objects(body.user, body.relation, body.type)
+        return ListObjectsResponse(objects=sorted(objects))
+
+    def streamed_list_objects(self, body, options=None):
+        for object_ in self.list_objects(body, options).objects:
+            yield StreamedListObjectsResponse(object=object_)
+
+    # Tuples
+
+    def _matches(self, key: TupleKeyTuple, tuple_key) -> bool:
+        user, relation, object_ = key
+        if tuple_key is None:
+            return True
+        if tuple_key.user and tuple_key.user != user:
+            return False
+        if tuple_key.relation and tuple_key.relation != relation:
+            return False
+        if tuple_key.object:
+            if tuple_key.object.endswith(":"):
+                return object_.startswith(tuple_key.object)
+            return tuple_key.object == object_
+        return True
+
+    def read(self, body=None, options=None):
+        start, page_size = _page(options)
+        with self._lock:
+            matches = [
+                (key, timestamp)
+                for key, timestamp in self._tuples.items()
+                if self._matches(key, body)
+            ]
+        page = matches[start : start + page_size]
+        end = start + len(page)
+        return ReadResponse(
+            tuples=[
+                Tuple(key=TupleKey(user=u, relation=r, object=o), timestamp=timestamp)
+                for (u, r, o), timestamp in page
+            ],
+            continuation_token=str(end) if end < len(matches) else "",
+        )
+
+    def _validate_write(self, t: ClientTuple):
+        object_type = t.object.split(":", 1)[0]
+        self._validate_relation(t.object, t.relation)
+        if _subject_type(t.user) not in self.schema.assignable[object_type][t.relation]:
+            raise _invalid(
+                f"type '{_subject_type(t.user)}' is not an allowed type restriction "
+                f"for '{object_type}#{t.relation}'"
+            )
+
+    def write(self, body, options=None):
+        writes, deletes = body.writes or [], body.deletes or []
+        if len(writes) + len(deletes) > MAX_TUPLES_PER_WRITE:
+            raise _invalid(
+                f"the number of writes and deletes exceeds the allowed limit of "
+                f"{MAX_TUPLES_PER_WRITE}"
+            )
+        with self._lock:
+            # The whole request is rejected when one tuple is invalid
+            seen = set()
+            for kind, tuples in (("write", writes), ("delete", deletes)):
+                for t in tuples:
+                    key = (t.user, t.relation, t.object)
+                    described = (
+                        f"user: '{t.user}', relation: '{t.relation}', object: '{t.object}'"
+                    )
+                    if key in seen:
+                        raise _invalid(f"duplicate tuple in write: {described}")
+                    seen.add(key)
+                    if kind == "write":
+                        self._validate_write(t)
+                        if key in self._tuples:
+                            raise _invalid(
+                                f"cannot write a tuple which already exists: {described}"
+                            )
+                    elif key not in self._tuples:
+                        raise _invalid(
+                            f"cannot delete a tuple which does not exist: {described}"
+                        )
+
+            now = datetime.now(timezone.utc)
+            for t in writes:
+                self._tuples[(t.user, t.relation, t.object)] = now
+                self._evaluator.index.add(t.user, t.relation, t.object)
+                self._log(t, TupleOperation.WRITE, now)
+            for t in deletes:
+                del self._tuples[(t.user, t.relation, t.object)]
+                self._evaluator.index.discard(t.user, t.relation, t.object)
+                self._log(t, TupleOperation.DELETE, now)
+        return ClientWriteResponse(
+            writes=[ClientWriteSingleResponse(tuple_key=t, success=True) for t in writes],
+            deletes=[ClientWriteSingleResponse(tuple_key=t, success=True) for t in deletes],
+        )
+
+    def _log(self, t: ClientTuple, operation: str, timestamp: datetime):
+        self._changes.append(
+            TupleChange(
+                tuple_key=TupleKey(user=t.user, relation=t.relation, object=t.object),
+                operation=operation,
+                timestamp=timestamp,
+            )
+        )
+
+    def read_changes(self, body=None, options=None):
+        start, page_size = _page(options)
+        with self._lock:
+            positions = range(start, len(self._changes))
+            if not (options or {}).get("continuation_token") and body and body.start_time:
+                start_time = body.start_time
+                if isinstance(start_time, str):
+                    start_time = datetime.fromisoformat(start_time.replace("Z", "+00:00"))
+                positions = [
+                    i for i in positions if self._changes[i].timestamp >= start_time
+                ]
+            object_type = body.type if body else None
+            page = []
+            end = start
+            for i in positions:
+                change = self._changes[i]
+                if object_type and object_type != change.tuple_key.object.split(":", 1)[0]:
+                    end = i + 1
+                    continue
+                if len(page) == page_size:
+                    break
+                page.append(change)
+                end = i + 1
+        # Like the server, a token is returned even when there are no changes
+        return ReadChangesResponse(changes=page, continuation_token=str(end))
+
+
+class AsyncFakeClient:
+    """The fake's API for ``await`` callers, sharing the sync fake's store."""
+
+    def __init__(self, fake: FakeOpenFgaClient):
+        self._fake = fake
+
+    def __getattr__(self, name):
+        attr = getattr(self._fake, name)
+        if name.startswith(("get_", "set_")) or not callable(attr):
+            return attr
+
+        async def call(*args, **kwargs):
+            return attr(*args, **kwargs)
+
+        return call
+
+    async def streamed_list_objects(self, body, options=None):
+        for response in self._fake.streamed_list_objects(body, options):
+            yield response
+
+
+_fake: FakeOpenFgaClient | None = None
+_fake_lock = threading.Lock()
+
+
+def get_fake_client() -> FakeOpenFgaClient:
+    """The process's fake, loaded from ``OPENFGA_SCHEMA_PATH`` on first use."""
+    global _fake
+    if _fake is None:
+        with _fake_lock:
+            if _fake is None:
+                _fake = FakeOpenFgaClient.from_file()
+    return _fake
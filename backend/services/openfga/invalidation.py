@@ -0,0 +1,102 @@
+"""
+Event-driven invalidation of data derived from OpenFGA tuples.
+
+The changelog tailer (``authz.changes``) calls :func:`publish` with the
+objects whose tuples changed. Events reach the other processes through
+Django's cache: a sequence number plus one short-lived entry per event.
+Every process calls :func:`poll` at the start of a request (see
+``services.openfga.middleware``), which costs a single cache read when
+nothing changed, and only when the shared decision cache is enabled. A
+process-local cache backend would keep every process deaf to the others'
+events, so with the decision cache or ``OPENFGA_TAIL_CHANGES`` enabled,
+:func:`check_shared_cache` refuses one outside DEBUG (called when ``authz``
+loads).
+
+Consumers connect to :data:`tuples_changed`. ``object_keys`` is ``None``
+when events were missed and everything derived from tuples must be dropped.
+The decision cache is connected here; serialized payload caches can connect
+the same way.
+"""
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.dispatch import Signal, receiver
+
+from .cache import decision_cache
+from .settings import DECISION_CACHE_TTL, TAIL_CHANGES
+
+tuples_changed = Signal()  # provides object_keys: list[str] | None
+
+SEQUENCE_KEY = "openfga:changes:seq"
+EVENT_KEY = "openfga:changes:event:{}"
+# Events older than this are gone; processes that fall further behind flush
+EVENT_TTL = 300
+MAX_BACKLOG = 1000
+PROCESS_LOCAL_BACKENDS = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+}
+
+_seen: int | None = None
+_seen_lock = threading.Lock()
+
+
+def check_shared_cache():
+    if not (TAIL_CHANGES or DECISION_CACHE_TTL > 0):
+        return
+    backend = settings.CACHES["default"]["BACKEND"]
+    if backend in PROCESS_LOCAL_BACKENDS and not settings.DEBUG:
+        raise ImproperlyConfigured(
+            f"OpenFGA invalidation events need a cache shared by all processes, "
+            f"not {backend}. Set REDIS_URL."
+        )
+
+
+def publish(object_keys):
+    object_keys = sorted(set(object_keys))
+    if not object_keys:
+        return
+    tuples_changed.send(sender=publish, object_keys=object_keys)
+    try:
+        sequence = cache.incr(SEQUENCE_KEY)
+    except ValueError:
+        cache.add(SEQUENCE_KEY, 0, None)
+        sequence = cache.incr(SEQUENCE_KEY)
+    cache.set(EVENT_KEY.format(sequence), object_keys, EVENT_TTL)
+    global _seen
+    with _seen_lock:
+        # Don't replay our own event on the next poll
+        if _seen == sequence - 1:
+            _seen = sequence
+
+
+def poll():
+    """Apply the events published by other processes since the last poll."""
+    global _seen
+    current = cache.get(SEQUENCE_KEY, 0)
+    with _seen_lock:
+        previous, _seen = _seen, current
+    if previous is None or current == previous:
+        return
+    if current < previous or current - previous > MAX_BACKLOG:
+        # The cache was flushed or we are too far behind
+        tuples_changed.send(sender=poll, object_keys=None)
+        return
+    events = cache.get_many(
+        [EVENT_KEY.format(sequence) for sequence in range(previous + 1, current + 1)]
+    )
+    if len(events) < current - previous:
+        tuples_changed.send(sender=poll, object_keys=None)
+        return
+    object_keys = sorted({key for keys in events.values() for key in keys})
+    tuples_changed.send(sender=poll, object_keys=object_keys)
+
+
+@receiver(tuples_changed, dispatch_uid="invalidate_decision_cache")
+def invalidate_decision_cache(sender, object_keys, **kwargs):
+    if object_keys is None:
+        decision_cache.clear()
+    else:
+        decision_cache.invalidate(object_keys)
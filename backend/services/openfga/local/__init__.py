@@ -0,0 +1,225 @@
+"""
+In-process evaluation of OpenFGA checks.
+
+When ``OPENFGA_LOCAL_EVALUATION`` is enabled, each process keeps a replica of
+the store (:class:`TupleIndex`), loaded with one paginated read and kept up
+to date from the ReadChanges API. It evaluates the model's rewrites against
+that replica. Checks fall back to the server (the caller gets ``None``) when:
+
+- the replica couldn't be loaded or is older than ``LOCAL_MAX_STALENESS``;
+- the relation uses a rewrite the evaluator doesn't support;
+- the read needs higher consistency (see ``services.openfga.consistency``).
+"""
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from openfga_sdk import ReadRequestTupleKey
+from openfga_sdk.client.models import ClientReadChangesRequest
+from openfga_sdk.models.consistency_preference import ConsistencyPreference
+from openfga_sdk.models.tuple_operation import TupleOperation
+
+from ..consistency import preference
+from ..settings import (
+    LOCAL_EVALUATION,
+    LOCAL_MAX_STALENESS,
+    LOCAL_SYNC_INTERVAL,
+    READ_PAGE_SIZE,
+)
+from ..sync import client as default_client, read_model
+from ..sync.tuples import read_tuples
+from .index import TupleIndex
+from .model import (
+    Computed,
+    Model,
+    This,
+    TupleToUserset,
+    Union,
+    Unsupported,
+    model_from_sdk,
+)
+
+logger = logging.getLogger(__name__)
+
+# OpenFGA's default resolution depth limit
+MAX_DEPTH = 25
+# Changes committed while the initial read runs are replayed from this far back
+CHANGES_OVERLAP = timedelta(seconds=5)
+
+
+class LocalEvaluator:
+    def __init__(self, fga_client=None, model: Model | None = None):
+        self.client = fga_client or default_client
+        self.model = model
+        self.index = TupleIndex()
+        self._loaded = False
+        self._continuation_token: str | None = None
+        self._start_time: str | None = None
+        self._synced_at = 0.0
+        self._sync_lock = threading.Lock()
+
+    # Replication
+
+    def load(self):
+        """Load the model and every tuple, then start following the changelog."""
+        start_time = datetime.now(timezone.utc) - CHANGES_OVERLAP
+        if self.model is None:
+            self.model = model_from_sdk(read_model(self.client))
+        with self.index.lock:
+            self.index.clear()
+            for t in read_tuples(ReadRequestTupleKey()):
+                self.index.add(t.user, t.relation, t.object)
+        self._start_time = start_time.strftime("%Y-%m-%dT%H:%M:%SZ")
+        self._continuation_token = None
+        self._loaded = True
+        self.sync_changes()
+        logger.info(f"Loaded {len(self.index)} tuples for local OpenFGA evaluation")
+
+    def sync_changes(self):
+        """Apply the changes recorded since the last sync."""
+        while True:
+            options = {"page_size": READ_PAGE_SIZE}
+            if self._continuation_token:
+                options["continuation_token"] = self._continuation_token
+            start_time = None if self._continuation_token else self._start_time
+            response = self.client.read_changes(
+                ClientReadChangesRequest(type=None, start_time=start_time), options
+            )
+            with self.index.lock:
+                for change in response.changes:
+                    key = change.tuple_key
+                    if change.operation == TupleOperation.DELETE:
+                        self.index.discard(key.user, key.relation, key.object)
+                    else:
+                        self.index.add(key.user, key.relation, key.object)
+            # The token is returned even when there are no more changes
+            if response.continuation_token:
+                self._continuation_token = response.continuation_token
+            if not response.changes:
+                break
+        self._synced_at = time.monotonic()
+
+    def is_fresh(self) -> bool:
+        """Sync if due, and report whether the replica can answer checks."""
+        age = time.monotonic() - self._synced_at
+        if self._loaded and age < LOCAL_SYNC_INTERVAL:
+            return True
+        # Only one thread syncs; the others use the replica as is if it is
+        # recent enough, or fall back to the server
+        if self._sync_lock.acquire(blocking=False):
+            try:
+                if not self._loaded:
+                    self.load()
+                elif time.monotonic() - self._synced_at >= LOCAL_SYNC_INTERVAL:
+                    self.sync_changes()
+            except Exception as e:
+                logger.warning(f"Local OpenFGA replica sync failed: {e}")
+            finally:
+                self._sync_lock.release()
+        return self._loaded and time.monotonic() - self._synced_at < LOCAL_MAX_STALENESS
+
+    # Evaluation
+
+    def check(self, user: str, relation: str, object_: str) -> bool | None:
+        """Evaluate a check locally, or return ``None`` to defer to the server."""
+        if not self.is_fresh():
+            return None
+        try:
+            return self.evaluate(user, relation, object_)
+        except Unsupported:
+            return None
+
+    def list_objects(self, user: str, relation: str, object_type: str) -> set[str] | None:
+        if not self.is_fresh():
+            return None
+        try:
+            return self.evaluate_objects(user, relation, object_type)
+        except Unsupported:
+            return None
+
+    def evaluate(self, user: str, relation: str, object_: str) -> bool:
+        """Evaluate against the index as is; raises :class:`Unsupported`."""
+        with self.index.lock:
+            return self._check(user, relation, object_, frozenset(), 0)
+
+    def evaluate_objects(self, user: str, relation: str, object_type: str) -> set[str]:
+        with self.index.lock:
+            return {
+                object_
+                for object_ in list(self.index.objects(object_type))
+                if self._check(user, relation, object_, frozenset(), 0)
+            }
+
+    def _check(self, user, relation, object_, visiting, depth) -> bool:
+        if depth > MAX_DEPTH:
+            raise Unsupported("resolution depth exceeded")
+        key = (relation, object_)
+        if key in visiting:
+            return False
+        relations = self.model.get(object_.split(":", 1)[0])
+        if relations is None or relations.get(relation) is None:
+            raise Unsupported(f"{object_}#{relation}")
+        return self._evaluate(
+            relations[relation], user, relation, object_, visiting | {key}, depth + 1
+        )
+
+    def _evaluate(self, rewrite, user, relation, object_, visiting, depth) -> bool:
+        if isinstance(rewrite, This):
+            subjects = self.index.subjects(object_, relation)
+            if user in subjects or f"{user.split(':', 1)[0]}:*" in subjects:
+                return True
+            return any(
+                self._check(user, subject_relation, subject_object, visiting, depth)
+                for subject_object, _, subject_relation in (
+                    subject.partition("#") for subject in subjects if "#" in subject
+                )
+            )
+        if isinstance(rewrite, Computed):
+            return self._check(user, rewrite.relation, object_, visiting, depth)
+        if isinstance(rewrite, TupleToUserset):
+            return any(
+                self._check(user, rewrite.relation, parent, visiting, depth)
+                for parent in list(self.index.subjects(object_, rewrite.tupleset))
+                if "#" not in parent
+            )
+        if isinstance(rewrite, Union):
+            return any(
+                self._evaluate(child, user, relation, object_, visiting, depth)
+                for child in rewrite.children
+            )
+        raise Unsupported(type(rewrite).__name__)
+
+
+_evaluator: LocalEvaluator | None = None
+_evaluator_lock = threading.Lock()
+
+
+def get_evaluator() -> LocalEvaluator | None:
+    """The process's evaluator, or ``None`` when local evaluation is disabled."""
+    global _evaluator
+    if not LOCAL_EVALUATION:
+        return None
+    if _evaluator is None:
+        with _evaluator_lock:
+            if _evaluator is None:
+                _evaluator = LocalEvaluator()
+    return _evaluator
+
+
+def get_read_evaluator() -> LocalEvaluator | None:
+    """The evaluator, unless disabled or the current read must not be stale."""
+    if preference() == ConsistencyPreference.HIGHER_CONSISTENCY:
+        return None
+    return get_evaluator()
+
+
+def _reset_after_fork():
+    # Each worker keeps its own replica; the parent's sync lock may be held.
+    global _evaluator, _evaluator_lock
+    _evaluator = None
+    _evaluator_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
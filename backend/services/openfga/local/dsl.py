@@ -0,0 +1,120 @@
+"""
+Parser for the subset of the OpenFGA modeling language used by
+``openfga/schemas/lms.fga``.
+
+Supported: ``type`` blocks, direct assignment (``[user, user:*,
+group#member]``), computed relations, ``x from y`` and ``or``. Relations
+using ``and``, ``but not``, parentheses or conditions parse to ``None``, like
+unsupported rewrites in :func:`model_from_sdk`.
+"""
+import re
+from dataclasses import dataclass, field
+
+from openfga_sdk import (
+    AuthorizationModel,
+    ObjectRelation,
+    TypeDefinition,
+    Userset,
+    Usersets,
+)
+from openfga_sdk import TupleToUserset as SdkTupleToUserset
+
+from .model import Computed, Model, Rewrite, This, TupleToUserset, Union
+
+_DEFINE = re.compile(r"^define\s+(\w+)\s*:\s*(.+)$")
+_UNSUPPORTED = re.compile(r"\band\b|\bbut not\b|[()]|\bwith\b")
+
+
+class SchemaError(ValueError):
+    pass
+
+
+@dataclass
+class Schema:
+    model: Model = field(default_factory=dict)
+    # type -> relation -> subject types that can be assigned directly
+    # (``user``, ``user:*``, ``group#member``)
+    assignable: dict[str, dict[str, frozenset[str]]] = field(default_factory=dict)
+
+
+def _parse_term(term: str, assignable: set[str]) -> Rewrite:
+    if term.startswith("["):
+        if not term.endswith("]"):
+            raise SchemaError(f"Unterminated type restriction: {term}")
+        assignable.update(t.strip() for t in term[1:-1].split(",") if t.strip())
+        return This()
+    parts = term.split()
+    if len(parts) == 3 and parts[1] == "from":
+        return TupleToUserset(tupleset=parts[2], relation=parts[0])
+    if len(parts) == 1:
+        return Computed(parts[0])
+    raise SchemaError(f"Cannot parse relation term: {term}")
+
+
+def _parse_expression(expression: str, assignable: set[str]) -> Rewrite | None:
+    if _UNSUPPORTED.search(expression):
+        return None
+    children = tuple(
+        _parse_term(term.strip(), assignable) for term in expression.split(" or ")
+    )
+    return children[0] if len(children) == 1 else Union(children)
+
+
+def parse(source: str) -> Schema:
+    schema = Schema()
+    current: str | None = None
+    for number, line in enumerate(source.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line in ("model", "relations") or line.startswith("schema "):
+            continue
+        if line.startswith("type "):
+            current = line.removeprefix("type ").strip()
+            schema.model[current] = {}
+            schema.assignable[current] = {}
+            continue
+        if line.startswith("condition "):
+            raise SchemaError(f"Line {number}: conditions are not supported")
+        match = _DEFINE.match(line)
+        if match is None or current is None:
+            raise SchemaError(f"Line {number}: cannot parse {line!r}")
+        relation, expression = match.groups()
+        assignable: set[str] = set()
+        schema.model[current][relation] = _parse_expression(expression, assignable)
+        schema.assignable[current][relation] = frozenset(assignable)
+    return schema
+
+
+def _userset(rewrite: Rewrite) -> Userset:
+    if isinstance(rewrite, This):
+        return Userset(this={})
+    if isinstance(rewrite, Computed):
+        return Userset(
+            computed_userset=ObjectRelation(object="", relation=rewrite.relation)
+        )
+    if isinstance(rewrite, TupleToUserset):
+        return Userset(
+            tuple_to_userset=SdkTupleToUserset(
+                tupleset=ObjectRelation(object="", relation=rewrite.tupleset),
+                computed_userset=ObjectRelation(object="", relation=rewrite.relation),
+            )
+        )
+    return Userset(union=Usersets(child=[_userset(child) for child in rewrite.children]))
+
+
+def to_sdk(schema: Schema, model_id: str) -> AuthorizationModel:
+    """The schema as returned by ReadAuthorizationModel, without type metadata."""
+    type_definitions = []
+    for type_name, relations in schema.model.items():
+        if any(rewrite is None for rewrite in relations.values()):
+            raise SchemaError(f"Type {type_name} uses unsupported operators")
+        type_definitions.append(
+            TypeDefinition(
+                type=type_name,
+                relations={name: _userset(rewrite) for name, rewrite in relations.items()},
+            )
+        )
+    return AuthorizationModel(
+        id=model_id, schema_version="1.1", type_definitions=type_definitions
+    )
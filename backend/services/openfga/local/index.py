@@ -0,0 +1,40 @@
+import threading
+from collections import defaultdict
+
+
+class TupleIndex:
+    """In-memory replica of the store's tuples, indexed for rewrite evaluation."""
+
+    def __init__(self):
+        self._subjects: defaultdict[tuple[str, str], set[str]] = defaultdict(set)
+        self._objects: defaultdict[str, set[str]] = defaultdict(set)
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return sum(len(subjects) for subjects in self._subjects.values())
+
+    def add(self, user: str, relation: str, object_: str):
+        with self.lock:
+            self._subjects[(object_, relation)].add(user)
+            self._objects[object_.split(":", 1)[0]].add(object_)
+
+    def discard(self, user: str, relation: str, object_: str):
+        with self.lock:
+            subjects = self._subjects.get((object_, relation))
+            if subjects is not None:
+                subjects.discard(user)
+                if not subjects:
+                    del self._subjects[(object_, relation)]
+
+    def clear(self):
+        with self.lock:
+            self._subjects.clear()
+            self._objects.clear()
+
+    def subjects(self, object_: str, relation: str) -> set[str]:
+        """Subjects stored on ``object_#relation``; callers hold ``lock``."""
+        return self._subjects.get((object_, relation), set())
+
+    def objects(self, object_type: str) -> set[str]:
+        """Objects of ``object_type`` that appear in at least one tuple."""
+        return self._objects.get(object_type, set())
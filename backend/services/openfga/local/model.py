@@ -0,0 +1,80 @@
+"""
+Authorization model rewrites in the shape the local evaluator walks.
+
+Only the operators used by ``openfga/schemas/lms.fga`` are supported: direct
+assignment, computed relations, tuple-to-userset and union. Relations using
+anything else (intersection, exclusion, conditions) are recorded as ``None``
+and always answered by the server.
+"""
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class This:
+    """Directly assigned subjects, including wildcards and usersets."""
+
+
+@dataclass(frozen=True)
+class Computed:
+    relation: str
+
+
+@dataclass(frozen=True)
+class TupleToUserset:
+    tupleset: str
+    relation: str
+
+
+@dataclass(frozen=True)
+class Union:
+    children: tuple
+
+
+Rewrite = This | Computed | TupleToUserset | Union
+# type -> relation -> rewrite, ``None`` when the rewrite is unsupported
+Model = dict[str, dict[str, Rewrite | None]]
+
+
+class Unsupported(Exception):
+    pass
+
+
+def _rewrite_from_sdk(userset) -> Rewrite:
+    if userset.this is not None:
+        return This()
+    if userset.computed_userset is not None:
+        return Computed(userset.computed_userset.relation)
+    if userset.tuple_to_userset is not None:
+        ttu = userset.tuple_to_userset
+        return TupleToUserset(ttu.tupleset.relation, ttu.computed_userset.relation)
+    if userset.union is not None:
+        return Union(tuple(_rewrite_from_sdk(child) for child in userset.union.child))
+    raise Unsupported("intersection and exclusion are not evaluated locally")
+
+
+def _has_conditions(type_definition) -> bool:
+    metadata = type_definition.metadata
+    if metadata is None or not metadata.relations:
+        return False
+    return any(
+        reference.condition
+        for relation in metadata.relations.values()
+        for reference in relation.directly_related_user_types or []
+    )
+
+
+def model_from_sdk(authorization_model) -> Model:
+    """Convert an ``AuthorizationModel`` returned by the OpenFGA API."""
+    model: Model = {}
+    for type_definition in authorization_model.type_definitions:
+        relations = model[type_definition.type] = {}
+        if _has_conditions(type_definition):
+            # Conditional tuples need the request context; leave them to the server
+            relations.update({name: None for name in type_definition.relations or {}})
+            continue
+        for name, userset in (type_definition.relations or {}).items():
+            try:
+                relations[name] = _rewrite_from_sdk(userset)
+            except Unsupported:
+                relations[name] = None
+    return model
@@ -0,0 +1,268 @@
+"""
+Metrics for OpenFGA calls.
+
+Clients are wrapped in :class:`InstrumentedClient`, which times every API
+call with ``time.perf_counter`` and records, per process:
+
+- a latency histogram and a call count per (method, object type, relation);
+- error counts per exception class;
+- the number of tuples written and deleted;
+- per endpoint, how many calls its requests made (see
+  ``services.openfga.middleware``, which also reports the request's totals to
+  staff in a ``Server-Timing`` header).
+
+Calls slower than ``OPENFGA_SLOW_CALL_MS`` are logged. :func:`snapshot`
+returns everything as plain data.
+"""
+import contextlib
+import contextvars
+import functools
+import inspect
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from typing import Iterator
+
+from .settings import SLOW_CALL_MS
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the latency buckets, in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+INSTRUMENTED_METHODS = frozenset(
+    {
+        "check",
+        "batch_check",
+        "read",
+        "read_changes",
+        "write",
+        "list_objects",
+        "list_relations",
+        "list_users",
+    }
+)
+# Label used when a call spans several relations or object types
+MIXED = "*"
+
+Labels = tuple[str, str, str]  # (method, object_type, relation)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self) -> dict:
+        cumulative, buckets = 0, {}
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {"count": self.count, "sum": self.sum, "buckets": buckets}
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.latency: defaultdict[Labels, Histogram] = defaultdict(Histogram)
+            self.errors: Counter[tuple[str, str]] = Counter()
+            self.tuples: Counter[str] = Counter()
+            self.endpoints: defaultdict[str, Counter] = defaultdict(Counter)
+
+    def record_call(self, labels: Labels, duration: float, error: Exception | None = None):
+        with self._lock:
+            self.latency[labels].observe(duration)
+            if error is not None:
+                self.errors[(labels[0], type(error).__name__)] += 1
+
+    def record_tuples(self, writes: int, deletes: int):
+        with self._lock:
+            self.tuples["writes"] += writes
+            self.tuples["deletes"] += deletes
+
+    def record_request(self, endpoint: str, stats: "RequestStats"):
+        with self._lock:
+            totals = self.endpoints[endpoint]
+            totals["requests"] += 1
+            totals["calls"] += stats.calls
+            totals["duration"] += stats.duration
+
+    def call_count(self) -> int:
+        """Calls recorded so far, all methods included."""
+        with self._lock:
+            return sum(histogram.count for histogram in self.latency.values())
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "calls": [
+                    {
+                        "method": method,
+                        "object_type": object_type,
+                        "relation": relation,
+                        "latency": histogram.snapshot(),
+                    }
+                    for (method, object_type, relation), histogram in sorted(
+                        self.latency.items()
+                    )
+                ],
+                "errors": [
+                    {"method": method, "error": error, "count": count}
+                    for (method, error), count in sorted(self.errors.items())
+                ],
+                "tuples": dict(self.tuples),
+                # Endpoints making the most round trips first
+                "endpoints": sorted(
+                    (
+                        {"endpoint": endpoint, **totals}
+                        for endpoint, totals in self.endpoints.items()
+                    ),
+                    key=lambda e: e["calls"],
+                    reverse=True,
+                ),
+            }
+
+
+registry = MetricsRegistry()
+
+
+def snapshot() -> dict:
+    return registry.snapshot()
+
+
+class RequestStats:
+    """OpenFGA calls made while handling one request (including worker threads)."""
+
+    def __init__(self):
+        self.calls = 0
+        self.duration = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, duration: float):
+        with self._lock:
+            self.calls += 1
+            self.duration += duration
+
+    def server_timing(self) -> str:
+        return f'fga;dur={self.duration * 1000:.1f};desc="{self.calls} calls"'
+
+
+_request_stats: contextvars.ContextVar[RequestStats | None] = contextvars.ContextVar(
+    "openfga_request_stats", default=None
+)
+
+
+@contextlib.contextmanager
+def request_stats() -> Iterator[RequestStats]:
+    stats = RequestStats()
+    token = _request_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _request_stats.reset(token)
+
+
+def _common(values) -> str:
+    values = {value for value in values if value}
+    if len(values) == 1:
+        return values.pop()
+    return MIXED if values else ""
+
+
+def _object_type(object_: str | None) -> str | None:
+    return object_.split(":", 1)[0] if object_ else None
+
+
+def _labels(method: str, body) -> Labels:
+    """Object type and relation of a request body, whatever its shape."""
+    if body is None:
+        return (method, "", "")
+    if method == "batch_check":
+        items = body.checks or []
+        return (
+            method,
+            _common(_object_type(item.object) for item in items),
+            _common(item.relation for item in items),
+        )
+    if method == "write":
+        tuples = (body.writes or []) + (body.deletes or [])
+        return (
+            method,
+            _common(_object_type(t.object) for t in tuples),
+            _common(t.relation for t in tuples),
+        )
+    if method == "list_relations":
+        return (method, _object_type(body.object) or "", _common(body.relations or []))
+    object_type = getattr(body, "type", None) or _object_type(getattr(body, "object", None))
+    return (method, object_type or "", getattr(body, "relation", None) or "")
+
+
+def _record(method: str, body, duration: float, error: Exception | None):
+    try:
+        labels = _labels(method, body)
+    except AttributeError:
+        labels = (method, "", "")
+    registry.record_call(labels, duration, error)
+    if error is None and method == "write":
+        registry.record_tuples(len(body.writes or []), len(body.deletes or []))
+    if (stats := _request_stats.get()) is not None:
+        stats.add(duration)
+    if duration * 1000 >= SLOW_CALL_MS:
+        _, object_type, relation = labels
+        logger.warning(
+            f"Slow OpenFGA {method} ({object_type}#{relation}) took {duration * 1000:.1f}ms"
+        )
+
+
+class InstrumentedClient:
+    """Wrap a sync or async OpenFGA client, recording metrics for API calls."""
+
+    def __init__(self, client):
+        self._client = client
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name not in INSTRUMENTED_METHODS:
+            return attr
+
+        if inspect.iscoroutinefunction(attr):
+
+            @functools.wraps(attr)
+            async def timed_async(body=None, *args, **kwargs):
+                start = time.perf_counter()
+                error = None
+                try:
+                    return await attr(body, *args, **kwargs)
+                except Exception as e:
+                    error = e
+                    raise
+                finally:
+                    _record(name, body, time.perf_counter() - start, error)
+
+            return timed_async
+
+        @functools.wraps(attr)
+        def timed(body=None, *args, **kwargs):
+            start = time.perf_counter()
+            error = None
+            try:
+                return attr(body, *args, **kwargs)
+            except Exception as e:
+                error = e
+                raise
+            finally:
+                _record(name, body, time.perf_counter() - start, error)
+
+        return timed
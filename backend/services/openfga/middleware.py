@@ -0,0 +1,77 @@
+import math
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.http import JsonResponse
+
+from .breaker import CircuitOpenError
+from .cache import decision_cache, request_scope
+from .consistency import consistency_scope
+from .invalidation import poll
+from .metrics import registry, request_stats
+from .settings import SERVER_TIMING
+
+
+class FGARequestScopeMiddleware:
+    """
+    Scope OpenFGA check memoization and write tracking to a single request.
+
+    The request's OpenFGA calls are added to the endpoint's totals in
+    ``services.openfga.metrics`` and, for staff users or with
+    ``OPENFGA_SERVER_TIMING``, reported in a ``Server-Timing`` header. Requests
+    that need OpenFGA while its circuit is open get a 503.
+
+    Under ASGI the middleware runs async, so async views keep the event loop.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        # Drop cached decisions on objects changed by other processes
+        if decision_cache.shared.enabled:
+            poll()
+        with request_scope(), consistency_scope(request), request_stats() as stats:
+            response = self.get_response(request)
+        return self.finish(request, response, stats)
+
+    async def __acall__(self, request):
+        if decision_cache.shared.enabled:
+            await sync_to_async(poll)()
+        with request_scope(), consistency_scope(request), request_stats() as stats:
+            response = await self.get_response(request)
+        # Resolving the lazy request.user may query the database
+        return await sync_to_async(self.finish)(request, response, stats)
+
+    def finish(self, request, response, stats):
+        if stats.calls and self.reports_timing(request):
+            timing = stats.server_timing()
+            if existing := response.headers.get("Server-Timing"):
+                timing = f"{existing}, {timing}"
+            response.headers["Server-Timing"] = timing
+        match = request.resolver_match
+        endpoint = match.route if match is not None else "<unresolved>"
+        registry.record_request(f"{request.method} {endpoint}", stats)
+        return response
+
+    @staticmethod
+    def reports_timing(request) -> bool:
+        # DRF sets the authenticated user on the underlying request too
+        user = getattr(request, "user", None)
+        return SERVER_TIMING or (user is not None and user.is_staff)
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, CircuitOpenError):
+            return None
+        return JsonResponse(
+            {"detail": "Authorization service unavailable, try again later."},
+            status=503,
+            headers={"Retry-After": str(max(1, math.ceil(exception.retry_after)))},
+        )
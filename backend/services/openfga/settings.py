@@ -1,19 +1,121 @@
+import socket
+from pathlib import Path
+
 from openfga_sdk.client import ClientConfiguration
+from openfga_sdk.configuration import RetryParams
 from openfga_sdk.credentials import Credentials, CredentialConfiguration
 from os import getenv
+from urllib3.connection import HTTPConnection
 
 _OPENFGA_API_URL = getenv("OPENFGA_API_URL")
 _OPENFGA_STORE_ID = getenv("OPENFGA_STORE_ID")
-# _OPENFGA_MODEL_ID = getenv("OPENFGA_MODEL_ID")
+_OPENFGA_MODEL_ID = getenv("OPENFGA_MODEL_ID") or None
 _OPENFGA_API_TOKEN = getenv("OPENFGA_API_TOKEN")
 
+# Without OPENFGA_MODEL_ID, each process pins the store's latest model when
+# its client is created and re-resolves it every MODEL_ID_CACHE_TTL seconds;
+# the id is shared between processes for as long (see
+# services.openfga.sync.pin_model_id).
+MODEL_ID = _OPENFGA_MODEL_ID
+MODEL_ID_CACHE_TTL = int(getenv("OPENFGA_MODEL_ID_CACHE_TTL", "300"))
+
+# Replace the OpenFGA server with an in-memory fake evaluating SCHEMA_PATH
+# (see services.openfga.fake), e.g. for tests and benchmarks.
+FAKE_CLIENT = getenv("OPENFGA_FAKE_CLIENT", "False").lower() in ("true", "1")
+SCHEMA_PATH = getenv(
+    "OPENFGA_SCHEMA_PATH",
+    str(Path(__file__).resolve().parents[3] / "openfga" / "schemas" / "lms.fga"),
+)
+
+# Decision cache (see services.openfga.cache). The shared cache serves
+# decisions up to TTL seconds old, so it is opt-in: the default of 0 disables
+# it; the per-request memo stays active.
+DECISION_CACHE_TTL = float(getenv("OPENFGA_DECISION_CACHE_TTL", "0"))
+DECISION_CACHE_MAX_SIZE = int(getenv("OPENFGA_DECISION_CACHE_MAX_SIZE", "10000"))
+# Tail OpenFGA's changelog (authz.changes) to mirror tuples, index role grants
+# and publish invalidations to the other processes' decision caches. On by
+# default with the shared decision cache, and either needs a shared Django
+# cache (see services.openfga.invalidation).
+TAIL_CHANGES = getenv(
+    "OPENFGA_TAIL_CHANGES", str(DECISION_CACHE_TTL > 0)
+).lower() in ("true", "1")
+# Number of objects resolved per batch_check call when filtering list endpoints.
+BATCH_CHECK_CHUNK_SIZE = int(getenv("OPENFGA_BATCH_CHECK_CHUNK_SIZE", "200"))
+# Candidate rows a list endpoint batch-checks at most; larger querysets are
+# filtered with one list_objects call instead (see services.openfga.sync.filters).
+FILTER_BATCH_CHECK_LIMIT = int(getenv("OPENFGA_FILTER_BATCH_CHECK_LIMIT", "1000"))
+# Seconds a user's queries use HIGHER_CONSISTENCY after they caused a tuple
+# write (see services.openfga.consistency). Match OpenFGA's check cache TTL.
+CONSISTENCY_WINDOW = float(getenv("OPENFGA_CONSISTENCY_WINDOW", "10"))
+# Tuples fetched per Read page, and tuples per Write request (OpenFGA caps a
+# write at 100 tuples by default).
+READ_PAGE_SIZE = int(getenv("OPENFGA_READ_PAGE_SIZE", "100"))
+MAX_TUPLES_PER_WRITE = int(getenv("OPENFGA_MAX_TUPLES_PER_WRITE", "100"))
+# Concurrent write requests used by bulk tuple writes (imports, cloning).
+BULK_WRITE_WORKERS = int(getenv("OPENFGA_BULK_WRITE_WORKERS", "4"))
+# Seconds sync code waits for a coroutine run on the async client's loop
+# (see services.openfga.async.run) before cancelling it.
+ASYNC_RUN_TIMEOUT = float(getenv("OPENFGA_ASYNC_RUN_TIMEOUT", "30"))
+
+# In-process evaluation of checks against a replica of the store (see
+# services.openfga.local). The replica pulls changes at most every
+# LOCAL_SYNC_INTERVAL seconds; checks go to the server once it is older than
+# LOCAL_MAX_STALENESS.
+LOCAL_EVALUATION = getenv("OPENFGA_LOCAL_EVALUATION", "False").lower() in ("true", "1")
+LOCAL_SYNC_INTERVAL = float(getenv("OPENFGA_LOCAL_SYNC_INTERVAL", "1"))
+LOCAL_MAX_STALENESS = float(getenv("OPENFGA_LOCAL_MAX_STALENESS", "10"))
+
+# Transport. Each process (gunicorn or celery worker) holds its own pool of
+# POOL_MAXSIZE keep-alive connections; size it to the worker's thread count
+# plus BULK_WRITE_WORKERS.
+POOL_MAXSIZE = int(getenv("OPENFGA_POOL_MAXSIZE", "16"))
+CONNECT_TIMEOUT_MS = int(getenv("OPENFGA_CONNECT_TIMEOUT_MS", "1000"))
+READ_TIMEOUT_MS = int(getenv("OPENFGA_READ_TIMEOUT_MS", "5000"))
+KEEPALIVE = getenv("OPENFGA_KEEPALIVE", "True").lower() in ("true", "1")
+# Retries of 429 and 5xx responses, with jittered exponential backoff
+# (done by the SDK).
+MAX_RETRY = int(getenv("OPENFGA_MAX_RETRY", "3"))
+RETRY_MIN_WAIT_MS = int(getenv("OPENFGA_RETRY_MIN_WAIT_MS", "50"))
+
+# Circuit breaker (see services.openfga.breaker). Consecutive failures that
+# open the circuit (0 disables it) and seconds before a probe call is let
+# through. With BREAKER_SERVE_STALE, read-only requests get the last cached
+# decision while the circuit is open.
+BREAKER_FAILURE_THRESHOLD = int(getenv("OPENFGA_BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_TIMEOUT = float(getenv("OPENFGA_BREAKER_RESET_TIMEOUT", "10"))
+BREAKER_SERVE_STALE = getenv("OPENFGA_BREAKER_SERVE_STALE", "False").lower() in ("true", "1")
+
+# Client calls slower than this are logged (see services.openfga.metrics).
+SLOW_CALL_MS = float(getenv("OPENFGA_SLOW_CALL_MS", "250"))
+# Report each request's OpenFGA calls in a Server-Timing header to every
+# client; staff users always get it (see services.openfga.middleware).
+SERVER_TIMING = getenv("OPENFGA_SERVER_TIMING", "False").lower() in ("true", "1")
+
+
+def _socket_options() -> list[tuple]:
+    options = list(HTTPConnection.default_socket_options)
+    if KEEPALIVE:
+        options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+        # Probe idle connections so ones dropped by a load balancer are noticed
+        for name, value in (("TCP_KEEPIDLE", 60), ("TCP_KEEPINTVL", 10), ("TCP_KEEPCNT", 3)):
+            if hasattr(socket, name):
+                options.append((socket.IPPROTO_TCP, getattr(socket, name), value))
+    return options
+
+
 configuration = ClientConfiguration(
     api_url=_OPENFGA_API_URL,
     store_id=_OPENFGA_STORE_ID,
+    authorization_model_id=_OPENFGA_MODEL_ID,
     credentials=Credentials(
         method="api_token",
         configuration=CredentialConfiguration(
             api_token=_OPENFGA_API_TOKEN,
         ),
     ),
-)
\ No newline at end of file
+    # Total request budget; the sync client splits it into connect/read
+    timeout_millisec=CONNECT_TIMEOUT_MS + READ_TIMEOUT_MS,
+    retry_params=RetryParams(max_retry=MAX_RETRY, min_wait_in_ms=RETRY_MIN_WAIT_MS),
+)
+configuration.connection_pool_maxsize = POOL_MAXSIZE
+configuration.socket_options = _socket_options()
@@ -1,23 +1,216 @@
+"""
+Sync OpenFGA client, shared by the threads of a process.
+
+Clients are pinned to an authorization model (:func:`pin_model_id`) so the
+server doesn't resolve the store's latest model on every call.
+
+Rolling out a new model: with ``OPENFGA_MODEL_ID`` set, write the model,
+then deploy with the new id. Without it, processes move to the store's
+latest model within ``MODEL_ID_CACHE_TTL`` seconds of the write, each on
+its own schedule. Processes then run on both models for that window, so a
+new model must keep answering the old code's checks (add types and
+relations first, remove them in a later rollout).
+"""
+import hashlib
+import json
+import logging
+import math
+import os
+import threading
+import time
+
+from django.core.cache import cache
 from openfga_sdk.sync import OpenFgaClient
-from openfga_sdk import CreateStoreRequest, WriteAuthorizationModelRequest
+from openfga_sdk import (
+    AuthorizationModel,
+    CreateStoreRequest,
+    ReadRequestTupleKey,
+    WriteAuthorizationModelRequest,
+)
+
+
+from ..breaker import GuardedClient
+from ..metrics import InstrumentedClient
+from ..settings import (
+    CONNECT_TIMEOUT_MS,
+    FAKE_CLIENT,
+    MODEL_ID,
+    MODEL_ID_CACHE_TTL,
+    READ_TIMEOUT_MS,
+    configuration,
+)
+
+logger = logging.getLogger(__name__)
+
+MODEL_ID_CACHE_KEY = "openfga:model_id:{}"
+
+
+def pin_model_id(fga_client, refresh: bool = False) -> str | None:
+    """
+    Pin ``fga_client`` to an authorization model and return its id.
+
+    ``OPENFGA_MODEL_ID`` wins; otherwise the store's latest model is resolved
+    and shared with other processes through Django's cache for
+    ``MODEL_ID_CACHE_TTL`` seconds. ``refresh`` replaces a model pinned that
+    way with the one currently shared. The clients share ``configuration``,
+    so this pins the async clients too. Returns ``None`` if the model can't
+    be resolved; calls then use the pinned model, or the latest one.
+    """
+    if (model_id := fga_client.get_authorization_model_id()) and (
+        not refresh or MODEL_ID
+    ):
+        return model_id
+    key = MODEL_ID_CACHE_KEY.format(fga_client.get_store_id())
+    if (model_id := cache.get(key)) is None:
+        try:
+            response = fga_client.read_latest_authorization_model()
+        except Exception as e:
+            logger.warning(f"Could not resolve the OpenFGA authorization model: {e}")
+            return None
+        model_id = response.authorization_model.id
+        cache.set(key, model_id, MODEL_ID_CACHE_TTL)
+    if model_id != fga_client.get_authorization_model_id():
+        logger.info(f"Pinning OpenFGA authorization model {model_id}")
+        fga_client.set_authorization_model_id(model_id)
+    return model_id
+
+
+def create_client() -> OpenFgaClient:
+    if FAKE_CLIENT:
+        from ..fake import get_fake_client
+
+        return InstrumentedClient(get_fake_client())
+    new_client = OpenFgaClient(configuration)
+    # The configuration only carries a total timeout; urllib3 also accepts a
+    # (connect, read) pair in seconds, which fails fast on unreachable hosts.
+    new_client._api_client.rest_client._timeout_millisec = (
+        CONNECT_TIMEOUT_MS / 1000,
+        READ_TIMEOUT_MS / 1000,
+    )
+    wrapped = InstrumentedClient(GuardedClient(new_client))
+    if configuration.store_id:
+        pin_model_id(wrapped)
+    return wrapped
+
+
+class ProcessLocalClient:
+    """
+    Proxy to an ``OpenFgaClient`` created lazily in each process.
+
+    Gunicorn and celery fork workers after importing the app; a client (and
+    its pooled sockets) created in the parent must not be shared with them,
+    so the child drops the inherited client and builds its own on first use.
+    A model the client pinned itself is re-resolved every
+    ``MODEL_ID_CACHE_TTL`` seconds.
+    """
+
+    def __init__(self):
+        self._client: OpenFgaClient | None = None
+        self._lock = threading.Lock()
+        self._repin_at = math.inf
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._client = None
+        self._lock = threading.Lock()
 
+    def get(self) -> OpenFgaClient:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = create_client()
+                    if not (MODEL_ID or FAKE_CLIENT):
+                        self._repin_at = time.monotonic() + MODEL_ID_CACHE_TTL
+        elif time.monotonic() >= self._repin_at:
+            with self._lock:
+                if time.monotonic() >= self._repin_at:
+                    self._repin_at = time.monotonic() + MODEL_ID_CACHE_TTL
+                    if self._client.get_store_id():
+                        pin_model_id(self._client, refresh=True)
+        return self._client
 
-from ..settings import configuration
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
 
-client = OpenFgaClient(configuration)
+
+client = ProcessLocalClient()
+
+
+def read_model(fga_client=None) -> AuthorizationModel:
+    """The pinned authorization model, or the latest one if none is pinned."""
+    fga_client = fga_client or client
+    if fga_client.get_authorization_model_id():
+        return fga_client.read_authorization_model().authorization_model
+    return fga_client.read_latest_authorization_model().authorization_model
+
+
+def model_fingerprint(model: AuthorizationModel) -> str:
+    """Hash of a model's definitions, equal for models written from the same schema."""
+    definitions = {
+        "schema_version": model.schema_version,
+        "type_definitions": [t.to_dict() for t in model.type_definitions or []],
+        "conditions": {
+            name: condition.to_dict() for name, condition in (model.conditions or {}).items()
+        },
+    }
+    return hashlib.sha256(json.dumps(definitions, sort_keys=True).encode()).hexdigest()
+
+
+def _write_model(model: AuthorizationModel) -> str:
+    return client.write_authorization_model(
+        WriteAuthorizationModelRequest(
+            schema_version=model.schema_version,
+            type_definitions=model.type_definitions,
+            conditions=model.conditions,
+        )
+    ).authorization_model_id
 
 
 def clone_store(name: str) -> str:
-    auth_model = client.read_latest_authorization_model().authorization_model
+    auth_model = read_model()
     _old_store_id = client.get_store_id()
+    _old_model_id = client.get_authorization_model_id()
     new_store_id = client.create_store(CreateStoreRequest(name=name)).id
     client.set_store_id(new_store_id)
-    client.write_authorization_model(
-        WriteAuthorizationModelRequest(
-            schema_version=auth_model.schema_version,
-            type_definitions=auth_model.type_definitions,
-            conditions=auth_model.conditions,
-        )
-    )
+    _write_model(auth_model)
     client.set_store_id(_old_store_id)
+    client.set_authorization_model_id(_old_model_id)
     return new_store_id
+
+
+def template_store(prefix: str) -> tuple[str, str]:
+    """
+    Return ``(store_id, model_id)`` of a store holding the current model,
+    created on first use and reused afterwards (e.g. by every test run).
+
+    The store name embeds the model's fingerprint, so a schema change gets a
+    fresh store. Callers switch to it with ``set_store_id`` and
+    ``set_authorization_model_id`` and should :func:`clear_store` it.
+    """
+    model = read_model()
+    name = f"{prefix}-{model_fingerprint(model)[:12]}"
+    _old_store_id = client.get_store_id()
+    _old_model_id = client.get_authorization_model_id()
+    stores = client.list_stores({"name": name}).stores
+    try:
+        if stores:
+            client.set_store_id(stores[0].id)
+            client.set_authorization_model_id(None)
+            model_id = client.read_latest_authorization_model().authorization_model.id
+        else:
+            logger.info(f"Creating OpenFGA template store {name}")
+            client.set_store_id(client.create_store(CreateStoreRequest(name=name)).id)
+            model_id = _write_model(model)
+        return client.get_store_id(), model_id
+    finally:
+        client.set_store_id(_old_store_id)
+        client.set_authorization_model_id(_old_model_id)
+
+
+def clear_store() -> int:
+    """Delete every tuple of the current store and return how many there were."""
+    from .tuples import read_tuples, write_in_chunks
+
+    tuples = list(read_tuples(ReadRequestTupleKey()))
+    write_in_chunks([], tuples)
+    return len(tuples)
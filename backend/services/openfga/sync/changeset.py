@@ -0,0 +1,88 @@
+from typing import Iterator
+
+from openfga_sdk import ReadRequestTupleKey
+from openfga_sdk.client.models import ClientTuple
+
+from .tuples import read_tuples, write_in_chunks
+
+TupleKey = tuple[str, str, str]  # (user, relation, object)
+
+
+def _matches(key: TupleKey, tuple_key: ReadRequestTupleKey) -> bool:
+    user, relation, object_ = key
+    if tuple_key.user is not None and tuple_key.user != user:
+        return False
+    if tuple_key.relation is not None and tuple_key.relation != relation:
+        return False
+    if tuple_key.object is not None:
+        # "type:" reads every object of that type
+        if tuple_key.object.endswith(":"):
+            return object_.startswith(tuple_key.object)
+        return tuple_key.object == object_
+    return True
+
+
+class TupleChangeSet:
+    """
+    Tuple writes and deletes planned against the store, applied in one request.
+
+    Reads go through :meth:`read`, which overlays the changes planned so far,
+    so several sync operations can be planned in sequence (e.g. when draining
+    the outbox) and still produce a consistent, duplicate-free write.
+    """
+
+    def __init__(self):
+        self._stored: set[TupleKey] = set()
+        self._pending: dict[TupleKey, bool] = {}
+
+    def read(self, tuple_key: ReadRequestTupleKey) -> Iterator[ClientTuple]:
+        """Stream the matching tuples page by page, with planned changes applied."""
+        yielded_pending = set()
+        for t in read_tuples(tuple_key):
+            key = (t.user, t.relation, t.object)
+            self._stored.add(key)
+            present = self._pending.get(key)
+            if present is False:
+                continue
+            if present:
+                yielded_pending.add(key)
+            yield t
+        for key, present in list(self._pending.items()):
+            if present and key not in yielded_pending and _matches(key, tuple_key):
+                yield ClientTuple(user=key[0], relation=key[1], object=key[2])
+
+    def write(self, user: str, relation: str, object: str):
+        self._pending[(user, relation, object)] = True
+
+    def delete(self, user: str, relation: str, object: str):
+        self._pending[(user, relation, object)] = False
+
+    @property
+    def writes(self) -> list[ClientTuple]:
+        return [
+            ClientTuple(user=u, relation=r, object=o)
+            for (u, r, o), present in self._pending.items()
+            if present and (u, r, o) not in self._stored
+        ]
+
+    @property
+    def deletes(self) -> list[ClientTuple]:
+        return [
+            ClientTuple(user=u, relation=r, object=o)
+            for (u, r, o), present in self._pending.items()
+            if not present and (u, r, o) in self._stored
+        ]
+
+    def __bool__(self):
+        return bool(self.writes or self.deletes)
+
+    def commit(self) -> list:
+        """Apply the planned changes in size-limited write requests."""
+        writes, deletes = self.writes, self.deletes
+        if not writes and not deletes:
+            return []
+        responses = write_in_chunks(writes, deletes)
+        self._stored |= {(t.user, t.relation, t.object) for t in writes}
+        self._stored -= {(t.user, t.relation, t.object) for t in deletes}
+        self._pending.clear()
+        return responses
@@ -1,8 +1,7 @@
 from rest_framework.permissions import BasePermission
 from abc import ABC, abstractmethod, ABCMeta
 
-from . import client
-from openfga_sdk.client.models import ClientCheckRequest
+from .utils import check
 
 BasePermissionMeta = type(BasePermission)
 
@@ -37,16 +36,9 @@ class FGABasePermission(BasePermission, ABC, metaclass=FGABasePermissionMeta):
 
     @staticmethod
     def check(subject_key: str, relation: str, object_key: str) -> bool:
-        return client.check(
-            ClientCheckRequest(
-                user=subject_key,
-                relation=relation,
-                object=object_key,
-            )
-        ).allowed
+        return check(subject_key, relation, object_key)
 
     def has_object_permission(self, request, view, obj):
-        print(request, view, obj)
         return FGABasePermission.check(
             subject_key=f"{self.subject_type}:{self.get_subject_id(request, view, obj)}",
             relation=self.relation,
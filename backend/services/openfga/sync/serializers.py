@@ -0,0 +1,25 @@
+from django.db import models
+from rest_framework import serializers
+
+from .utils import check_many
+
+
+class FGABatchCheckListSerializer(serializers.ListSerializer):
+    """
+    Resolve the checks of every listed item in batched calls before rendering.
+
+    The child serializer declares the checks its fields will make with
+    ``get_fga_checks(instance)``, an iterable of ``(subject_key, relation,
+    object_key)``. They are collected for the whole page and resolved with
+    :func:`check_many`, so each item's own checks (``check``,
+    ``filter_allowed_relations``) are answered from the request memo instead
+    of one call per item::
+
+        class Meta:
+            list_serializer_class = FGABatchCheckListSerializer
+    """
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        check_many(key for item in items for key in self.child.get_fga_checks(item))
+        return [self.child.to_representation(item) for item in items]
@@ -0,0 +1,180 @@
+"""
+Low-level tuple I/O: paginated reads and size-limited writes.
+"""
+import contextvars
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator
+
+from openfga_sdk import ReadRequestTupleKey
+from openfga_sdk.client.models import ClientTuple, ClientWriteRequest
+from openfga_sdk.exceptions import ValidationException
+
+from ..cache import decision_cache
+from ..consistency import record_write
+from ..settings import BULK_WRITE_WORKERS, MAX_TUPLES_PER_WRITE, READ_PAGE_SIZE
+from . import client
+
+logger = logging.getLogger(__name__)
+
+# OpenFGA rejects a whole write when one tuple already exists (or, for
+# deletes, does not exist). Both mean the store is already in the desired state.
+_IDEMPOTENT_ERRORS = ("which already exists", "which does not exist")
+
+
+def read_tuples(
+    tuple_key: ReadRequestTupleKey, page_size: int = READ_PAGE_SIZE
+) -> Iterator[ClientTuple]:
+    """Yield every tuple matching ``tuple_key``, following continuation tokens."""
+    continuation_token = None
+    while True:
+        options = {"page_size": page_size}
+        if continuation_token:
+            options["continuation_token"] = continuation_token
+        response = client.read(tuple_key, options)
+        for t in response.tuples:
+            yield ClientTuple(user=t.key.user, relation=t.key.relation, object=t.key.object)
+        continuation_token = response.continuation_token
+        if not continuation_token:
+            return
+
+
+def write(body: ClientWriteRequest):
+    """Write tuples and invalidate cached decisions on the touched objects."""
+    touched = [t.object for t in (body.writes or []) + (body.deletes or [])]
+    try:
+        return client.write(body)
+    finally:
+        decision_cache.invalidate(touched)
+        record_write()
+
+
+def _is_idempotent_error(error: Exception) -> bool:
+    return isinstance(error, ValidationException) and any(
+        message in str(error) for message in _IDEMPOTENT_ERRORS
+    )
+
+
+@dataclass
+class ChunkReport:
+    """Outcome of one write request sent by :class:`BulkTupleWriter`."""
+
+    writes: int
+    deletes: int
+    duration: float
+    # Tuples skipped because the store already matched (exists / not found)
+    skipped: int = 0
+
+
+class BulkTupleWriter:
+    """
+    Write large tuple sets in requests of at most ``chunk_size`` tuples.
+
+    Chunks are submitted by up to ``max_workers`` threads sharing the client's
+    connection pool. Each chunk is its own transaction: when OpenFGA rejects
+    one because a tuple already exists or is already gone, the chunk is
+    replayed tuple by tuple and those tuples are skipped, so re-running an
+    import is safe. Any other error is raised once all chunks have finished.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = MAX_TUPLES_PER_WRITE,
+        max_workers: int = BULK_WRITE_WORKERS,
+    ):
+        self.chunk_size = chunk_size
+        self.max_workers = max(1, max_workers)
+
+    def chunks(
+        self, writes: Iterable[ClientTuple], deletes: Iterable[ClientTuple]
+    ) -> list[ClientWriteRequest]:
+        operations = [("writes", t) for t in writes] + [("deletes", t) for t in deletes]
+        requests = []
+        for start in range(0, len(operations), self.chunk_size):
+            payload = {}
+            for kind, t in operations[start : start + self.chunk_size]:
+                payload.setdefault(kind, []).append(t)
+            requests.append(ClientWriteRequest(**payload))
+        return requests
+
+    def write(
+        self,
+        writes: Iterable[ClientTuple] = (),
+        deletes: Iterable[ClientTuple] = (),
+        on_chunk: Callable[[ChunkReport], None] | None = None,
+    ) -> list[ChunkReport]:
+        """Write every chunk; ``on_chunk`` is called as each one completes."""
+        requests = self.chunks(writes, deletes)
+        if not requests:
+            return []
+        try:
+            if self.max_workers == 1 or len(requests) == 1:
+                return [self._submit(body, on_chunk) for body in requests]
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                # Run in copies of the caller's context so the calls are
+                # counted towards its request (services.openfga.metrics)
+                futures = [
+                    executor.submit(
+                        contextvars.copy_context().run, self._submit, body, on_chunk
+                    )
+                    for body in requests
+                ]
+            # Surface the first failure only after every chunk has been tried
+            return [future.result() for future in futures]
+        finally:
+            decision_cache.invalidate(
+                t.object
+                for body in requests
+                for t in (body.writes or []) + (body.deletes or [])
+            )
+            record_write()
+
+    def _submit(self, body: ClientWriteRequest, on_chunk=None) -> ChunkReport:
+        start = time.perf_counter()
+        skipped = 0
+        try:
+            client.write(body)
+        except ValidationException as e:
+            if not _is_idempotent_error(e):
+                raise
+            skipped = self._submit_each(body)
+        report = ChunkReport(
+            writes=len(body.writes or []),
+            deletes=len(body.deletes or []),
+            duration=time.perf_counter() - start,
+            skipped=skipped,
+        )
+        logger.debug(
+            f"Wrote {report.writes} and deleted {report.deletes} tuples "
+            f"({report.skipped} skipped) in {report.duration:.3f}s"
+        )
+        if on_chunk is not None:
+            on_chunk(report)
+        return report
+
+    def _submit_each(self, body: ClientWriteRequest) -> int:
+        skipped = 0
+        singles = [ClientWriteRequest(writes=[t]) for t in body.writes or []]
+        singles += [ClientWriteRequest(deletes=[t]) for t in body.deletes or []]
+        for single in singles:
+            try:
+                client.write(single)
+            except ValidationException as e:
+                if not _is_idempotent_error(e):
+                    raise
+                skipped += 1
+        return skipped
+
+
+def write_in_chunks(
+    writes: list[ClientTuple],
+    deletes: list[ClientTuple],
+    chunk_size: int = MAX_TUPLES_PER_WRITE,
+) -> list[ChunkReport]:
+    """
+    Apply writes and deletes in requests of at most ``chunk_size`` tuples,
+    OpenFGA's per-request limit. Each request is its own transaction.
+    """
+    return BulkTupleWriter(chunk_size=chunk_size).write(writes, deletes)
@@ -1,144 +1,259 @@
-from functools import partial
-from openfga_sdk import ReadRequestTupleKey, Tuple
+from typing import Iterable
+
+from openfga_sdk import ReadRequestTupleKey
 from openfga_sdk.client.models import (
+    ClientBatchCheckItem,
+    ClientBatchCheckRequest,
+    ClientCheckRequest,
     ClientListRelationsRequest,
     ClientListObjectsRequest,
-    ClientWriteRequest,
-    ClientTuple,
 )
 
+from ..breaker import CircuitOpenError, stale_decision
+from ..cache import CheckKey, decision_cache
+from ..consistency import query_options
+from ..local import get_read_evaluator
+from ..settings import BATCH_CHECK_CHUNK_SIZE
 from . import client
+from .changeset import TupleChangeSet
+from .tuples import read_tuples, write, write_in_chunks  # noqa: F401
 
 
-def sync_single_type_subjects(
-    object_key, subject_type, relation, desired_subject_ids: set[str]
-):
-    # Note: the result might contain subjects of other types
-    existing_subject_tuples: list[Tuple] = client.read(
-        ReadRequestTupleKey(
-            object=object_key,
-            relation=relation,
-        )
-    ).tuples
-    # Filter only subjects of the correct type
-    subject_prefix = f"{subject_type}:"
-    existing_subject_ids: set[str] = set(
-        t.key.user.removeprefix(subject_prefix)
-        for t in existing_subject_tuples
-        if t.key.user.startswith(subject_prefix)
+def check(subject_key: str, relation: str, object_key: str) -> bool:
+    key = (subject_key, relation, object_key)
+    if (allowed := decision_cache.get(key)) is not None:
+        return allowed
+    if (evaluator := get_read_evaluator()) is not None:
+        if (allowed := evaluator.check(*key)) is not None:
+            return allowed
+    try:
+        allowed = client.check(
+            ClientCheckRequest(user=subject_key, relation=relation, object=object_key),
+            query_options(),
+        ).allowed
+    except CircuitOpenError:
+        if (allowed := stale_decision(key)) is None:
+            raise
+        return allowed
+    decision_cache.set(key, allowed)
+    return allowed
+
+
+def check_many(
+    keys: Iterable[CheckKey], chunk_size: int = BATCH_CHECK_CHUNK_SIZE
+) -> dict[CheckKey, bool]:
+    """Resolve any number of ``(subject_key, relation, object_key)`` checks.
+
+    Cached decisions are reused; the rest are resolved with one ``batch_check``
+    call per ``chunk_size`` checks. Checks OpenFGA fails to evaluate are
+    reported as denied but not cached.
+    """
+    decisions: dict[CheckKey, bool] = {}
+    unknown_keys = []
+    for key in dict.fromkeys(keys):
+        allowed = decision_cache.get(key)
+        if allowed is None:
+            unknown_keys.append(key)
+        else:
+            decisions[key] = allowed
+
+    if unknown_keys and (evaluator := get_read_evaluator()) is not None:
+        remote_keys = []
+        for key in unknown_keys:
+            allowed = evaluator.check(*key)
+            if allowed is None:
+                remote_keys.append(key)
+            else:
+                decisions[key] = allowed
+        unknown_keys = remote_keys
+
+    for start in range(0, len(unknown_keys), chunk_size):
+        chunk = unknown_keys[start : start + chunk_size]
+        try:
+            response = client.batch_check(
+                ClientBatchCheckRequest(
+                    checks=[
+                        ClientBatchCheckItem(user=u, relation=r, object=o)
+                        for u, r, o in chunk
+                    ]
+                ),
+                query_options(),
+            )
+        except CircuitOpenError:
+            stale = {key: stale_decision(key) for key in unknown_keys[start:]}
+            if None in stale.values():
+                raise
+            decisions.update(stale)
+            break
+        for result in response.result:
+            key = (result.request.user, result.request.relation, result.request.object)
+            if result.error is not None:
+                decisions[key] = False
+                continue
+            decision_cache.set(key, result.allowed)
+            decisions[key] = result.allowed
+    return decisions
+
+
+def batch_check(
+    subject_key: str,
+    relation: str,
+    object_keys: list[str],
+    chunk_size: int = BATCH_CHECK_CHUNK_SIZE,
+) -> set[str]:
+    """Return the subset of ``object_keys`` the subject holds ``relation`` on."""
+    decisions = check_many(
+        ((subject_key, relation, object_key) for object_key in object_keys), chunk_size
     )
+    return {object_key for (_, _, object_key), allowed in decisions.items() if allowed}
 
-    to_add_subject_ids = desired_subject_ids - existing_subject_ids
-    to_del_subject_ids = existing_subject_ids - desired_subject_ids
 
-    make_tuple = partial(ClientTuple, relation=relation, object=object_key)
+def list_object_ids(subject_key: str, relation: str, object_type: str) -> set[str]:
+    objects = None
+    if (evaluator := get_read_evaluator()) is not None:
+        objects = evaluator.list_objects(subject_key, relation, object_type)
+    if objects is None:
+        objects = client.list_objects(
+            ClientListObjectsRequest(user=subject_key, relation=relation, type=object_type),
+            query_options(),
+        ).objects
+    prefix = f"{object_type}:"
+    return set(o.removeprefix(prefix) for o in objects if o.startswith(prefix))
 
-    payload = {}
-    if to_add_subject_ids:
-        payload["writes"] = [
-            make_tuple(user=f"{subject_type}:{id}") for id in to_add_subject_ids
-        ]
-    if to_del_subject_ids:
-        payload["deletes"] = [
-            make_tuple(user=f"{subject_type}:{id}") for id in to_del_subject_ids
-        ]
 
-    if not payload:
-        return
-    return client.write(ClientWriteRequest(**payload))
+def _apply(changes: TupleChangeSet | None, plan):
+    """Plan into ``changes`` if given, otherwise write the plan right away."""
+    if changes is not None:
+        return plan(changes)
+    changes = TupleChangeSet()
+    plan(changes)
+    return changes.commit()
+
+
+def sync_single_type_subjects(
+    object_key,
+    subject_type,
+    relation,
+    desired_subject_ids: set[str],
+    changes: TupleChangeSet | None = None,
+):
+    def plan(changes: TupleChangeSet):
+        # Note: the result might contain subjects of other types
+        subject_prefix = f"{subject_type}:"
+        seen: set[str] = set()
+        for t in changes.read(ReadRequestTupleKey(object=object_key, relation=relation)):
+            # Filter only subjects of the correct type
+            if not t.user.startswith(subject_prefix):
+                continue
+            id = t.user.removeprefix(subject_prefix)
+            if id in desired_subject_ids:
+                seen.add(id)
+            else:
+                changes.delete(t.user, relation, object_key)
+
+        for id in desired_subject_ids - seen:
+            changes.write(f"{subject_type}:{id}", relation, object_key)
+
+    return _apply(changes, plan)
 
 
 def sync_single_type_objects(
-    subject_key, object_type, relation, desired_object_ids: set[str]
+    subject_key,
+    object_type,
+    relation,
+    desired_object_ids: set[str],
+    changes: TupleChangeSet | None = None,
 ):
-    # Note: the result might contain objects of other types
-    existing_object_tuples: list[Tuple] = client.read(
-        ReadRequestTupleKey(
-            user=subject_key,
-            relation=relation,
-            object=f"{object_type}:",
-        )
-    ).tuples
-    # Filter only objects of the correct type
-    object_prefix = f"{object_type}:"
-    existing_object_ids: set[str] = set(
-        t.key.object.removeprefix(object_prefix)
-        for t in existing_object_tuples
-        if t.key.object.startswith(object_prefix)
-    )
+    def plan(changes: TupleChangeSet):
+        # Note: the result might contain objects of other types
+        object_prefix = f"{object_type}:"
+        seen: set[str] = set()
+        for t in changes.read(
+            ReadRequestTupleKey(user=subject_key, relation=relation, object=object_prefix)
+        ):
+            # Filter only objects of the correct type
+            if not t.object.startswith(object_prefix):
+                continue
+            id = t.object.removeprefix(object_prefix)
+            if id in desired_object_ids:
+                seen.add(id)
+            else:
+                changes.delete(subject_key, relation, t.object)
+
+        for id in desired_object_ids - seen:
+            changes.write(subject_key, relation, f"{object_type}:{id}")
+
+    return _apply(changes, plan)
 
-    to_add_object_ids = desired_object_ids - existing_object_ids
-    to_del_object_ids = existing_object_ids - desired_object_ids
-
-    make_tuple = partial(ClientTuple, user=subject_key, relation=relation)
-
-    payload = {}
-    if to_add_object_ids:
-        payload["writes"] = [
-            make_tuple(object=f"{object_type}:{id}") for id in to_add_object_ids
-        ]
-    if to_del_object_ids:
-        payload["deletes"] = [
-            make_tuple(object=f"{object_type}:{id}") for id in to_del_object_ids
-        ]
-
-    if not payload:
-        return
-    return client.write(ClientWriteRequest(**payload))
-
-
-def sync_relations(subject_key, object_key, desired_relations: set[str]):
-    existing_tuples: list[Tuple] = client.read(
-        ReadRequestTupleKey(
-            user=subject_key,
-            object=object_key,
-        )
-    ).tuples
-    existing_relations: set[str] = set(t.key.relation for t in existing_tuples)
-
-    to_add_relations = desired_relations - existing_relations
-    to_del_relations = existing_relations - desired_relations
-
-    make_tuple = partial(ClientTuple, user=subject_key, object=object_key)
-
-    payload = {}
-    if to_add_relations:
-        payload["writes"] = [
-            make_tuple(relation=relation) for relation in to_add_relations
-        ]
-    if to_del_relations:
-        payload["deletes"] = [
-            make_tuple(relation=relation) for relation in to_del_relations
-        ]
-
-    if not payload:
-        return
-    return client.write(ClientWriteRequest(**payload))
-
-
-def delete_all_subject_tuples(object_key: str):
-    existing_tuples = client.read(ReadRequestTupleKey(object=object_key)).tuples
-    to_delete = [
-        ClientTuple(user=t.key.user, relation=t.key.relation, object=t.key.object)
-        for t in existing_tuples
-    ]
-    if to_delete:
-        return client.write(ClientWriteRequest(deletes=to_delete))
-
-
-def delete_all_object_tuples(subject_key: str, object_type: str):
-    existing_tuples = client.read(
-        ReadRequestTupleKey(
-            user=subject_key,
-            object=f"{object_type}:",
-        )
-    ).tuples
-    to_delete = [
-        ClientTuple(user=t.key.user, relation=t.key.relation, object=t.key.object)
-        for t in existing_tuples
-    ]
-    if to_delete:
-        return client.write(ClientWriteRequest(deletes=to_delete))
+
+def sync_relations(
+    subject_key,
+    object_key,
+    desired_relations: set[str],
+    changes: TupleChangeSet | None = None,
+):
+    def plan(changes: TupleChangeSet):
+        seen: set[str] = set()
+        for t in changes.read(ReadRequestTupleKey(user=subject_key, object=object_key)):
+            if t.relation in desired_relations:
+                seen.add(t.relation)
+            else:
+                changes.delete(subject_key, t.relation, object_key)
+
+        for relation in desired_relations - seen:
+            changes.write(subject_key, relation, object_key)
+
+    return _apply(changes, plan)
+
+
+def sync_object_relations(
+    object_key: str,
+    desired_subjects: dict[str, set[str]],
+    changes: TupleChangeSet | None = None,
+):
+    """
+    Sync several relations of one object with a single read and write.
+
+    ``desired_subjects`` maps each managed relation to the full subject keys
+    it should hold (e.g. ``{"owner": {"user:1"}, "parent": set()}``).
+    Relations not listed are left untouched.
+    """
+
+    def plan(changes: TupleChangeSet):
+        seen: dict[str, set[str]] = {relation: set() for relation in desired_subjects}
+        for t in changes.read(ReadRequestTupleKey(object=object_key)):
+            if t.relation not in desired_subjects:
+                continue
+            if t.user in desired_subjects[t.relation]:
+                seen[t.relation].add(t.user)
+            else:
+                changes.delete(t.user, t.relation, object_key)
+
+        for relation, desired in desired_subjects.items():
+            for subject_key in desired - seen[relation]:
+                changes.write(subject_key, relation, object_key)
+
+    return _apply(changes, plan)
+
+
+def delete_all_subject_tuples(object_key: str, changes: TupleChangeSet | None = None):
+    def plan(changes: TupleChangeSet):
+        for t in changes.read(ReadRequestTupleKey(object=object_key)):
+            changes.delete(t.user, t.relation, t.object)
+
+    return _apply(changes, plan)
+
+
+def delete_all_object_tuples(
+    subject_key: str, object_type: str, changes: TupleChangeSet | None = None
+):
+    def plan(changes: TupleChangeSet):
+        for t in changes.read(
+            ReadRequestTupleKey(user=subject_key, object=f"{object_type}:")
+        ):
+            changes.delete(t.user, t.relation, t.object)
+
+    return _apply(changes, plan)
 
 
 def filter_allowed_relations(
@@ -147,7 +262,26 @@ def filter_allowed_relations(
     if not subject_key or not object_key or not relations:
         raise ValueError("subject_key, object_key and relations are required")
 
-    body = ClientListRelationsRequest(
-        user=subject_key, object=object_key, relations=relations
-    )
-    return client.list_relations(body)
+    cached = {
+        relation: decision_cache.get((subject_key, relation, object_key))
+        for relation in relations
+    }
+    missing = [relation for relation, allowed in cached.items() if allowed is None]
+    if missing:
+        try:
+            allowed_relations = client.list_relations(
+                ClientListRelationsRequest(
+                    user=subject_key, object=object_key, relations=missing
+                ),
+                query_options(),
+            )
+        except CircuitOpenError:
+            for relation in missing:
+                cached[relation] = stale_decision((subject_key, relation, object_key))
+            if None in cached.values():
+                raise
+            return [relation for relation in relations if cached[relation]]
+        for relation in missing:
+            cached[relation] = relation in allowed_relations
+            decision_cache.set((subject_key, relation, object_key), cached[relation])
+    return [relation for relation in relations if cached[relation]]
@@ -1,5 +1,19 @@
-from django.test import TestCase
-from unittest.mock import Mock
+import asyncio
+import threading
+import time
+import aiohttp
+import urllib3
+from asgiref.sync import iscoroutinefunction
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from importlib import import_module
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock, patch
+
+from rest_framework import serializers
 
 from openfga_sdk.client.models import (
     ClientTuple,
@@ -9,8 +23,42 @@ from openfga_sdk.client.models import (
     ClientBatchCheckItem,
 )
 from openfga_sdk import ReadRequestTupleKey
+from openfga_sdk.models import (
+    ObjectRelation,
+    TupleToUserset,
+    TypeDefinition,
+    Userset,
+    Usersets,
+)
+from openfga_sdk.models.consistency_preference import ConsistencyPreference
 
 import services.openfga.sync as fga_sync
+import services.openfga.sync.utils as fga_utils
+import services.openfga.sync.tuples as fga_tuples
+import services.openfga.sync.filters as fga_filters
+import services.openfga.invalidation as fga_invalidation
+import services.openfga.local as fga_local
+import services.openfga.local.model as fga_local_model
+import services.openfga.breaker as fga_breaker
+import services.openfga.consistency as fga_consistency
+import services.openfga.metrics as fga_metrics
+from openfga_sdk.client.models import ClientListObjectsRequest
+from services.openfga.fake import AsyncFakeClient, FakeOpenFgaClient
+from services.openfga.local.dsl import SchemaError, parse
+from openfga_sdk.exceptions import (
+    ApiException,
+    RateLimitExceededError,
+    ServiceException,
+    ValidationException,
+)
+from services.openfga.cache import DecisionCache, TTLDecisionCache, request_scope
+from services.openfga.consistency import consistency_scope
+from services.openfga.decorators import retry_on_failure
+from services.openfga.middleware import FGARequestScopeMiddleware
+from services.openfga.sync.serializers import FGABatchCheckListSerializer
+
+fga_async = import_module("services.openfga.async")
+fga_async_utils = import_module("services.openfga.async.utils")
 
 
 class OpenFGAClientSmokeTestCase(TestCase):
@@ -72,3 +120,958 @@ class OpenFGAClientSmokeTestCase(TestCase):
         args_b = self.mock_sdk_client.batch_check.call_args[0][0]
         self.assertIsInstance(args_b, ClientBatchCheckRequest)
 
+
+class DecisionCacheTestCase(TestCase):
+    def setUp(self):
+        self.shared = TTLDecisionCache(max_size=2, ttl=60)
+        self.cache = DecisionCache(self.shared)
+
+    def test_lru_eviction(self):
+        self.cache.set(("user:1", "can_view", "file:1"), True)
+        self.cache.set(("user:1", "can_view", "file:2"), True)
+        self.cache.get(("user:1", "can_view", "file:1"))
+        self.cache.set(("user:1", "can_view", "file:3"), False)
+
+        self.assertTrue(self.cache.get(("user:1", "can_view", "file:1")))
+        self.assertIsNone(self.cache.get(("user:1", "can_view", "file:2")))
+        self.assertFalse(self.cache.get(("user:1", "can_view", "file:3")))
+
+    def test_ttl_expiry(self):
+        self.shared.ttl = 0.01
+        self.cache.set(("user:1", "can_view", "file:1"), True)
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.get(("user:1", "can_view", "file:1")))
+
+    def test_invalidate_dependent_types(self):
+        self.shared.max_size = 10
+        self.cache.set(("user:1", "can_view", "course_class:1"), True)
+        self.cache.set(("user:1", "can_view", "content_node:7"), True)
+        self.cache.set(("user:1", "can_view", "folder:3"), True)
+
+        self.cache.invalidate(["course_class:1"])
+
+        self.assertIsNone(self.cache.get(("user:1", "can_view", "course_class:1")))
+        self.assertIsNone(self.cache.get(("user:1", "can_view", "content_node:7")))
+        self.assertTrue(self.cache.get(("user:1", "can_view", "folder:3")))
+
+    def test_request_scope_memo(self):
+        self.shared.max_size = 0  # shared layer disabled
+        key = ("user:1", "can_view", "file:1")
+        with request_scope():
+            self.cache.set(key, True)
+            self.assertTrue(self.cache.get(key))
+        self.assertIsNone(self.cache.get(key))
+
+    def test_check_is_memoized(self):
+        mock_client = Mock()
+        mock_client.check.return_value = Mock(allowed=True)
+        fga_utils.decision_cache.clear()
+        with patch.object(fga_utils, "client", mock_client), request_scope():
+            self.assertTrue(fga_utils.check("user:1", "can_view", "file:99"))
+            self.assertTrue(fga_utils.check("user:1", "can_view", "file:99"))
+        self.assertEqual(mock_client.check.call_count, 1)
+
+
+class BatchCheckTestCase(TestCase):
+    def setUp(self):
+        fga_utils.decision_cache.clear()
+        self.mock_client = Mock()
+
+        def batch_check(body, options=None):
+            return Mock(
+                result=[
+                    Mock(allowed=item.object != "file:2", request=item, error=None)
+                    for item in body.checks
+                ]
+            )
+
+        self.mock_client.batch_check.side_effect = batch_check
+
+    def test_chunked_and_cached(self):
+        keys = [f"file:{i}" for i in range(5)]
+        with patch.object(fga_utils, "client", self.mock_client), request_scope():
+            allowed = fga_utils.batch_check("user:1", "can_view", keys, chunk_size=2)
+            self.assertEqual(allowed, {"file:0", "file:1", "file:3", "file:4"})
+            self.assertEqual(self.mock_client.batch_check.call_count, 3)
+
+            # Second pass is served from the decision cache
+            fga_utils.batch_check("user:1", "can_view", keys, chunk_size=2)
+            self.assertEqual(self.mock_client.batch_check.call_count, 3)
+
+    def test_check_many_mixes_subjects_and_relations(self):
+        keys = [("user:1", "can_view", "file:1"), ("user:2", "can_edit", "file:2")]
+        with patch.object(fga_utils, "client", self.mock_client), request_scope():
+            decisions = fga_utils.check_many(keys + keys)
+            self.assertEqual(decisions, {keys[0]: True, keys[1]: False})
+            self.assertEqual(len(self.mock_client.batch_check.call_args[0][0].checks), 2)
+
+    def test_list_serializer_resolves_item_checks_in_one_call(self):
+        class FileSerializer(serializers.Serializer):
+            can_view = serializers.SerializerMethodField()
+
+            class Meta:
+                list_serializer_class = FGABatchCheckListSerializer
+
+            def get_fga_checks(self, obj):
+                return [("user:1", "can_view", f"file:{obj}")]
+
+            def get_can_view(self, obj):
+                return fga_utils.check("user:1", "can_view", f"file:{obj}")
+
+        with patch.object(fga_utils, "client", self.mock_client), request_scope():
+            data = FileSerializer([1, 2, 3], many=True).data
+
+        self.assertEqual([item["can_view"] for item in data], [True, False, True])
+        self.assertEqual(self.mock_client.batch_check.call_count, 1)
+        self.mock_client.check.assert_not_called()
+
+    def test_filter_backend_lists_objects_for_large_querysets(self):
+        users = [get_user_model().objects.create(email=f"u{i}@example.com") for i in range(3)]
+        queryset = get_user_model().objects.order_by("pk")
+        request = Mock(user=Mock(pk=1, is_staff=False, is_authenticated=True))
+        view = SimpleNamespace(
+            fga_object_type="user", fga_filter_relation="can_view", action="list"
+        )
+        backend = fga_filters.FGAObjectFilterBackend()
+        with (
+            patch.object(fga_filters, "batch_check", return_value={f"user:{users[0].pk}"}),
+            patch.object(
+                fga_filters, "list_object_ids", return_value=[str(users[1].pk)]
+            ) as list_object_ids,
+        ):
+            with patch.object(fga_filters, "FILTER_BATCH_CHECK_LIMIT", 3):
+                filtered = backend.filter_queryset(request, queryset, view)
+            self.assertEqual(list(filtered), users[:1])
+            list_object_ids.assert_not_called()
+
+            with patch.object(fga_filters, "FILTER_BATCH_CHECK_LIMIT", 2):
+                filtered = backend.filter_queryset(request, queryset, view)
+            self.assertEqual(list(filtered), users[1:2])
+            list_object_ids.assert_called_once_with("user:1", "can_view", "user")
+
+
+class AsyncClientBridgeTestCase(TestCase):
+    def test_run_propagates_request_memo(self):
+        key = ("user:1", "can_view", "file:1")
+
+        async def read_memo():
+            return fga_utils.decision_cache.get(key)
+
+        fga_utils.decision_cache.clear()
+        with request_scope():
+            fga_utils.decision_cache.set(key, True)
+            fga_utils.decision_cache.shared.clear()
+            self.assertTrue(fga_async.run(read_memo()))
+
+    def test_role_reads_run_concurrently(self):
+        def read(body, options=None):
+            return Mock(
+                tuples=[Mock(key=Mock(user=f"user:{body.relation}-1"))],
+                continuation_token=None,
+            )
+
+        mock_client = Mock()
+        mock_client.read = AsyncMock(side_effect=read)
+        with patch.object(fga_async_utils, "get_client", return_value=mock_client):
+            result = fga_async.run(
+                fga_async_utils.list_subject_ids_by_relation(
+                    "course_class:1", ["teacher", "student"], "user"
+                )
+            )
+        self.assertEqual(result, {"teacher": ["teacher-1"], "student": ["student-1"]})
+        self.assertEqual(mock_client.read.await_count, 2)
+
+    def test_run_cancels_the_coroutine_on_timeout(self):
+        cancelled = threading.Event()
+
+        async def hang():
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        with self.assertRaises(TimeoutError):
+            fga_async.run(hang(), timeout=0.05)
+        self.assertTrue(cancelled.wait(5))
+
+
+class SyncObjectRelationsTestCase(TestCase):
+    def test_single_read_and_write(self):
+        mock_client = Mock()
+        mock_client.read.return_value = Mock(
+            tuples=[
+                Mock(key=Mock(user="user:1", relation="owner", object="file:5")),
+                Mock(key=Mock(user="folder:2", relation="parent", object="file:5")),
+                Mock(key=Mock(user="user:7", relation="viewer", object="file:5")),
+            ],
+            continuation_token=None,
+        )
+        with (
+            patch.object(fga_tuples, "client", mock_client),
+            patch.object(fga_utils, "client", mock_client),
+        ):
+            fga_utils.sync_object_relations(
+                "file:5", {"owner": {"user:1"}, "parent": {"folder:3"}}
+            )
+
+        self.assertEqual(mock_client.read.call_count, 1)
+        self.assertEqual(mock_client.write.call_count, 1)
+        body = mock_client.write.call_args[0][0]
+        self.assertEqual(
+            [(t.user, t.relation) for t in body.writes], [("folder:3", "parent")]
+        )
+        # Unmanaged relations (viewer) are left alone
+        self.assertEqual(
+            [(t.user, t.relation) for t in body.deletes], [("folder:2", "parent")]
+        )
+
+
+class TupleIOTestCase(TestCase):
+    def test_read_follows_continuation_tokens(self):
+        def page(user, token):
+            key = Mock(user=user, relation="viewer", object="file:1")
+            return Mock(tuples=[Mock(key=key)], continuation_token=token)
+
+        pages = {None: page("user:1", "p2"), "p2": page("user:2", "")}
+        mock_client = Mock()
+        mock_client.read.side_effect = lambda body, options: pages[
+            options.get("continuation_token")
+        ]
+        with patch.object(fga_tuples, "client", mock_client):
+            tuples = list(
+                fga_tuples.read_tuples(ReadRequestTupleKey(object="file:1"), page_size=1)
+            )
+
+        self.assertEqual([t.user for t in tuples], ["user:1", "user:2"])
+        self.assertEqual(mock_client.read.call_count, 2)
+        self.assertEqual(mock_client.read.call_args[0][1]["page_size"], 1)
+
+    def test_write_in_chunks(self):
+        mock_client = Mock()
+        writes = [
+            ClientTuple(user=f"user:{i}", relation="viewer", object="file:1")
+            for i in range(3)
+        ]
+        deletes = [ClientTuple(user="user:9", relation="viewer", object="file:1")]
+        with patch.object(fga_tuples, "client", mock_client):
+            responses = fga_tuples.write_in_chunks(writes, deletes, chunk_size=2)
+
+        self.assertEqual([(r.writes, r.deletes) for r in responses], [(2, 0), (1, 1)])
+        first, second = [c[0][0] for c in mock_client.write.call_args_list]
+        self.assertEqual(len(first.writes), 2)
+        self.assertEqual(len(second.writes), 1)
+        self.assertEqual(len(second.deletes), 1)
+
+    def test_bulk_writer_skips_existing_tuples(self):
+        existing = ValidationException(
+            status=400, reason="cannot write a tuple which already exists"
+        )
+
+        def write(body):
+            if len(body.writes or []) > 1 or body.writes[0].user == "user:1":
+                raise existing
+
+        mock_client = Mock()
+        mock_client.write.side_effect = write
+        writes = [
+            ClientTuple(user=f"user:{i}", relation="viewer", object="file:1")
+            for i in range(4)
+        ]
+        writer = fga_tuples.BulkTupleWriter(chunk_size=2, max_workers=2)
+        with patch.object(fga_tuples, "client", mock_client):
+            reports = writer.write(writes)
+
+        self.assertEqual(sorted(r.skipped for r in reports), [0, 1])
+        # Two chunk attempts, then each tuple of both chunks individually
+        self.assertEqual(mock_client.write.call_count, 6)
+
+    def test_bulk_writer_raises_other_errors(self):
+        mock_client = Mock()
+        mock_client.write.side_effect = ValidationException(
+            status=400, reason="type 'nope' not found"
+        )
+        writes = [ClientTuple(user="user:1", relation="viewer", object="nope:1")]
+        with patch.object(fga_tuples, "client", mock_client):
+            with self.assertRaises(ValidationException):
+                fga_tuples.BulkTupleWriter().write(writes)
+
+
+class TransportTestCase(TestCase):
+    def test_process_local_client_is_rebuilt_after_fork(self):
+        proxy = fga_sync.ProcessLocalClient()
+        with patch.object(fga_sync, "create_client", side_effect=[Mock(), Mock()]):
+            first = proxy.get()
+            self.assertIs(proxy.get(), first)
+            proxy._reset()  # what the child runs after fork()
+            self.assertIsNot(proxy.get(), first)
+
+    def test_retry_on_failure_backs_off_with_jitter(self):
+        func = Mock(side_effect=[ConnectionError, ConnectionError, "ok"], __name__="f")
+        with patch("services.openfga.decorators.time.sleep") as sleep:
+            result = retry_on_failure(max_retries=3, delay=0.1, max_delay=0.15)(func)()
+
+        self.assertEqual(result, "ok")
+        delays = [call[0][0] for call in sleep.call_args_list]
+        self.assertEqual(len(delays), 2)
+        self.assertLessEqual(delays[0], 0.1)
+        self.assertLessEqual(delays[1], 0.15)
+
+
+class ConsistencyTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        fga_utils.decision_cache.clear()
+        self.mock_client = Mock()
+        self.mock_client.check.return_value = Mock(allowed=True)
+
+    def consistency_of_check(self, subject_key="user:1"):
+        with patch.object(fga_utils, "client", self.mock_client):
+            fga_utils.check(subject_key, "can_view", "file:1")
+        fga_utils.decision_cache.clear()
+        return self.mock_client.check.call_args[0][1]["consistency"]
+
+    def test_reads_minimize_latency_by_default(self):
+        request = Mock(user=Mock(pk=1, is_authenticated=True))
+        with consistency_scope(request):
+            self.assertEqual(
+                self.consistency_of_check(), ConsistencyPreference.MINIMIZE_LATENCY
+            )
+
+    def test_reads_after_write_use_higher_consistency(self):
+        request = Mock(user=Mock(pk=1, is_authenticated=True))
+        with (
+            patch.object(fga_tuples, "client", Mock()),
+            consistency_scope(request),
+        ):
+            fga_tuples.write(
+                ClientWriteRequest(
+                    writes=[ClientTuple(user="user:1", relation="owner", object="file:1")]
+                )
+            )
+            self.assertEqual(
+                self.consistency_of_check(), ConsistencyPreference.HIGHER_CONSISTENCY
+            )
+
+        # The same user's next request is consistent too, other users' are not
+        with consistency_scope(request):
+            self.assertEqual(
+                self.consistency_of_check(), ConsistencyPreference.HIGHER_CONSISTENCY
+            )
+        other = Mock(user=Mock(pk=2, is_authenticated=True))
+        with consistency_scope(other):
+            self.assertEqual(
+                self.consistency_of_check("user:2"),
+                ConsistencyPreference.MINIMIZE_LATENCY,
+            )
+
+    def test_consistent_reads_skip_shared_decisions(self):
+        decisions = DecisionCache(TTLDecisionCache(max_size=10, ttl=60))
+        key = ("user:1", "can_view", "file:1")
+        decisions.set(key, True)
+        request = Mock(user=Mock(pk=1, is_authenticated=True))
+        with consistency_scope(request):
+            self.assertTrue(decisions.get(key))
+            fga_consistency.record_write()
+            self.assertIsNone(decisions.get(key))
+
+
+class LocalEvaluatorTestCase(TestCase):
+    # Subset of openfga/schemas/lms.fga
+    MODEL = {
+        "group": {"member": fga_local_model.This()},
+        "course_class": {
+            "teacher": fga_local_model.This(),
+            "student": fga_local_model.This(),
+            "can_edit": fga_local_model.Computed("teacher"),
+            "can_view": fga_local_model.Union(
+                (
+                    fga_local_model.This(),
+                    fga_local_model.Computed("student"),
+                    fga_local_model.Computed("can_edit"),
+                )
+            ),
+        },
+        "content_node": {
+            "course_class": fga_local_model.This(),
+            "parent": fga_local_model.This(),
+            "can_view": fga_local_model.Union(
+                (
+                    fga_local_model.TupleToUserset("parent", "can_view"),
+                    fga_local_model.TupleToUserset("course_class", "can_view"),
+                )
+            ),
+            "can_modify": None,  # unsupported rewrite
+        },
+    }
+    TUPLES = [
+        ("group:1#member", "teacher", "course_class:1"),
+        ("user:1", "member", "group:1"),
+        ("user:2", "student", "course_class:1"),
+        ("user:*", "can_view", "course_class:2"),
+        ("course_class:1", "course_class", "content_node:1"),
+        ("content_node:1", "parent", "content_node:2"),
+        ("course_class:2", "course_class", "content_node:3"),
+    ]
+
+    def setUp(self):
+        self.client = Mock()
+        self.client.read.return_value = Mock(
+            tuples=[
+                Mock(key=Mock(user=u, relation=r, object=o)) for u, r, o in self.TUPLES
+            ],
+            continuation_token=None,
+        )
+        self.client.read_changes.return_value = Mock(changes=[], continuation_token="c1")
+        patcher = patch.object(fga_tuples, "client", self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.evaluator = fga_local.LocalEvaluator(self.client, model=self.MODEL)
+
+    def test_check_follows_usersets_and_parents(self):
+        check = self.evaluator.check
+        self.assertTrue(check("user:1", "can_view", "content_node:2"))
+        self.assertTrue(check("user:2", "can_view", "content_node:1"))
+        self.assertFalse(check("user:3", "can_view", "content_node:1"))
+        self.assertTrue(check("user:3", "can_view", "content_node:3"))
+        self.assertIsNone(check("user:1", "can_modify", "content_node:1"))
+        self.assertEqual(self.client.read.call_count, 1)
+
+    def test_list_objects(self):
+        self.assertEqual(
+            self.evaluator.list_objects("user:2", "can_view", "content_node"),
+            {"content_node:1", "content_node:2", "content_node:3"},
+        )
+        self.assertEqual(
+            self.evaluator.list_objects("user:4", "can_view", "content_node"),
+            {"content_node:3"},
+        )
+
+    def test_changes_are_applied(self):
+        self.assertTrue(self.evaluator.check("user:2", "can_view", "content_node:1"))
+        change = Mock(
+            tuple_key=Mock(user="user:2", relation="student", object="course_class:1"),
+            operation="TUPLE_OPERATION_DELETE",
+        )
+        self.client.read_changes.side_effect = [
+            Mock(changes=[change], continuation_token="c2"),
+            Mock(changes=[], continuation_token="c2"),
+        ]
+        self.evaluator.sync_changes()
+        self.assertFalse(self.evaluator.check("user:2", "can_view", "content_node:1"))
+        options = self.client.read_changes.call_args[0][1]
+        self.assertEqual(options["continuation_token"], "c2")
+
+    def test_stale_replica_defers_to_server(self):
+        self.evaluator.check("user:1", "can_view", "content_node:1")
+        self.client.read_changes.side_effect = ConnectionError
+        with (
+            patch.object(fga_local, "LOCAL_SYNC_INTERVAL", 0),
+            patch.object(fga_local, "LOCAL_MAX_STALENESS", 0),
+        ):
+            self.assertIsNone(self.evaluator.check("user:1", "can_view", "content_node:1"))
+
+    def test_model_from_sdk(self):
+        authorization_model = Mock(
+            type_definitions=[
+                TypeDefinition(
+                    type="folder",
+                    relations={
+                        "owner": Userset(this={}),
+                        "parent": Userset(this={}),
+                        "can_edit": Userset(
+                            union=Usersets(
+                                child=[
+                                    Userset(computed_userset=ObjectRelation(relation="owner")),
+                                    Userset(
+                                        tuple_to_userset=TupleToUserset(
+                                            tupleset=ObjectRelation(relation="parent"),
+                                            computed_userset=ObjectRelation(
+                                                relation="can_edit"
+                                            ),
+                                        )
+                                    ),
+                                ]
+                            )
+                        ),
+                    },
+                )
+            ]
+        )
+        model = fga_local_model.model_from_sdk(authorization_model)
+        self.assertEqual(
+            model["folder"]["can_edit"],
+            fga_local_model.Union(
+                (
+                    fga_local_model.Computed("owner"),
+                    fga_local_model.TupleToUserset("parent", "can_edit"),
+                )
+            ),
+        )
+
+
+class InvalidationTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        fga_invalidation._seen = None
+        fga_utils.decision_cache.clear()
+        # The shared layer is off by default
+        patcher = patch.object(fga_utils.decision_cache.shared, "ttl", 60)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_poll_applies_events_from_other_processes(self):
+        fga_invalidation.poll()  # first poll only records the position
+        fga_utils.decision_cache.set(("user:1", "can_view", "file:1"), True)
+        fga_utils.decision_cache.set(("user:1", "can_view", "file:2"), True)
+
+        fga_invalidation.publish(["file:1"])
+        fga_invalidation._seen = 0  # as seen from another process
+        fga_invalidation.poll()
+
+        self.assertIsNone(fga_utils.decision_cache.get(("user:1", "can_view", "file:1")))
+        self.assertTrue(fga_utils.decision_cache.get(("user:1", "can_view", "file:2")))
+
+    def test_missed_events_flush_everything(self):
+        fga_invalidation.poll()
+        fga_utils.decision_cache.set(("user:1", "can_view", "file:2"), True)
+        fga_invalidation.publish(["file:1"])
+        cache.delete(fga_invalidation.EVENT_KEY.format(1))
+        fga_invalidation._seen = 0
+        fga_invalidation.poll()
+        self.assertIsNone(fga_utils.decision_cache.get(("user:1", "can_view", "file:2")))
+
+    def test_process_local_cache_refused_outside_debug(self):
+        locmem = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+        redis = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache"}}
+        with override_settings(CACHES=locmem, DEBUG=False):
+            # Nothing relies on events while the decision cache and tailer are off
+            with patch.multiple(fga_invalidation, TAIL_CHANGES=False, DECISION_CACHE_TTL=0):
+                fga_invalidation.check_shared_cache()
+            with (
+                patch.object(fga_invalidation, "TAIL_CHANGES", True),
+                self.assertRaisesMessage(ImproperlyConfigured, "Set REDIS_URL"),
+            ):
+                fga_invalidation.check_shared_cache()
+        with (
+            patch.object(fga_invalidation, "TAIL_CHANGES", True),
+            override_settings(CACHES=locmem, DEBUG=True),
+        ):
+            fga_invalidation.check_shared_cache()
+        with (
+            patch.object(fga_invalidation, "TAIL_CHANGES", True),
+            override_settings(CACHES=redis, DEBUG=False),
+        ):
+            fga_invalidation.check_shared_cache()
+
+    def test_middleware_polls_only_with_the_shared_cache(self):
+        middleware = FGARequestScopeMiddleware(lambda request: HttpResponse())
+        with patch("services.openfga.middleware.poll") as poll:
+            with patch.object(fga_utils.decision_cache.shared, "ttl", 0):
+                middleware(RequestFactory().get("/"))
+            poll.assert_not_called()
+            middleware(RequestFactory().get("/"))
+            poll.assert_called_once()
+
+
+class MetricsTestCase(TestCase):
+    def setUp(self):
+        fga_metrics.registry.reset()
+
+    def test_calls_are_timed_per_object_type_and_relation(self):
+        client = fga_metrics.InstrumentedClient(Mock())
+        client.check(ClientCheckRequest(user="user:1", relation="can_view", object="file:1"))
+        client.check(ClientCheckRequest(user="user:1", relation="can_view", object="file:2"))
+
+        (call,) = fga_metrics.snapshot()["calls"]
+        self.assertEqual(
+            (call["method"], call["object_type"], call["relation"]),
+            ("check", "file", "can_view"),
+        )
+        self.assertEqual(call["latency"]["count"], 2)
+        self.assertEqual(call["latency"]["buckets"]["inf"], 2)
+
+    def test_errors_and_written_tuples_are_counted(self):
+        mock_client = Mock()
+        mock_client.write.side_effect = [None, ValidationException()]
+        client = fga_metrics.InstrumentedClient(mock_client)
+        body = ClientWriteRequest(
+            writes=[ClientTuple(user="user:1", relation="viewer", object="file:1")],
+            deletes=[ClientTuple(user="user:2", relation="owner", object="file:1")],
+        )
+        client.write(body)
+        with self.assertRaises(ValidationException):
+            client.write(body)
+
+        metrics = fga_metrics.snapshot()
+        self.assertEqual(metrics["calls"][0]["relation"], fga_metrics.MIXED)
+        self.assertEqual(
+            metrics["errors"],
+            [{"method": "write", "error": "ValidationException", "count": 1}],
+        )
+        self.assertEqual(metrics["tuples"], {"writes": 1, "deletes": 1})
+
+    def test_async_calls_are_timed(self):
+        mock_client = Mock()
+        mock_client.check = AsyncMock(return_value=Mock(allowed=True))
+        client = fga_metrics.InstrumentedClient(mock_client)
+
+        async def check():
+            return await client.check(
+                ClientCheckRequest(user="user:1", relation="can_view", object="file:1")
+            )
+
+        self.assertTrue(fga_async.run(check()).allowed)
+        self.assertEqual(fga_metrics.snapshot()["calls"][0]["method"], "check")
+
+    def test_slow_calls_are_logged(self):
+        client = fga_metrics.InstrumentedClient(Mock())
+        with patch.object(fga_metrics, "SLOW_CALL_MS", 0):
+            with self.assertLogs(fga_metrics.logger, "WARNING"):
+                client.read(ReadRequestTupleKey(object="file:1"))
+
+    def test_request_totals_are_reported_in_server_timing(self):
+        client = fga_metrics.InstrumentedClient(Mock())
+
+        def view(request):
+            client.check(ClientCheckRequest(user="user:1", relation="can_view", object="file:1"))
+            client.list_objects(Mock(type="file", relation="can_view"))
+            return HttpResponse()
+
+        middleware = FGARequestScopeMiddleware(view)
+        request = RequestFactory().get("/api/files/")
+        request.user = Mock(is_staff=False)
+        self.assertNotIn("Server-Timing", middleware(request).headers)
+
+        request.user = Mock(is_staff=True)
+        response = middleware(request)
+        self.assertRegex(response.headers["Server-Timing"], r'^fga;dur=[\d.]+;desc="2 calls"$')
+        with patch("services.openfga.middleware.SERVER_TIMING", True):
+            request.user = Mock(is_staff=False)
+            self.assertIn("Server-Timing", middleware(request).headers)
+
+        (endpoint,) = fga_metrics.snapshot()["endpoints"]
+        self.assertEqual(endpoint["endpoint"], "GET <unresolved>")
+        self.assertEqual(endpoint["calls"], 6)
+
+    def test_async_views_keep_the_middleware_async(self):
+        mock_client = Mock()
+        mock_client.check = AsyncMock(return_value=Mock(allowed=True))
+        client = fga_metrics.InstrumentedClient(mock_client)
+
+        async def view(request):
+            await client.check(
+                ClientCheckRequest(user="user:1", relation="can_view", object="file:1")
+            )
+            return HttpResponse()
+
+        middleware = FGARequestScopeMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        request = RequestFactory().get("/api/files/")
+        request.user = Mock(is_staff=True)
+        response = asyncio.run(middleware(request))
+        self.assertIn('desc="1 calls"', response.headers["Server-Timing"])
+
+
+class CircuitBreakerTestCase(TestCase):
+    def setUp(self):
+        fga_utils.decision_cache.clear()
+        self.breaker = fga_breaker.CircuitBreaker(failure_threshold=2, reset_timeout=30)
+        self.mock_client = Mock()
+        self.client = fga_breaker.GuardedClient(self.mock_client, self.breaker)
+
+    def fail(self, times):
+        self.mock_client.check.side_effect = ConnectionError
+        for _ in range(times):
+            with self.assertRaises(ConnectionError):
+                self.client.check(Mock())
+
+    def test_opens_after_consecutive_failures_and_fails_fast(self):
+        self.fail(2)
+        self.assertEqual(self.breaker.state, self.breaker.OPEN)
+        with self.assertRaises(fga_breaker.CircuitOpenError):
+            self.client.check(Mock())
+        self.assertEqual(self.mock_client.check.call_count, 2)
+
+    def test_client_errors_do_not_count(self):
+        self.mock_client.check.side_effect = ValidationException()
+        for _ in range(3):
+            with self.assertRaises(ValidationException):
+                self.client.check(Mock())
+        self.assertEqual(self.breaker.state, self.breaker.CLOSED)
+
+    def test_only_transport_errors_and_server_errors_are_failures(self):
+        failures = [
+            ConnectionResetError(),
+            urllib3.exceptions.ReadTimeoutError(None, "/", "timed out"),
+            urllib3.exceptions.MaxRetryError(None, "/"),
+            aiohttp.ServerDisconnectedError(),
+            asyncio.TimeoutError(),
+            ServiceException(status=503),
+            RateLimitExceededError(status=429),
+            ApiException(status=0),
+        ]
+        for error in failures:
+            self.assertTrue(fga_breaker.is_failure(error), error)
+        for error in [
+            ValidationException(status=400),
+            asyncio.CancelledError(),
+            TypeError(),
+            ValueError(),
+        ]:
+            self.assertFalse(fga_breaker.is_failure(error), error)
+
+    def test_half_open_probe_closes_the_circuit(self):
+        self.fail(2)
+        self.breaker._opened_at -= 30
+        self.mock_client.check.side_effect = None
+        self.client.check(Mock())
+        self.assertEqual(self.breaker.state, self.breaker.CLOSED)
+
+    def test_failed_probe_reopens_the_circuit(self):
+        self.fail(2)
+        self.breaker._opened_at -= 30
+        self.fail(1)
+        self.assertEqual(self.breaker.state, self.breaker.OPEN)
+        with self.assertRaises(fga_breaker.CircuitOpenError):
+            self.client.check(Mock())
+
+    def test_read_only_requests_get_stale_decisions(self):
+        key = ("user:1", "can_view", "file:1")
+        fga_utils.decision_cache.shared._entries[key] = (True, 0)  # expired
+        self.fail(2)
+        factory = RequestFactory()
+        with patch.object(fga_utils, "client", self.client), patch.object(
+            fga_breaker, "BREAKER_SERVE_STALE", True
+        ):
+            with consistency_scope(factory.get("/")):
+                self.assertTrue(fga_utils.check(*key))
+            with consistency_scope(factory.post("/")):
+                with self.assertRaises(fga_breaker.CircuitOpenError):
+                    fga_utils.check(*key)
+
+    def test_middleware_turns_open_circuit_into_503(self):
+        middleware = FGARequestScopeMiddleware(Mock())
+        response = middleware.process_exception(
+            RequestFactory().get("/"), fga_breaker.CircuitOpenError(4.2)
+        )
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["Retry-After"], "5")
+
+
+class ModelPinningTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def mock_client(self, model_id=None):
+        mock_client = Mock()
+        mock_client.get_store_id.return_value = "store-1"
+        mock_client.get_authorization_model_id.return_value = model_id
+        mock_client.read_latest_authorization_model.return_value = Mock(
+            authorization_model=Mock(id="model-1")
+        )
+        return mock_client
+
+    def test_latest_model_is_resolved_once_across_clients(self):
+        first, second = self.mock_client(), self.mock_client()
+        self.assertEqual(fga_sync.pin_model_id(first), "model-1")
+        self.assertEqual(fga_sync.pin_model_id(second), "model-1")
+        first.read_latest_authorization_model.assert_called_once()
+        second.read_latest_authorization_model.assert_not_called()
+        second.set_authorization_model_id.assert_called_once_with("model-1")
+
+    def test_configured_model_id_wins(self):
+        mock_client = self.mock_client(model_id="pinned")
+        with patch.object(fga_sync, "MODEL_ID", "pinned"):
+            self.assertEqual(fga_sync.pin_model_id(mock_client, refresh=True), "pinned")
+        mock_client.read_latest_authorization_model.assert_not_called()
+
+    def test_resolved_model_is_refreshed_after_ttl(self):
+        mock_client = self.mock_client()
+        proxy = fga_sync.ProcessLocalClient()
+        with (
+            patch.object(fga_sync, "create_client", return_value=mock_client),
+            patch.object(fga_sync, "MODEL_ID_CACHE_TTL", 60),
+            patch.multiple(fga_sync, MODEL_ID=None, FAKE_CLIENT=False),
+            patch.object(fga_sync.time, "monotonic", return_value=1000),
+        ):
+            proxy.get()
+        mock_client.get_authorization_model_id.return_value = "model-1"
+        # A new model was written and the shared id expired
+        cache.set(fga_sync.MODEL_ID_CACHE_KEY.format("store-1"), "model-2")
+
+        with patch.object(fga_sync.time, "monotonic", return_value=1059):
+            proxy.get()
+        mock_client.set_authorization_model_id.assert_not_called()
+        with patch.object(fga_sync.time, "monotonic", return_value=1060):
+            proxy.get()
+        mock_client.set_authorization_model_id.assert_called_once_with("model-2")
+
+    def test_template_store_is_reused(self):
+        model = fga_sync.AuthorizationModel(
+            id="model-1",
+            schema_version="1.1",
+            type_definitions=[TypeDefinition(type="user")],
+        )
+        mock_client = self.mock_client(model_id="model-1")
+        mock_client.read_authorization_model.return_value = Mock(authorization_model=model)
+        mock_client.list_stores.return_value = Mock(stores=[Mock(id="template")])
+        mock_client.read_latest_authorization_model.return_value = Mock(
+            authorization_model=Mock(id="template-model")
+        )
+        mock_client.get_store_id.side_effect = ["store-1", "template"]
+
+        with patch.object(fga_sync, "client", mock_client):
+            store = fga_sync.template_store("test_store")
+
+        self.assertEqual(store, ("template", "template-model"))
+        name = mock_client.list_stores.call_args[0][0]["name"]
+        self.assertEqual(name, f"test_store-{fga_sync.model_fingerprint(model)[:12]}")
+        mock_client.create_store.assert_not_called()
+        mock_client.write_authorization_model.assert_not_called()
+        # The client is switched back to the configured store and model
+        mock_client.set_store_id.assert_called_with("store-1")
+        mock_client.set_authorization_model_id.assert_called_with("model-1")
+
+
+class FakeClientTestCase(TestCase):
+    def setUp(self):
+        self.fake = FakeOpenFgaClient.from_file()
+
+    def write(self, *tuples, deletes=()):
+        return self.fake.write(
+            ClientWriteRequest(
+                writes=[ClientTuple(user=u, relation=r, object=o) for u, r, o in tuples],
+                deletes=[ClientTuple(user=u, relation=r, object=o) for u, r, o in deletes],
+            )
+        )
+
+    def check(self, user, relation, object_):
+        return self.fake.check(
+            ClientCheckRequest(user=user, relation=relation, object=object_)
+        ).allowed
+
+    def test_parses_project_schema(self):
+        self.assertEqual(
+            self.fake.schema.assignable["course_class"]["teacher"],
+            {"user", "group#member"},
+        )
+        self.assertEqual(self.fake.schema.assignable["file"]["can_view"], {"user:*"})
+        model = self.fake.read_authorization_model().authorization_model
+        self.assertEqual(fga_local_model.model_from_sdk(model), self.fake.schema.model)
+
+    def test_unsupported_operators(self):
+        schema = parse("type doc\n  relations\n    define a: [user]\n    define b: a but not a\n")
+        self.assertIsNone(schema.model["doc"]["b"])
+        with self.assertRaises(SchemaError):
+            parse("condition c(x: int) {\n  x < 1\n}")
+
+    def test_inherited_checks(self):
+        self.write(
+            ("user:1", "member", "group:1"),
+            ("group:1#member", "student", "course_class:1"),
+            ("course_class:1", "course_class", "content_node:1"),
+            ("content_node:1", "parent", "content_node:2"),
+        )
+        self.assertTrue(self.check("user:1", "can_view", "content_node:2"))
+        self.assertFalse(self.check("user:1", "can_edit", "content_node:2"))
+        self.assertFalse(self.check("user:2", "can_view", "content_node:2"))
+
+        self.write(deletes=[("user:1", "member", "group:1")])
+        self.assertFalse(self.check("user:1", "can_view", "content_node:2"))
+
+    def test_public_access(self):
+        self.write(("user:*", "can_view", "folder:1"), ("folder:1", "parent", "file:1"))
+        self.assertTrue(self.check("user:5", "can_view", "file:1"))
+
+    def test_write_validation(self):
+        self.write(("user:1", "owner", "file:1"))
+        with self.assertRaises(ValidationException) as ctx:
+            self.write(("user:1", "owner", "file:1"))
+        self.assertTrue(fga_tuples._is_idempotent_error(ctx.exception))
+        with self.assertRaises(ValidationException) as ctx:
+            self.write(deletes=[("user:2", "owner", "file:1")])
+        self.assertTrue(fga_tuples._is_idempotent_error(ctx.exception))
+
+        # Disallowed subject type, unknown relation: the request is not applied
+        for invalid in [("group:1#member", "owner", "file:2"), ("user:1", "nope", "file:2")]:
+            with self.assertRaises(ValidationException) as ctx:
+                self.write(("user:1", "viewer", "file:2"), invalid)
+            self.assertFalse(fga_tuples._is_idempotent_error(ctx.exception))
+        self.assertFalse(self.check("user:1", "can_view", "file:2"))
+
+        with self.assertRaises(ValidationException):
+            self.check("user:1", "can_delete", "file:1")
+
+    def test_read_pagination(self):
+        self.write(*[(f"user:{i}", "viewer", "file:1") for i in range(5)])
+        self.write(("user:1", "viewer", "folder:1"))
+        users, token = [], None
+        while token != "":
+            response = self.fake.read(
+                ReadRequestTupleKey(object="file:1"),
+                {"page_size": 2, "continuation_token": token},
+            )
+            self.assertLessEqual(len(response.tuples), 2)
+            users += [t.key.user for t in response.tuples]
+            token = response.continuation_token
+        self.assertEqual(users, [f"user:{i}" for i in range(5)])
+        self.assertEqual(len(self.fake.read(ReadRequestTupleKey(object="file:")).tuples), 5)
+
+    def test_read_changes(self):
+        self.write(("user:1", "viewer", "file:1"), ("user:1", "viewer", "folder:1"))
+        response = self.fake.read_changes(Mock(type="file", start_time=None), {})
+        self.assertEqual([c.tuple_key.object for c in response.changes], ["file:1"])
+
+        token = response.continuation_token
+        response = self.fake.read_changes(Mock(type="file"), {"continuation_token": token})
+        self.assertEqual(response.changes, [])
+        self.assertEqual(response.continuation_token, token)
+
+        self.write(deletes=[("user:1", "viewer", "file:1")])
+        response = self.fake.read_changes(Mock(type="file"), {"continuation_token": token})
+        self.assertEqual([c.operation for c in response.changes], ["TUPLE_OPERATION_DELETE"])
+
+    def test_list_objects_and_batch_check(self):
+        self.write(("user:1", "owner", "folder:1"), ("folder:1", "parent", "file:1"))
+        response = self.fake.list_objects(
+            ClientListObjectsRequest(user="user:1", relation="can_edit", type="file")
+        )
+        self.assertEqual(response.objects, ["file:1"])
+        streamed = self.fake.streamed_list_objects(
+            ClientListObjectsRequest(user="user:1", relation="can_edit", type="file")
+        )
+        self.assertEqual([r.object for r in streamed], ["file:1"])
+
+        response = self.fake.batch_check(
+            ClientBatchCheckRequest(
+                checks=[
+                    ClientBatchCheckItem(user="user:1", relation="can_edit", object="file:1"),
+                    ClientBatchCheckItem(user="user:2", relation="can_edit", object="file:1"),
+                ]
+            )
+        )
+        self.assertEqual([r.allowed for r in response.result], [True, False])
+
+        with self.assertRaises(ValidationException):
+            self.fake.check(
+                ClientCheckRequest(
+                    user="user:2",
+                    relation="can_edit",
+                    object="file:1",
+                    contextual_tuples=[
+                        ClientTuple(user="user:2", relation="owner", object="file:1")
+                    ],
+                )
+            )
+
+    def test_async_client_shares_store(self):
+        async_fake = AsyncFakeClient(self.fake)
+        self.write(("user:1", "owner", "file:1"))
+        response = fga_async.run(
+            async_fake.check(
+                ClientCheckRequest(user="user:1", relation="can_edit", object="file:1")
+            )
+        )
+        self.assertTrue(response.allowed)
+        self.assertEqual(async_fake.get_store_id(), "fake-store")
@@ -1,9 +1,8 @@
 from rest_framework.permissions import BasePermission
 from types import SimpleNamespace
-from openfga_sdk.client.models import ClientCheckRequest
 
 from services.openfga.relations import UserRelation, FolderRelation, FileRelation
-from services.openfga.sync import client as ofga
+from services.openfga.sync.utils import check
 
 
 class CanViewFolderInOFGA(BasePermission):
@@ -11,13 +10,7 @@ class CanViewFolderInOFGA(BasePermission):
         subject_id = request.user.pk if request.user.is_authenticated else "*"
         subject_key = f"{UserRelation.TYPE}:{subject_id}"
         object_key = f"{FolderRelation.TYPE}:{obj.pk}"
-        return ofga.check(
-            ClientCheckRequest(
-                user=subject_key,
-                relation=FolderRelation.CAN_VIEW,
-                object=object_key,
-            )
-        ).allowed
+        return check(subject_key, FolderRelation.CAN_VIEW, object_key)
 
 
 class CanEditFolderInOFGA(BasePermission):
@@ -25,13 +18,7 @@ class CanEditFolderInOFGA(BasePermission):
         subject_id = request.user.pk if request.user.is_authenticated else "*"
         subject_key = f"{UserRelation.TYPE}:{subject_id}"
         object_key = f"{FolderRelation.TYPE}:{obj.pk}"
-        return ofga.check(
-            ClientCheckRequest(
-                user=subject_key,
-                relation=FolderRelation.CAN_EDIT,
-                object=object_key,
-            )
-        ).allowed
+        return check(subject_key, FolderRelation.CAN_EDIT, object_key)
 
 
 class CanListFoldersInOFGA(BasePermission):
@@ -49,13 +36,7 @@ class CanViewFileInOFGA(BasePermission):
         subject_id = request.user.pk if request.user.is_authenticated else "*"
         subject_key = f"{UserRelation.TYPE}:{subject_id}"
         object_key = f"{FileRelation.TYPE}:{obj.pk}"
-        return ofga.check(
-            ClientCheckRequest(
-                user=subject_key,
-                relation=FileRelation.CAN_VIEW,
-                object=object_key,
-            )
-        ).allowed
+        return check(subject_key, FileRelation.CAN_VIEW, object_key)
 
 
 class CanEditFileInOFGA(BasePermission):
@@ -63,13 +44,7 @@ class CanEditFileInOFGA(BasePermission):
         subject_id = request.user.pk if request.user.is_authenticated else "*"
         subject_key = f"{UserRelation.TYPE}:{subject_id}"
         object_key = f"{FileRelation.TYPE}:{obj.pk}"
-        return ofga.check(
-            ClientCheckRequest(
-                user=subject_key,
-                relation=FileRelation.CAN_EDIT,
-                object=object_key,
-            )
-        ).allowed
+        return check(subject_key, FileRelation.CAN_EDIT, object_key)
 
 
 class CanListFilesInOFGA(BasePermission):
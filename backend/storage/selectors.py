@@ -23,3 +23,19 @@ def get_root_files_by_owner(user):
 
 def get_root_folders_by_owner(user):
     return Folder.objects.filter(owner=user, parent__isnull=True)
+
+
+def get_subfolders(parent_id):
+    return Folder.objects.filter(parent_id=parent_id)
+
+
+def get_files_by_folder(folder_id):
+    return File.objects.filter(folder_id=folder_id)
+
+
+def get_no_folders():
+    return Folder.objects.none()
+
+
+def get_no_files():
+    return File.objects.none()
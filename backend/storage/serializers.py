@@ -9,7 +9,7 @@ from openfga_sdk.client.models import (
 )
 
 from user.serializers import UserReadSerializer
-from services.openfga.sync import client
+from services.openfga.sync.utils import write as fga_write
 from services.openfga.relations import FileRelation, FolderRelation, UserRelation
 
 from .models import Folder, File
@@ -68,7 +68,7 @@ class FileShareWriteSerializer(serializers.Serializer):
             raise serializers.ValidationError("User does not exist")
 
     def create(self, validated_data):
-        return client.write(
+        return fga_write(
             ClientWriteRequest(
                 writes=[
                     ClientTuple(
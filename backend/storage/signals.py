@@ -1,9 +1,11 @@
 from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
+from authz.bulk import defer
+from authz.outbox import submit
 from services.openfga.relations import FileRelation, FolderRelation, UserRelation
 from services.openfga.sync.utils import (
-    sync_single_type_subjects,
+    sync_object_relations,
     delete_all_subject_tuples,
 )
 
@@ -12,37 +14,33 @@ from .models import File, Folder
 
 @receiver(post_save, sender=Folder)
 def sync_folder_in_openfga(sender, instance: Folder, created, **kwargs):
-    sync_single_type_subjects(
+    if defer(instance, created):
+        return
+    submit(
+        sync_object_relations,
         object_key=f"{FolderRelation.TYPE}:{instance.id}",
-        subject_type=UserRelation.TYPE,
-        relation=FolderRelation.OWNER,
-        desired_subject_ids=set([str(instance.owner.id)]),
-    )
-    sync_single_type_subjects(
-        object_key=f"{FolderRelation.TYPE}:{instance.id}",
-        subject_type=FolderRelation.TYPE,
-        relation=FolderRelation.PARENT,
-        desired_subject_ids=set([str(instance.parent.id)])
-        if instance.parent
-        else set(),
+        desired_subjects={
+            FolderRelation.OWNER: {f"{UserRelation.TYPE}:{instance.owner_id}"},
+            FolderRelation.PARENT: {f"{FolderRelation.TYPE}:{instance.parent_id}"}
+            if instance.parent_id
+            else set(),
+        },
     )
 
 
 @receiver(post_save, sender=File)
 def sync_file_in_openfga(sender, instance: File, created, **kwargs):
-    sync_single_type_subjects(
-        object_key=f"{FileRelation.TYPE}:{instance.id}",
-        subject_type=UserRelation.TYPE,
-        relation=FileRelation.OWNER,
-        desired_subject_ids=set([str(instance.owner.id)]),
-    )
-    sync_single_type_subjects(
+    if defer(instance, created):
+        return
+    submit(
+        sync_object_relations,
         object_key=f"{FileRelation.TYPE}:{instance.id}",
-        subject_type=FolderRelation.TYPE,
-        relation=FileRelation.PARENT,
-        desired_subject_ids=set([str(instance.folder.id)])
-        if instance.folder
-        else set(),
+        desired_subjects={
+            FileRelation.OWNER: {f"{UserRelation.TYPE}:{instance.owner_id}"},
+            FileRelation.PARENT: {f"{FolderRelation.TYPE}:{instance.folder_id}"}
+            if instance.folder_id
+            else set(),
+        },
     )
 
 
@@ -53,4 +51,9 @@ def delete_file_after_file_deletion(sender, instance: File, **kwargs):
         # We need to use save=False to allow the normal deletion from the database
         # to happen uninterrupted.
         instance.file.delete(save=False)
-        delete_all_subject_tuples(object_key=f"{FileRelation.TYPE}:{instance.id}")
+        if defer(instance):
+            return
+        submit(
+            delete_all_subject_tuples,
+            object_key=f"{FileRelation.TYPE}:{instance.id}",
+        )
@@ -2,7 +2,10 @@ from rest_framework import viewsets, mixins
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
+from rest_framework.settings import api_settings
 
+from services.openfga.relations import FileRelation, FolderRelation
+from services.openfga.sync.filters import FGAObjectFilterBackend
 from services.s3.storages import PublicMediaStorage, PrivateMediaStorage
 from services.s3 import settings as s3_settings
 from services.s3 import utils as s3_utils
@@ -42,8 +45,19 @@ class FolderViewSet(viewsets.ModelViewSet):
         "partial_update": FolderWriteSerializer,
     }
 
+    filter_backends = [*api_settings.DEFAULT_FILTER_BACKENDS, FGAObjectFilterBackend]
+    fga_object_type = FolderRelation.TYPE
+    fga_filter_relation = FolderRelation.CAN_VIEW
+
     def get_queryset(self):
-        return selectors.get_all_folders()
+        if self.action != "list":
+            return selectors.get_all_folders()
+        parent_id = self.request.query_params.get("parent")
+        if parent_id:
+            return selectors.get_subfolders(parent_id)
+        if not self.request.user.is_authenticated:
+            return selectors.get_no_folders()
+        return selectors.get_root_folders_by_owner(self.request.user)
 
     def get_permissions(self):
         permission_classes = self.PERMISSION_MAP[self.action]
@@ -52,16 +66,6 @@ class FolderViewSet(viewsets.ModelViewSet):
     def get_serializer_class(self):
         return self.SERIALIZER_MAP[self.action]
 
-    def list(self, request, *args, **kwargs):
-        parent_id = request.query_params.get("parent")
-        if parent_id:
-            self.queryset = self.queryset.filter(parent_id=parent_id)
-        else:
-            self.queryset = self.queryset.filter(
-                parent__isnull=True, owner=request.user
-            )
-        return super().list(request, *args, **kwargs)
-
 
 class FileViewSet(viewsets.ModelViewSet):
     PERMISSION_MAP = {
@@ -82,8 +86,19 @@ class FileViewSet(viewsets.ModelViewSet):
         "partial_update": FileWriteSerializer,
     }
 
+    filter_backends = [*api_settings.DEFAULT_FILTER_BACKENDS, FGAObjectFilterBackend]
+    fga_object_type = FileRelation.TYPE
+    fga_filter_relation = FileRelation.CAN_VIEW
+
     def get_queryset(self):
-        return selectors.get_all_files()
+        if self.action != "list":
+            return selectors.get_all_files()
+        folder_id = self.request.query_params.get("folder")
+        if folder_id:
+            return selectors.get_files_by_folder(folder_id)
+        if not self.request.user.is_authenticated:
+            return selectors.get_no_files()
+        return selectors.get_root_files_by_owner(self.request.user)
 
     def get_permissions(self):
         permission_classes = self.PERMISSION_MAP[self.action]
@@ -92,16 +107,6 @@ class FileViewSet(viewsets.ModelViewSet):
     def get_serializer_class(self):
         return self.SERIALIZER_MAP[self.action]
 
-    def list(self, request, *args, **kwargs):
-        folder_id = request.query_params.get("folder")
-        if folder_id:
-            self.queryset = self.queryset.filter(folder_id=folder_id)
-        else:
-            self.queryset = self.queryset.filter(
-                folder__isnull=True, owner=request.user
-            )
-        return super().list(request, *args, **kwargs)
-
     # @action(detail=False, methods=["post"], url_path="presign-upload")
     # def presign_upload(self, request):
     #     filename = request.data.get("filename")